@@ -0,0 +1,250 @@
+import os
+from typing import Dict, List, Optional
+
+try:
+    import duckdb  # 可选依赖，未安装时分析接口不可用
+except ImportError:
+    duckdb = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+try:
+    from .archive import VideoArchive
+    from .database import DatabaseManager, db_manager, timed_query
+except ImportError:
+    from archive import VideoArchive
+    from database import DatabaseManager, db_manager, timed_query
+
+
+class AnalyticsEngine:
+    """
+    基于 DuckDB 的多日/多月聚合分析
+    
+    每次查询打开一个内存中的 DuckDB 连接：通过 sqlite 扩展只读挂载 SQLite 数据库，并把 Parquet 归档映射为视图，
+    聚合在列式引擎中向量化执行，只有聚合结果返回到Python。
+    sqlite 扩展不可用时（如离线环境无法下载扩展），改为把查询范围内的近期每日记录载入 Arrow 表；
+    近期数据量受归档保留天数限制，历史数据仍由 DuckDB 直接从归档读取。
+    """
+    
+    # 时间粒度 -> 周期表达式
+    GRANULARITIES = {
+        'day': "crawl_date",
+        'week': "strftime(date_trunc('week', CAST(crawl_date AS DATE)), '%Y-%m-%d')",
+        'month': "substr(crawl_date, 1, 7)",
+    }
+    
+    # UP主统计支持的排序字段
+    OWNER_SORTS = ('total_views', 'videos', 'appearances', 'peak_online')
+    
+    def __init__(self, manager: DatabaseManager):
+        self.manager = manager
+        # sqlite 扩展是否可用，None 表示尚未检测
+        self._sqlite_extension: Optional[bool] = None
+    
+    @property
+    def available(self) -> bool:
+        """是否安装了 duckdb"""
+        return duckdb is not None
+    
+    def _connect(self, start_date: str, end_date: str):
+        """打开 DuckDB 连接并创建 observations 视图（每个视频每天一行，附带分区、类型与UP主）"""
+        if duckdb is None:
+            raise RuntimeError("历史数据分析需要安装 duckdb")
+        con = duckdb.connect()
+        try:
+            self._attach_sqlite(con, start_date, end_date)
+            sources = ['''
+                SELECT i.bvid, d.crawl_date, d.view_count, d.max_online_count
+                FROM video_daily d
+                JOIN video_info i ON i.id = d.video_id
+            ''']
+            if self.manager.archive.get_status()["partitions"]:
+                pattern = os.path.join(self.manager.archive.root, 'crawl_date=*', VideoArchive.FILE_NAME)
+                sources.append(f'''
+                    SELECT bvid, crawl_date, view_count, max_online_count
+                    FROM read_parquet('{self._quote(pattern)}', hive_partitioning = false)
+                ''')
+            con.execute(f"CREATE VIEW facts AS {' UNION ALL '.join(sources)}")
+            con.execute('''
+                CREATE VIEW observations AS
+                SELECT f.bvid, f.crawl_date, f.view_count, f.max_online_count,
+                       i.tid_v2, i.copyright, i.owner_mid, i.owner_name
+                FROM facts f
+                LEFT JOIN video_info i ON i.bvid = f.bvid
+            ''')
+        except Exception:
+            con.close()
+            raise
+        return con
+    
+    @staticmethod
+    def _quote(value: str) -> str:
+        return value.replace("'", "''")
+    
+    def _attach_sqlite(self, con, start_date: str, end_date: str):
+        """挂载 SQLite 中的 video_info 与 video_daily，扩展不可用时退回到载入 Arrow 表"""
+        if self._sqlite_extension is not False:
+            try:
+                con.execute(f"ATTACH '{self._quote(os.path.abspath(self.manager.db_path))}' AS hot (TYPE sqlite, READ_ONLY)")
+                con.execute('''
+                    CREATE VIEW video_info AS
+                    SELECT id, bvid, tid_v2, copyright, owner_mid, owner_name FROM hot.video_info
+                ''')
+                con.execute('''
+                    CREATE VIEW video_daily AS
+                    SELECT video_id, crawl_date, view_count, max_online_count FROM hot.video_daily
+                ''')
+                self._sqlite_extension = True
+                return
+            except duckdb.Error as e:
+                if self._sqlite_extension:
+                    raise
+                print(f"DuckDB sqlite 扩展不可用，改为载入近期数据: {e}")
+                self._sqlite_extension = False
+        
+        if pa is None:
+            raise RuntimeError("DuckDB sqlite 扩展不可用时需要安装 pyarrow")
+        with self.manager.get_connection() as conn:
+            video_info = self._arrow_table(
+                conn.execute('SELECT id, bvid, tid_v2, copyright, owner_mid, owner_name FROM video_info'),
+                [pa.int64(), pa.string(), pa.int64(), pa.int64(), pa.int64(), pa.string()],
+            )
+            video_daily = self._arrow_table(
+                conn.execute('''
+                    SELECT video_id, crawl_date, view_count, max_online_count FROM video_daily
+                    WHERE crawl_date BETWEEN ? AND ?
+                ''', (start_date, end_date)),
+                [pa.int64(), pa.string(), pa.int64(), pa.int64()],
+            )
+        # 复制为 DuckDB 原生表：连接查询下推的过滤条件不支持直接作用于 Arrow 扫描
+        for name, table in (('video_info', video_info), ('video_daily', video_daily)):
+            con.register(f'{name}_arrow', table)
+            con.execute(f'CREATE TABLE {name} AS SELECT * FROM {name}_arrow')
+            con.unregister(f'{name}_arrow')
+    
+    @staticmethod
+    def _arrow_table(cursor, types: List):
+        names = [desc[0] for desc in cursor.description]
+        rows = cursor.fetchall()
+        columns = list(zip(*rows)) if rows else [[] for _ in names]
+        return pa.Table.from_arrays(
+            [pa.array(list(column), type=column_type) for column, column_type in zip(columns, types)],
+            names=names,
+        )
+    
+    def _query(self, start_date: str, end_date: str, sql: str, params: List) -> List[Dict]:
+        con = self._connect(start_date, end_date)
+        try:
+            cursor = con.execute(sql, params)
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            con.close()
+    
+    def _filters(self, start_date: str, end_date: str, zone: Optional[str]):
+        """日期范围与分区筛选条件"""
+        where_clauses = ["crawl_date BETWEEN ? AND ?"]
+        params: List = [start_date, end_date]
+        zone_ids = self.manager.resolve_zone_ids(zone, None)
+        if zone_ids is not None:
+            where_clauses.append(f"tid_v2 IN ({','.join(['?'] * len(zone_ids))})")
+            params.extend(zone_ids)
+        return where_clauses, params
+    
+    def _period(self, granularity: str) -> str:
+        if granularity not in self.GRANULARITIES:
+            raise ValueError(f"不支持的时间粒度: {granularity}")
+        return self.GRANULARITIES[granularity]
+    
+    @timed_query
+    def zone_trends(self, start_date: str, end_date: str, granularity: str = 'month',
+                    zone: Optional[str] = None) -> List[Dict]:
+        """
+        各分区按周期的趋势
+        
+        Returns:
+            每个周期、分区一行：上榜次数、视频数、总播放量、平均播放量、峰值在线人数
+        """
+        period = self._period(granularity)
+        where_clauses, params = self._filters(start_date, end_date, zone)
+        return self._query(start_date, end_date, f'''
+            SELECT {period} AS period, tid_v2,
+                   COUNT(*) AS appearances,
+                   COUNT(DISTINCT bvid) AS videos,
+                   SUM(view_count) AS total_views,
+                   CAST(ROUND(AVG(view_count)) AS BIGINT) AS avg_views,
+                   MAX(max_online_count) AS peak_online
+            FROM observations
+            WHERE {' AND '.join(where_clauses)} AND tid_v2 IS NOT NULL
+            GROUP BY period, tid_v2
+            ORDER BY period, tid_v2
+        ''', params)
+    
+    @timed_query
+    def owner_stats(self, start_date: str, end_date: str, zone: Optional[str] = None,
+                    sort: str = 'total_views', limit: int = 50) -> List[Dict]:
+        """
+        按UP主统计上榜视频
+        
+        每个视频先按日期范围聚合（播放量取范围内最大值），再按UP主汇总。
+        
+        Returns:
+            每个UP主一行：上榜视频数、上榜次数、总播放量、峰值在线人数、原创视频数
+        """
+        if sort not in self.OWNER_SORTS:
+            raise ValueError(f"不支持的排序字段: {sort}")
+        where_clauses, params = self._filters(start_date, end_date, zone)
+        return self._query(start_date, end_date, f'''
+            WITH per_video AS (
+                SELECT owner_mid, bvid,
+                       any_value(owner_name) AS owner_name,
+                       any_value(copyright) AS copyright,
+                       COUNT(*) AS appearances,
+                       MAX(view_count) AS views,
+                       MAX(max_online_count) AS peak_online
+                FROM observations
+                WHERE {' AND '.join(where_clauses)} AND owner_mid IS NOT NULL
+                GROUP BY owner_mid, bvid
+            )
+            SELECT owner_mid,
+                   any_value(owner_name) AS owner_name,
+                   COUNT(*) AS videos,
+                   SUM(appearances) AS appearances,
+                   SUM(views) AS total_views,
+                   MAX(peak_online) AS peak_online,
+                   COUNT(*) FILTER (WHERE copyright = 1) AS original_videos
+            FROM per_video
+            GROUP BY owner_mid
+            ORDER BY {sort} DESC NULLS LAST, owner_mid
+            LIMIT ?
+        ''', params + [limit])
+    
+    @timed_query
+    def copyright_ratios(self, start_date: str, end_date: str, granularity: str = 'month',
+                         zone: Optional[str] = None) -> List[Dict]:
+        """
+        按周期统计原创/转载视频数及原创占比（不含类型未知的视频）
+        """
+        period = self._period(granularity)
+        where_clauses, params = self._filters(start_date, end_date, zone)
+        return self._query(start_date, end_date, f'''
+            SELECT *,
+                   ROUND(original_videos / NULLIF(original_videos + reprint_videos, 0), 4) AS original_ratio
+            FROM (
+                SELECT {period} AS period,
+                       COUNT(DISTINCT bvid) FILTER (WHERE copyright = 1) AS original_videos,
+                       COUNT(DISTINCT bvid) FILTER (WHERE copyright = 2) AS reprint_videos,
+                       COUNT(DISTINCT bvid) FILTER (WHERE copyright IS NULL) AS unknown_videos
+                FROM observations
+                WHERE {' AND '.join(where_clauses)}
+                GROUP BY period
+            )
+            ORDER BY period
+        ''', params)
+
+
+# 创建全局分析引擎实例
+analytics_engine = AnalyticsEngine(db_manager)
@@ -1,16 +1,151 @@
+import fnmatch
+import functools
 import json
+import os
 import time
-from typing import List, Dict, Optional
+from types import SimpleNamespace
+from typing import List, Dict, Optional, TYPE_CHECKING
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.common.by import By
-from webdriver_manager.chrome import ChromeDriverManager
+if TYPE_CHECKING:
+    from selenium import webdriver
+
+try:
+    from .metrics import (
+        UPSTREAM_REQUEST_SECONDS, UPSTREAM_REQUESTS,
+        CHROME_DRIVERS_ACTIVE, CHROME_DRIVER_LIFETIME_SECONDS,
+        PAGE_LOAD_SECONDS, PAGE_LOAD_BYTES,
+        upstream_endpoint,
+    )
+    from .resources import resource_budget
+    from .response_cache import response_cache
+except ImportError:
+    from metrics import (
+        UPSTREAM_REQUEST_SECONDS, UPSTREAM_REQUESTS,
+        CHROME_DRIVERS_ACTIVE, CHROME_DRIVER_LIFETIME_SECONDS,
+        PAGE_LOAD_SECONDS, PAGE_LOAD_BYTES,
+        upstream_endpoint,
+    )
+    from resources import resource_budget
+    from response_cache import response_cache
+
+
+# 解析出的 chromedriver 路径缓存文件，避免每次创建爬虫都联网查询驱动版本
+DRIVER_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'chromedriver.json')
+
+# 通过 CDP Network.setBlockedURLs 屏蔽的请求（'*' 为通配符）。
+# 视频页的 __INITIAL_STATE__ 是服务端渲染的内联脚本，首页只用于获取Cookie，均不依赖外部脚本、样式和媒体资源。
+DEFAULT_BLOCKED_URL_PATTERNS = [
+    # 静态资源：播放器及页面脚本、样式、字体、图片
+    "*hdslb.com/*",
+    # 音视频流
+    "*bilivideo.com/*",
+    "*bilivideo.cn/*",
+    "*akamaized.net/*",
+    # 弹幕、评论、动态、消息
+    "*api.bilibili.com/x/v2/dm/*",
+    "*api.bilibili.com/x/v2/reply*",
+    "*api.vc.bilibili.com/*",
+    "*message.bilibili.com/*",
+    # 广告与埋点上报
+    "*cm.bilibili.com/*",
+    "*data.bilibili.com/*",
+    "*api.bilibili.com/x/web-show/*",
+    "*api.bilibili.com/x/click-interface/*",
+]
+
+# 爬虫实际需要的请求。CDP 屏蔽规则只能列出要屏蔽的URL，
+# 因此会命中这些URL的屏蔽规则在启动浏览器时被剔除，保证Cookie建立、页面状态和数据接口不受影响。
+DEFAULT_ALLOWED_URLS = [
+    "https://www.bilibili.com/",
+    "https://www.bilibili.com/video/BV1xx411c7mD/",
+    "https://api.bilibili.com/x/web-interface/popular?pn=1&ps=50",
+    "https://api.bilibili.com/x/player/online/total?bvid=BV1xx411c7mD&cid=1",
+    "https://api.bilibili.com/x/frontend/finger/spi",
+]
+
+# 在页面内汇总本次加载传输的字节数（跨域且未返回 Timing-Allow-Origin 的资源计为0）
+_PAGE_TRANSFER_SCRIPT = """
+    const nav = performance.getEntriesByType('navigation')[0];
+    const resources = performance.getEntriesByType('resource');
+    return {
+        document_bytes: nav ? nav.transferSize : 0,
+        resource_bytes: resources.reduce((sum, r) => sum + (r.transferSize || 0), 0),
+        requests: resources.length + 1,
+    };
+"""
+
+
+def effective_blocked_patterns(blocked: List[str], allowed_urls: List[str]) -> List[str]:
+    """剔除会误伤必需请求的屏蔽规则"""
+    result = []
+    for pattern in blocked:
+        hits = [url for url in allowed_urls if fnmatch.fnmatchcase(url, pattern)]
+        if hits:
+            print(f"屏蔽规则 {pattern} 会命中必需的请求 {hits[0]}，已忽略")
+            continue
+        result.append(pattern)
+    return result
+
+
+@functools.lru_cache(maxsize=None)
+def _browser_modules() -> SimpleNamespace:
+    """
+    按需导入浏览器相关依赖
+    
+    selenium 与 webdriver_manager 导入较慢，只有真正启动爬虫的进程才需要，
+    API进程只使用 FastBilibiliAPI，不会加载它们。
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.support.ui import WebDriverWait
+    return SimpleNamespace(webdriver=webdriver, Options=Options, Service=Service, WebDriverWait=WebDriverWait)
+
+
+def _read_cached_driver_path() -> Optional[str]:
+    """读取缓存的 chromedriver 路径，文件已不存在或不可执行时视为无缓存"""
+    try:
+        with open(DRIVER_CACHE_FILE, 'r', encoding='utf-8') as f:
+            path = json.load(f).get('path')
+    except (OSError, ValueError):
+        return None
+    if path and os.path.isfile(path) and os.access(path, os.X_OK):
+        return path
+    return None
+
+
+def _write_cached_driver_path(path: Optional[str]):
+    """写入（path为None时清除）chromedriver 路径缓存"""
+    try:
+        if path is None:
+            if os.path.exists(DRIVER_CACHE_FILE):
+                os.remove(DRIVER_CACHE_FILE)
+            return
+        os.makedirs(os.path.dirname(DRIVER_CACHE_FILE), exist_ok=True)
+        with open(DRIVER_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({'path': path, 'resolved_at': time.time()}, f)
+    except OSError as e:
+        print(f"写入 chromedriver 路径缓存失败: {e}")
+
+
+def resolve_chromedriver_path(refresh: bool = False) -> str:
+    """
+    获取 chromedriver 路径，优先使用本地缓存（离线优先）
+    
+    缓存不存在、失效或 refresh=True 时才通过 webdriver-manager 联网解析，并把结果写回缓存。
+    """
+    if not refresh:
+        cached = _read_cached_driver_path()
+        if cached:
+            return cached
+    
+    from webdriver_manager.chrome import ChromeDriverManager
+    path = ChromeDriverManager().install()
+    _write_cached_driver_path(path)
+    return path
 
 
 class FastBilibiliAPI:
@@ -49,30 +184,46 @@ class FastBilibiliAPI:
         # 设置超时
         self.timeout = 10
 
-    def get_video_detail(self, bvid: str) -> Optional[Dict]:
+    def get_video_detail(self, bvid: str, max_age: Optional[float] = None) -> Optional[Dict]:
         """
         快速获取视频详细信息，包括tid_v2、copyright等字段
         
+        响应会写入本地缓存；分区、类型等元数据几乎不变，默认可使用数天内的缓存，
+        需要最新统计数据（stat）的调用方应传入较小的 max_age（如 STATS_MAX_AGE）。
+        
         Args:
             bvid: 视频的BV号
+            max_age: 可接受的最大缓存时间（秒），None表示使用接口的默认缓存时间
             
         Returns:
             包含视频详细信息的字典
         """
         try:
-            api_url = f'https://api.bilibili.com/x/web-interface/view?bvid={bvid}'
-            
-            # 直接使用requests请求API
-            response = self.session.get(api_url, timeout=self.timeout)
-            response.raise_for_status()
-            
-            data = response.json()
+            api_url = 'https://api.bilibili.com/x/web-interface/view'
+            endpoint = upstream_endpoint(api_url)
             
-            if data.get("code") != 0:
-                print(f"获取视频详情失败: code={data.get('code')}, message={data.get('message')}")
-                return None
+            def fetch() -> Optional[Dict]:
+                # 直接使用requests请求API
+                resource_budget.throttle(endpoint)
+                try:
+                    with UPSTREAM_REQUEST_SECONDS.time(endpoint=endpoint):
+                        response = self.session.get(api_url, params={'bvid': bvid}, timeout=self.timeout)
+                except requests.exceptions.RequestException:
+                    UPSTREAM_REQUESTS.inc(endpoint=endpoint, code="network_error")
+                    raise
+                if not response.ok:
+                    UPSTREAM_REQUESTS.inc(endpoint=endpoint, code=f"http_{response.status_code}")
+                response.raise_for_status()
                 
-            video_data = data.get("data")
+                data = response.json()
+                UPSTREAM_REQUESTS.inc(endpoint=endpoint, code=str(data.get("code")))
+                
+                if data.get("code") != 0:
+                    print(f"获取视频详情失败: code={data.get('code')}, message={data.get('message')}")
+                    return None
+                return data.get("data") or None
+            
+            video_data = response_cache.get_or_fetch(endpoint, {'bvid': bvid}, fetch, max_age=max_age)
             if not video_data:
                 print(f"视频数据为空: {bvid}")
                 return None
@@ -136,22 +287,43 @@ class BilibiliSpider:
             script_timeout: int = 20,
             page_load_timeout: int = 20,
             block_images: bool = True,
+            blocked_url_patterns: Optional[List[str]] = None,
+            allowed_urls: Optional[List[str]] = None,
+            max_tabs: int = 4,
     ):
+        """
+        Args:
+            max_tabs: 并行加载页面时同一浏览器中最多使用的标签页数
+            blocked_url_patterns: 通过CDP屏蔽的URL规则，默认 DEFAULT_BLOCKED_URL_PATTERNS，传空列表关闭屏蔽
+            allowed_urls: 必须放行的URL，命中它们的屏蔽规则不会生效，默认 DEFAULT_ALLOWED_URLS
+        """
         self.headless = headless
         self.timeout = int(timeout)
         self.script_timeout = int(script_timeout)
         self.page_load_timeout = int(page_load_timeout)
         self.block_images = bool(block_images)
-
-        self._driver: Optional[webdriver.Chrome] = None
+        self.blocked_url_patterns = effective_blocked_patterns(
+            DEFAULT_BLOCKED_URL_PATTERNS if blocked_url_patterns is None else blocked_url_patterns,
+            DEFAULT_ALLOWED_URLS if allowed_urls is None else allowed_urls,
+        )
+        # 最近一次页面加载的耗时与传输量
+        self.last_page_load: Optional[Dict] = None
+        self.max_tabs = max(1, int(max_tabs))
+        self._main_handle: Optional[str] = None
+        self._tab_handles: List[str] = []
+
+        self._driver: Optional["webdriver.Chrome"] = None
+        self._driver_started_at = 0.0
         self._home_bootstrapped = False
         self._bvid_cid_cache: Dict[str, int] = {}
+        self._page_states: Dict[str, Dict] = {}
 
         self._driver = self._build_chrome()
         self._bootstrap_home()
 
-    def _build_chrome(self) -> webdriver.Chrome:
-        options = Options()
+    def _build_chrome(self) -> "webdriver.Chrome":
+        browser = _browser_modules()
+        options = browser.Options()
         if self.headless:
             options.add_argument("--headless=new")
         # 更快的加载策略：DOMContentLoaded 即可继续
@@ -204,17 +376,25 @@ class BilibiliSpider:
         else:
             options.add_experimental_option("prefs", media_prefs)
 
-        # 使用 webdriver-manager 自动管理 ChromeDriver
+        # 使用缓存的 ChromeDriver 路径，缓存失效（如Chrome升级导致版本不匹配）时通过 webdriver-manager 重新解析
         try:
-            service = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=options)
+            try:
+                driver_path = resolve_chromedriver_path()
+                driver = browser.webdriver.Chrome(service=browser.Service(driver_path), options=options)
+            except Exception as e:
+                if _read_cached_driver_path() is None:
+                    raise
+                print(f"使用缓存的 ChromeDriver 失败，重新解析驱动: {e}")
+                _write_cached_driver_path(None)
+                driver_path = resolve_chromedriver_path(refresh=True)
+                driver = browser.webdriver.Chrome(service=browser.Service(driver_path), options=options)
             print("ChromeDriver 初始化成功")
         except Exception as e:
             print(f"使用 webdriver-manager 失败: {e}")
             print("尝试使用系统路径中的 ChromeDriver...")
             try:
                 # fallback 到默认方式
-                driver = webdriver.Chrome(options=options)
+                driver = browser.webdriver.Chrome(options=options)
                 print("使用系统 ChromeDriver 成功")
             except Exception as e2:
                 print(f"系统 ChromeDriver 也失败: {e2}")
@@ -226,7 +406,18 @@ class BilibiliSpider:
             
         driver.set_page_load_timeout(self.page_load_timeout)
         driver.set_script_timeout(self.script_timeout)
+        self._driver_started_at = time.monotonic()
+        CHROME_DRIVERS_ACTIVE.inc()
+
+        self._apply_cdp_setup(driver)
+        return driver
+
+    def _apply_cdp_setup(self, driver: "webdriver.Chrome"):
+        """
+        对当前活动标签页应用 CDP 设置
 
+        CDP 命令只作用于执行时的活动标签页，新开的标签页需要重新调用。
+        """
         # 隐藏 webdriver 痕迹
         try:
             driver.execute_cdp_cmd(
@@ -238,13 +429,21 @@ class BilibiliSpider:
         except Exception:
             pass
 
-        return driver
+        # 在网络层屏蔽不需要的请求，比prefs只屏蔽图片更彻底，减少页面加载时间和内存占用
+        if self.blocked_url_patterns:
+            try:
+                driver.execute_cdp_cmd("Network.enable", {})
+                driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.blocked_url_patterns})
+            except Exception as e:
+                print(f"设置请求屏蔽规则失败: {e}")
 
     @property
-    def driver(self) -> webdriver.Chrome:
+    def driver(self) -> "webdriver.Chrome":
         if self._driver is None:
             self._driver = self._build_chrome()
             self._home_bootstrapped = False
+            self._main_handle = None
+            self._tab_handles = []
         return self._driver
 
     def _bootstrap_home(self):
@@ -253,12 +452,43 @@ class BilibiliSpider:
         """
         if self._home_bootstrapped:
             return
-        self.driver.get("https://www.bilibili.com/")
-        WebDriverWait(self.driver, self.timeout).until(
-            lambda d: d.execute_script("return document.readyState") in ("interactive", "complete")
+        self._load_page(
+            "https://www.bilibili.com/", "home",
+            lambda d: d.execute_script("return document.readyState") in ("interactive", "complete"),
         )
         self._home_bootstrapped = True
 
+    def _load_page(self, url: str, page: str, ready) -> Dict:
+        """
+        打开页面并等待就绪，记录加载耗时和传输字节数
+
+        Args:
+            url: 页面地址
+            page: 页面类型（用作指标标签）
+            ready: WebDriverWait 的就绪条件
+        """
+        resource_budget.throttle(upstream_endpoint(url))
+        started = time.perf_counter()
+        self.driver.get(url)
+        _browser_modules().WebDriverWait(self.driver, self.timeout).until(ready)
+        return self._record_page_load(page, time.perf_counter() - started)
+
+    def _record_page_load(self, page: str, elapsed: float) -> Dict:
+        """统计当前标签页本次加载的耗时与传输字节数"""
+        PAGE_LOAD_SECONDS.observe(elapsed, page=page)
+
+        stats = {"page": page, "seconds": round(elapsed, 3)}
+        try:
+            transfer = self.driver.execute_script(_PAGE_TRANSFER_SCRIPT) or {}
+            total = int(transfer.get("document_bytes") or 0) + int(transfer.get("resource_bytes") or 0)
+            stats.update(bytes=total, requests=transfer.get("requests"))
+            PAGE_LOAD_BYTES.observe(total, page=page)
+            print(f"页面 {page} 加载耗时 {elapsed:.2f}s，传输 {total / 1024:.1f} KB，{transfer.get('requests')} 个请求")
+        except Exception as e:
+            print(f"统计页面 {page} 传输量失败: {e}")
+        self.last_page_load = stats
+        return stats
+
     def _fetch_json(
             self,
             url: str,
@@ -276,15 +506,21 @@ class BilibiliSpider:
                 .catch(err => cb(JSON.stringify({ok: false, error: String(err)})));
         """
 
+        endpoint = upstream_endpoint(url)
         attempt = 0
         last_err = None
         while attempt <= retries:
             try:
-                res_str = self.driver.execute_async_script(fetch_script, url)
+                resource_budget.throttle(endpoint)
+                with UPSTREAM_REQUEST_SECONDS.time(endpoint=endpoint):
+                    res_str = self.driver.execute_async_script(fetch_script, url)
                 payload = json.loads(res_str)
                 if not payload.get("ok"):
+                    UPSTREAM_REQUESTS.inc(endpoint=endpoint, code="fetch_error")
                     raise RuntimeError(payload.get("error") or "Unknown fetch error")
-                return payload["data"]
+                data = payload["data"]
+                UPSTREAM_REQUESTS.inc(endpoint=endpoint, code=str(data.get("code") if isinstance(data, dict) else None))
+                return data
             except Exception as e:
                 last_err = e
                 if attempt >= retries:
@@ -294,27 +530,160 @@ class BilibiliSpider:
 
         raise RuntimeError(f"Fetch failed after {retries + 1} attempts: {last_err}")
 
-    def bvid2cid(self, bvid: str) -> int:
-        if not bvid:
-            raise ValueError("bvid must not be empty")
+    # 在页面内只提取需要的字段，避免序列化整个 __INITIAL_STATE__（通常数百KB）
+    _PAGE_STATE_SCRIPT = """
+        const v = (window.__INITIAL_STATE__ || {}).videoData || {};
+        const stat = v.stat || null;
+        return JSON.stringify({
+            bvid: v.bvid || null,
+            aid: v.aid ?? null,
+            tid_v2: v.tid_v2 ?? null,
+            copyright: v.copyright ?? null,
+            owner_mid: (v.owner || {}).mid ?? null,
+            owner_name: (v.owner || {}).name ?? null,
+            cids: (v.pages || []).map(p => p.cid),
+            stat: stat && {
+                view: stat.view, like: stat.like, coin: stat.coin, favorite: stat.favorite,
+                share: stat.share, reply: stat.reply, danmaku: stat.danmaku,
+            },
+        });
+    """
 
-        if bvid in self._bvid_cid_cache:
-            return self._bvid_cid_cache[bvid]
+    def get_page_state(self, bvid: str) -> Dict:
+        """
+        打开视频页并提取精简的页面状态
 
-        url = f"https://www.bilibili.com/video/{bvid}/"
-        self.driver.get(url)
+        Returns:
+            包含 bvid、aid、tid_v2、copyright、owner_mid、owner_name、cids（所有分P的cid）、stat 的字典
+        """
+        if not bvid:
+            raise ValueError("bvid must not be empty")
 
         # 等待页面注入，使用显式脚本条件而非完整加载
-        WebDriverWait(self.driver, self.timeout).until(
+        self._load_page(
+            f"https://www.bilibili.com/video/{bvid}/", "video",
             lambda d: d.execute_script(
                 "return !!(window.__INITIAL_STATE__ && window.__INITIAL_STATE__.videoData && window.__INITIAL_STATE__.videoData.pages && window.__INITIAL_STATE__.videoData.pages.length)"
-            )
+            ),
         )
 
-        state_str = self.driver.execute_script("return JSON.stringify(window.__INITIAL_STATE__)")
-        state = json.loads(state_str)
-        pages = state["videoData"]["pages"]
-        cid = int(pages[0]["cid"])
+        state = json.loads(self.driver.execute_script(self._PAGE_STATE_SCRIPT))
+        self._page_states[bvid] = state
+        return state
+
+    def _worker_tab_handles(self, count: int) -> List[str]:
+        """
+        获取 count 个用于页面加载的标签页，不足时在同一个浏览器中新开
+
+        主标签页保留给 _fetch_json 使用，不参与页面加载。
+        """
+        driver = self.driver
+        if self._main_handle is None:
+            self._main_handle = driver.current_window_handle
+        open_handles = set(driver.window_handles)
+        self._tab_handles = [handle for handle in self._tab_handles if handle in open_handles]
+        while len(self._tab_handles) < count:
+            driver.switch_to.new_window("tab")
+            self._apply_cdp_setup(driver)
+            self._tab_handles.append(driver.current_window_handle)
+        driver.switch_to.window(self._main_handle)
+        return self._tab_handles[:count]
+
+    def get_page_states(self, bvids: List[str], max_tabs: Optional[int] = None) -> Dict[str, Dict]:
+        """
+        在同一个浏览器的多个标签页中并行加载视频页并提取页面状态
+
+        WebDriver 命令在一个会话内是串行的，但导航通过 location.href 发起后立即返回，
+        各标签页的网络请求和页面解析在浏览器中并行进行，驱动只需轮询各标签页是否就绪，
+        因此页面加载耗时近似按标签页数线性缩短，而不需要额外的Chrome进程。
+
+        Args:
+            bvids: 视频BV号列表
+            max_tabs: 同时使用的标签页数，默认 self.max_tabs
+
+        Returns:
+            bvid -> 页面状态；加载失败或超时的视频不在结果中
+        """
+        pending = [bvid for bvid in dict.fromkeys(bvids) if bvid]
+        if not pending:
+            return {}
+        if len(pending) == 1:
+            try:
+                return {pending[0]: self.get_page_state(pending[0])}
+            except Exception as e:
+                print(f"获取视频 {pending[0]} 页面状态失败: {e}")
+                return {}
+
+        driver = self.driver
+        handles = self._worker_tab_handles(min(max_tabs or self.max_tabs, len(pending)))
+        # 标签页 -> (bvid, 开始时间)
+        loading: Dict[str, tuple] = {}
+        results: Dict[str, Dict] = {}
+        ready_script = (
+            "const v = (window.__INITIAL_STATE__ || {}).videoData;"
+            "return !!(v && v.bvid === arguments[0] && v.pages && v.pages.length)"
+        )
+
+        try:
+            while pending or loading:
+                # 为空闲的标签页发起新的导航
+                for handle in handles:
+                    if handle in loading or not pending:
+                        continue
+                    bvid = pending.pop(0)
+                    url = f"https://www.bilibili.com/video/{bvid}/"
+                    resource_budget.throttle(upstream_endpoint(url))
+                    driver.switch_to.window(handle)
+                    driver.execute_script("window.location.href = arguments[0]", url)
+                    loading[handle] = (bvid, time.perf_counter())
+
+                time.sleep(0.05)
+
+                # 轮询正在加载的标签页
+                for handle, (bvid, started) in list(loading.items()):
+                    driver.switch_to.window(handle)
+                    try:
+                        ready = driver.execute_script(ready_script, bvid)
+                    except Exception:
+                        ready = False  # 导航过程中执行脚本可能失败，稍后重试
+                    elapsed = time.perf_counter() - started
+                    if ready:
+                        try:
+                            state = json.loads(driver.execute_script(self._PAGE_STATE_SCRIPT))
+                            results[bvid] = state
+                            self._page_states[bvid] = state
+                            if state.get("cids"):
+                                self._bvid_cid_cache[bvid] = int(state["cids"][0])
+                            self._record_page_load("video", elapsed)
+                        except Exception as e:
+                            print(f"提取视频 {bvid} 页面状态失败: {e}")
+                        del loading[handle]
+                    elif elapsed > self.page_load_timeout:
+                        print(f"视频 {bvid} 页面加载超时")
+                        del loading[handle]
+        finally:
+            driver.switch_to.window(self._main_handle)
+
+        return results
+
+    def prefetch_cids(self, bvids: List[str]) -> int:
+        """并行加载未缓存cid的视频页，之后的 bvid2cid 直接命中缓存，返回成功数"""
+        missing = [bvid for bvid in bvids if bvid and bvid not in self._bvid_cid_cache]
+        return len(self.get_page_states(missing)) if missing else 0
+
+    def pop_page_state(self, bvid: str) -> Optional[Dict]:
+        """取出访问视频页时顺带获得的页面状态（每次访问只返回一次），供调用方补全数据库"""
+        return self._page_states.pop(bvid, None)
+
+    def bvid2cid(self, bvid: str) -> int:
+        if not bvid:
+            raise ValueError("bvid must not be empty")
+
+        if bvid in self._bvid_cid_cache:
+            return self._bvid_cid_cache[bvid]
+
+        state = self.get_page_state(bvid)
+        cid = int(state["cids"][0])
         self._bvid_cid_cache[bvid] = cid
         return cid
 
@@ -362,7 +731,7 @@ class BilibiliSpider:
 
     def get_hot_videos(self, max_videos: int = 20) -> List[Dict]:
         """
-        获取热门视频列表，返回项包含 bvid/aid、cid、封面、标题与播放量 view 等字段。
+        获取热门视频列表，返回项包含 bvid/aid、cid、封面、标题、简介、播放量 view 与UP主等字段。
         """
         if max_videos <= 0:
             return []
@@ -397,11 +766,15 @@ class BilibiliSpider:
                 except Exception:
                     pass
 
+                owner = it.get("owner") or {}
                 entry: Dict = {
                     "cid": it.get("cid"),
                     "pic": it.get("pic"),
                     "title": it.get("title"),
+                    "desc": it.get("desc"),  # 简介
                     "view": view,  # 播放量
+                    "owner_mid": owner.get("mid"),  # UP主
+                    "owner_name": owner.get("name"),
                 }
                 if it.get("bvid"):
                     entry["bvid"] = it.get("bvid")
@@ -445,6 +818,10 @@ class BilibiliSpider:
             finally:
                 self._driver = None
                 self._home_bootstrapped = False
+                self._main_handle = None
+                self._tab_handles = []
+                CHROME_DRIVERS_ACTIVE.dec()
+                CHROME_DRIVER_LIFETIME_SECONDS.observe(time.monotonic() - self._driver_started_at)
 
     def __enter__(self):
         if self._driver is None:
@@ -0,0 +1,161 @@
+import os
+import shutil
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import pyarrow as pa  # 可选依赖，未安装时不归档，所有数据保留在SQLite中
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pc = pq = None
+
+
+# 归档文件中的字段，与 videos 视图的字段及顺序一致
+ARCHIVE_COLUMNS = [
+    'id', 'bvid', 'aid', 'cid', 'title', 'pic', 'view_count', 'online_count',
+    'crawl_date', 'crawl_time', 'max_online_count', 'max_online_time', 'tid_v2', 'copyright',
+]
+
+_INTEGER_COLUMNS = {'id', 'aid', 'cid', 'view_count', 'max_online_count', 'tid_v2', 'copyright'}
+
+
+def _archive_schema():
+    return pa.schema([
+        (name, pa.int64() if name in _INTEGER_COLUMNS else pa.string())
+        for name in ARCHIVE_COLUMNS
+    ])
+
+
+class VideoArchive:
+    """
+    已结束日期的列式归档
+    
+    每个日期一个分区目录（crawl_date=YYYY-MM-DD/part-0.parquet，Hive分区布局），
+    按记录ID排序、zstd压缩。分区文件写入临时文件后原子替换，重复归档同一日期是安全的。
+    """
+    
+    FILE_NAME = 'part-0.parquet'
+    
+    def __init__(self, root: str):
+        self.root = root
+    
+    @property
+    def available(self) -> bool:
+        """是否安装了 pyarrow"""
+        return pq is not None
+    
+    def _require(self):
+        if pq is None:
+            raise RuntimeError("读取或写入归档需要安装 pyarrow")
+    
+    def partition_path(self, crawl_date: str) -> str:
+        return os.path.join(self.root, f'crawl_date={crawl_date}', self.FILE_NAME)
+    
+    def write_partition(self, crawl_date: str, columns: List[str], rows: List[tuple]) -> int:
+        """
+        写入一个日期的全部记录
+        
+        Args:
+            crawl_date: 日期
+            columns: 字段名列表（需包含 ARCHIVE_COLUMNS 中的全部字段）
+            rows: 记录列表
+        
+        Returns:
+            分区文件大小（字节）
+        """
+        self._require()
+        positions = [columns.index(name) for name in ARCHIVE_COLUMNS]
+        rows = sorted(rows, key=lambda row: row[positions[0]])
+        table = pa.Table.from_arrays(
+            [
+                pa.array([row[position] for row in rows], type=field.type)
+                for position, field in zip(positions, _archive_schema())
+            ],
+            schema=_archive_schema(),
+        )
+        
+        path = self.partition_path(crawl_date)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.tmp'
+        pq.write_table(table, temp_path, compression='zstd', use_dictionary=True)
+        if pq.ParquetFile(temp_path).metadata.num_rows != len(rows):
+            os.remove(temp_path)
+            raise RuntimeError(f"归档 {crawl_date} 校验失败：写入行数不一致")
+        os.replace(temp_path, path)
+        return os.path.getsize(path)
+    
+    def _read_table(self, crawl_date: str, columns: Optional[List[str]] = None,
+                    tid_v2_in: Optional[List[int]] = None, bvid_in: Optional[List[str]] = None):
+        self._require()
+        filters = []
+        if tid_v2_in is not None:
+            filters.append(('tid_v2', 'in', list(tid_v2_in)))
+        if bvid_in is not None:
+            filters.append(('bvid', 'in', list(bvid_in)))
+        return pq.read_table(self.partition_path(crawl_date), columns=columns, filters=filters or None)
+    
+    def read_rows(self, crawl_date: str, columns: Optional[List[str]] = None,
+                  tid_v2_in: Optional[List[int]] = None,
+                  bvid_in: Optional[List[str]] = None) -> List[Dict]:
+        """读取一个日期的记录（按记录ID排序），可按分区或BV号筛选"""
+        return self._read_table(crawl_date, columns, tid_v2_in, bvid_in).to_pylist()
+    
+    def iter_batches(self, crawl_date: str, tid_v2_in: Optional[List[int]] = None,
+                     batch_size: int = 500) -> Iterator[List[tuple]]:
+        """按批读取一个日期的记录，字段顺序为 ARCHIVE_COLUMNS"""
+        self._require()
+        parquet_file = pq.ParquetFile(self.partition_path(crawl_date))
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=ARCHIVE_COLUMNS):
+            if tid_v2_in is not None:
+                batch = batch.filter(pc.is_in(batch.column('tid_v2'), value_set=pa.array(tid_v2_in, pa.int64())))
+            if batch.num_rows:
+                yield list(zip(*(column.to_pylist() for column in batch.columns)))
+    
+    def aggregate_by_video(self, crawl_dates: List[str],
+                           tid_v2_in: Optional[List[int]] = None) -> List[Dict]:
+        """
+        按视频聚合多个日期的记录（列式计算，不逐行构造Python对象）
+        
+        Returns:
+            每个视频一项：days_on_list、peak_online、max_view、min_view、first_date、last_date
+        """
+        self._require()
+        if not crawl_dates:
+            return []
+        columns = ['bvid', 'crawl_date', 'view_count', 'max_online_count']
+        table = pa.concat_tables([
+            self._read_table(crawl_date, columns, tid_v2_in) for crawl_date in crawl_dates
+        ])
+        table = table.filter(pc.is_valid(table.column('bvid')))
+        grouped = table.group_by('bvid').aggregate([
+            ('crawl_date', 'count'),
+            ('max_online_count', 'max'),
+            ('view_count', 'max'),
+            ('view_count', 'min'),
+            ('crawl_date', 'min'),
+            ('crawl_date', 'max'),
+        ])
+        names = {
+            'crawl_date_count': 'days_on_list',
+            'max_online_count_max': 'peak_online',
+            'view_count_max': 'max_view',
+            'view_count_min': 'min_view',
+            'crawl_date_min': 'first_date',
+            'crawl_date_max': 'last_date',
+        }
+        return grouped.rename_columns([names.get(name, name) for name in grouped.column_names]).to_pylist()
+    
+    def delete_partition(self, crawl_date: str):
+        """删除一个日期的分区目录"""
+        shutil.rmtree(os.path.dirname(self.partition_path(crawl_date)), ignore_errors=True)
+    
+    def get_status(self) -> Dict:
+        """统计归档分区数量与占用空间"""
+        partitions = total = 0
+        if os.path.isdir(self.root):
+            for name in os.listdir(self.root):
+                path = os.path.join(self.root, name, self.FILE_NAME)
+                if name.startswith('crawl_date=') and os.path.exists(path):
+                    partitions += 1
+                    total += os.path.getsize(path)
+        return {"available": self.available, "root": self.root, "partitions": partitions, "bytes": total}
@@ -0,0 +1,11 @@
+"""
+性能基准测试
+
+在 backend 目录下运行，例如::
+
+    python -m benchmarks.startup
+    python -m benchmarks.queries --sizes small,medium --plans
+
+benchmarks.synthetic 生成多年规模的合成数据库，benchmarks.queries 在各规模上测量
+DatabaseManager 方法与 /api 路由的耗时并输出查询计划。
+"""
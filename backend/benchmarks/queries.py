@@ -0,0 +1,470 @@
+"""
+数据库查询基准测试
+
+在不同规模的合成数据库上测量每个 DatabaseManager 方法与 /api 路由的耗时，
+并记录执行过的SQL语句及其查询计划，用于判断查询随数据量增长的趋势。
+
+在 backend 目录下运行，例如::
+
+    python -m benchmarks.queries --sizes small,medium --plans
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    from ..database import DatabaseManager
+    from .synthetic import generate
+except ImportError:
+    from database import DatabaseManager
+    from benchmarks.synthetic import generate
+
+
+# 预设规模：(天数, 每天视频数)
+SIZES = {
+    "small": (30, 500),
+    "medium": (365, 1000),
+    "large": (3 * 365, 3000),
+}
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATA_DIR = os.path.join(BENCHMARK_DIR, ".data")
+
+# 可以获取查询计划的语句
+_PLANNABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+# 合并同一语句的多次执行：字面量替换为占位符
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+class TracingDatabaseManager(DatabaseManager):
+    """记录通过 get_connection 执行的SQL语句（参数已展开）"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statements: List[str] = []
+
+    @contextmanager
+    def get_connection(self):
+        with super().get_connection() as conn:
+            conn.set_trace_callback(self.statements.append)
+            yield conn
+
+
+def _parse_size(value: str) -> Tuple[str, int, int]:
+    """解析规模参数：预设名称或 天数x每天视频数"""
+    if value in SIZES:
+        return (value,) + SIZES[value]
+    match = re.fullmatch(r"(\d+)x(\d+)", value)
+    if not match:
+        raise argparse.ArgumentTypeError(f"无效的规模: {value}（可用 {', '.join(SIZES)} 或 天数x每天视频数）")
+    return value, int(match.group(1)), int(match.group(2))
+
+
+def prepare_database(data_dir: str, days: int, videos_per_day: int, seed: int,
+                     keep_days: Optional[int], regenerate: bool = False) -> str:
+    """生成（或复用已生成的）合成数据库，返回文件路径"""
+    suffix = f"-keep{keep_days}" if keep_days is not None else ""
+    path = os.path.join(data_dir, f"synthetic-{days}x{videos_per_day}-seed{seed}{suffix}.db")
+    if regenerate or not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        shutil.rmtree(f"{path}.archive", ignore_errors=True)
+        print(f"正在生成 {os.path.basename(path)} ...", flush=True)
+        stats = generate(path, days, videos_per_day, seed=seed, keep_days=keep_days)
+        print(f"生成完成：{stats['daily_rows']} 条每日记录，耗时 {stats['seconds']} 秒", flush=True)
+    return path
+
+
+@contextmanager
+def working_copy(path: str):
+    """复制数据库与归档到临时目录，写操作不影响可复用的原始数据"""
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    try:
+        copy = os.path.join(workdir, os.path.basename(path))
+        shutil.copyfile(path, copy)
+        if os.path.isdir(f"{path}.archive"):
+            shutil.copytree(f"{path}.archive", f"{copy}.archive")
+        yield copy
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def build_context(manager: DatabaseManager) -> Dict:
+    """从数据库中挑选各用例使用的日期、视频、分区与检索词"""
+    dates = sorted(manager.get_available_dates())
+    latest, oldest = dates[-1], dates[0]
+    videos = manager.get_videos_by_date(latest)
+    sample = videos[len(videos) // 2]
+    with manager.get_connection() as conn:
+        zone = conn.execute('''
+            SELECT tid_v2 FROM video_info WHERE tid_v2 IS NOT NULL
+            GROUP BY tid_v2 ORDER BY COUNT(*) DESC LIMIT 1
+        ''').fetchone()[0]
+        velocity_ts = conn.execute('SELECT MAX(view_ts) FROM video_velocity').fetchone()[0] or time.time()
+    main_zone = next((main for main in map(str, range(1001, 1032))
+                      if zone in (manager.resolve_zone_ids(main, None) or [])), str(zone))
+    next_date = (date.fromisoformat(latest) + timedelta(days=1)).isoformat()
+    return {
+        "latest": latest,
+        "oldest": oldest,
+        "week_start": (date.fromisoformat(latest) - timedelta(days=6)).isoformat(),
+        "month_start": (date.fromisoformat(latest) - timedelta(days=29)).isoformat(),
+        "next_date": next_date,
+        "bvid": sample["bvid"],
+        "cid": sample["cid"],
+        "main_zone": main_zone,
+        "term": "原神",
+        # 覆盖合成数据中最后一次速度观测
+        "window_hours": (time.time() - velocity_ts) / 3600 + 6,
+        # 新一天的榜单：沿用最新一天的视频，播放量略有增长
+        "videos": [{
+            "bvid": video["bvid"], "aid": video["aid"], "cid": video["cid"], "title": video["title"],
+            "pic": video["pic"], "view": (video["view_count"] or 0) + 1000, "online_count": "0",
+            "tid_v2": video["tid_v2"], "copyright": video["copyright"],
+        } for video in videos],
+    }
+
+
+def _max_online(manager: DatabaseManager, ctx: Dict):
+    with manager.get_connection() as conn:
+        return manager._get_or_update_max_online(conn.cursor(), ctx["bvid"], 100, datetime.now().isoformat())
+
+
+def _open_refresh_cycle(manager: DatabaseManager, ctx: Dict):
+    items = [{"bvid": video["bvid"], "cid": video["cid"]} for video in ctx["videos"]]
+    ctx["cycle_id"], _ = manager.open_refresh_cycle(ctx["latest"], items)
+
+
+def _claim_next_job(manager: DatabaseManager, ctx: Dict):
+    job = manager.claim_next_job("bench")
+    ctx["job_id"] = job["id"] if job else ctx.get("job_id", 0)
+
+
+# (用例名, 调用)：用例名的第一个词为方法名，用于统计未覆盖的方法
+DATABASE_CASES: List[Tuple[str, Callable[[DatabaseManager, Dict], object]]] = [
+    ("init_database", lambda m, c: m.init_database()),
+    ("get_available_dates", lambda m, c: m.get_available_dates()),
+    ("get_data_version", lambda m, c: m.get_data_version(c["latest"])),
+    ("get_videos_by_date 最新一天", lambda m, c: m.get_videos_by_date()),
+    ("get_videos_by_date 主分区/在线人数排序",
+     lambda m, c: m.get_videos_by_date(c["latest"], "online_count", "desc", c["main_zone"])),
+    ("get_videos_by_date 最早一天", lambda m, c: m.get_videos_by_date(c["oldest"])),
+    ("get_zone_statistics", lambda m, c: m.get_zone_statistics()),
+    ("get_zone_statistics_range 全部日期", lambda m, c: m.get_zone_statistics_range(c["oldest"], c["latest"])),
+    ("get_leaderboard 7天", lambda m, c: m.get_leaderboard(c["week_start"], c["latest"])),
+    ("get_leaderboard 全部日期/峰值在线",
+     lambda m, c: m.get_leaderboard(c["oldest"], c["latest"], "peak_online")),
+    ("iter_videos_in_range 30天",
+     lambda m, c: sum(len(rows) for _, rows in m.iter_videos_in_range(c["month_start"], c["latest"]))),
+    ("search_videos", lambda m, c: m.search_videos(c["term"])),
+    ("search_videos 30天/主分区",
+     lambda m, c: m.search_videos(c["term"], c["month_start"], c["latest"], c["main_zone"])),
+    ("resolve_zone_ids", lambda m, c: m.resolve_zone_ids(c["main_zone"], None)),
+    ("get_rising_videos 播放量", lambda m, c: m.get_rising_videos("view", 50, c["window_hours"])),
+    ("get_rising_videos 在线人数", lambda m, c: m.get_rising_videos("online", 50, c["window_hours"])),
+    ("get_online_history", lambda m, c: m.get_online_history(c["bvid"])),
+    ("video_exists", lambda m, c: m.video_exists(c["bvid"])),
+    ("video_has_tid_v2", lambda m, c: m.video_has_tid_v2(c["bvid"])),
+    ("get_videos_to_update", lambda m, c: m.get_videos_to_update(c["latest"])),
+    ("get_online_refresh_candidates", lambda m, c: m.get_online_refresh_candidates(c["latest"])),
+    ("_get_or_update_max_online", _max_online),
+    ("save_videos 一天的榜单", lambda m, c: m.save_videos(c["videos"], c["next_date"])),
+    ("update_video_online_count", lambda m, c: m.update_video_online_count(c["bvid"], "1.2万+", c["latest"])),
+    ("enrich_video_from_page_state", lambda m, c: m.enrich_video_from_page_state(
+        c["bvid"], c["latest"], {"aid": 1, "cids": [c["cid"]], "stat": {"view": 1}})),
+    ("try_acquire_lease", lambda m, c: m.try_acquire_lease("bench", "bench", 60)),
+    ("get_lease", lambda m, c: m.get_lease("bench")),
+    ("release_lease", lambda m, c: m.release_lease("bench", "bench")),
+    ("start_task_run", lambda m, c: c.update(run_id=m.start_task_run("bench"))),
+    ("finish_task_run", lambda m, c: m.finish_task_run(c["run_id"], "success", 1)),
+    ("mark_interrupted_task_runs", lambda m, c: m.mark_interrupted_task_runs()),
+    ("get_last_task_run", lambda m, c: m.get_last_task_run("bench")),
+    ("get_task_runs", lambda m, c: m.get_task_runs()),
+    ("enqueue_job", lambda m, c: m.enqueue_job("bench", {"n": 1}, dedupe_statuses=())),
+    ("claim_next_job", _claim_next_job),
+    ("finish_job", lambda m, c: m.finish_job(c["job_id"], "done")),
+    ("fail_orphaned_jobs", lambda m, c: m.fail_orphaned_jobs()),
+    ("get_job", lambda m, c: m.get_job(c["job_id"])),
+    ("get_jobs", lambda m, c: m.get_jobs()),
+    ("set_setting", lambda m, c: m.set_setting("bench", {"value": 1})),
+    ("get_setting", lambda m, c: m.get_setting("bench")),
+    ("open_refresh_cycle", _open_refresh_cycle),
+    ("get_pending_refresh_items", lambda m, c: m.get_pending_refresh_items(c["cycle_id"])),
+    ("record_refresh_item", lambda m, c: m.record_refresh_item(c["cycle_id"], c["bvid"], True)),
+    ("close_refresh_cycle_if_done", lambda m, c: m.close_refresh_cycle_if_done(c["cycle_id"])),
+    ("get_latest_refresh_cycle", lambda m, c: m.get_latest_refresh_cycle(c["latest"])),
+    ("get_archivable_dates", lambda m, c: m.get_archivable_dates(c["latest"])),
+    ("get_archived_dates", lambda m, c: m.get_archived_dates()),
+]
+
+# 会改变数据分布或耗时很长的用例，放在最后且只执行一次
+FINAL_CASES: List[Tuple[str, Callable[[DatabaseManager, Dict], object]]] = [
+    ("archive_date 最早的未归档日期",
+     lambda m, c: m.archive.available and m.get_archivable_dates(c["latest"])
+     and m.archive_date(m.get_archivable_dates(c["latest"])[0])),
+    ("vacuum", lambda m, c: m.vacuum()),
+]
+
+# (路由, 查询参数)；参数中的 {name} 由上下文替换
+ROUTE_CASES: List[Tuple[str, Dict[str, str]]] = [
+    ("/api/", {}),
+    ("/api/videos", {}),
+    ("/api/videos", {"date": "{oldest}", "sort_by": "online_count", "main_zone": "{main_zone}"}),
+    ("/api/dates", {}),
+    ("/api/archive", {}),
+    ("/api/crawl/jobs", {}),
+    ("/api/crawl/jobs/{job_id}", {}),
+    ("/api/crawl/status", {}),
+    ("/api/crawl/history", {}),
+    ("/api/crawl/config", {}),
+    ("/api/export", {"from": "{week_start}", "to": "{latest}"}),
+    ("/api/leaderboard", {"from": "{month_start}", "to": "{latest}"}),
+    ("/api/search", {"q": "{term}"}),
+    ("/api/rising", {"window_hours": "{window_hours}"}),
+    ("/api/video/{bvid}/trend", {}),
+    ("/api/zone/stats", {}),
+    ("/api/zone/stats/range", {"from": "{oldest}", "to": "{latest}"}),
+    ("/api/analytics/zones/trend", {"from": "{oldest}", "to": "{latest}"}),
+    ("/api/analytics/owners", {"from": "{oldest}", "to": "{latest}"}),
+    ("/api/analytics/copyright", {"from": "{oldest}", "to": "{latest}"}),
+    ("/api/health", {}),
+    ("/metrics", {}),
+]
+
+# 不测量的路由：访问上游接口、长连接或触发爬取任务
+SKIPPED_ROUTES = {
+    "/api/events": "SSE长连接",
+    "/api/proxy/image": "访问上游接口",
+    "/api/video/detail": "访问上游接口",
+}
+
+
+def explain(manager: DatabaseManager, sql: str) -> List[str]:
+    """获取语句的查询计划，按层级缩进"""
+    try:
+        with DatabaseManager.get_connection(manager) as conn:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    except sqlite3.Error as e:
+        return [f"无法获取查询计划: {e}"]
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+def full_scans(plan: List[str]) -> List[str]:
+    """查询计划中不走索引的表扫描（SCAN 表名，不含索引扫描与子查询）"""
+    scans = []
+    for line in plan:
+        detail = line.strip()
+        if detail.startswith("SCAN ") and "INDEX" not in detail and "VIRTUAL TABLE" not in detail:
+            name = detail.split()[1]
+            # 子查询、常量行、系统表与 FTS5 内部表不计入
+            if not (name.startswith("(") or name.isdigit() or name.startswith("sqlite_") or "." in name):
+                scans.append(name)
+    return scans
+
+
+def summarize_statements(manager: DatabaseManager, statements: List[str]) -> List[Dict]:
+    """合并相同的语句并获取查询计划"""
+    grouped: Dict[str, Dict] = {}
+    for sql in statements:
+        sql = " ".join(sql.split())
+        if not sql.upper().startswith(_PLANNABLE):
+            continue
+        key = _LITERAL.sub("?", sql)
+        if key not in grouped:
+            grouped[key] = {"sql": key, "executions": 0, "example": sql}
+        grouped[key]["executions"] += 1
+    summaries = []
+    for item in grouped.values():
+        plan = explain(manager, item.pop("example"))
+        summaries.append(dict(item, plan=plan, full_scans=full_scans(plan)))
+    return summaries
+
+
+def measure(manager: TracingDatabaseManager, run: Callable[[], object], repeat: int) -> Dict:
+    """执行 repeat 次并计时；查询计划取自第一次执行的语句"""
+    samples: List[float] = []
+    statements: List[str] = []
+    for index in range(repeat):
+        manager.statements = []
+        start = time.perf_counter()
+        try:
+            run()
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+        samples.append(time.perf_counter() - start)
+        if index == 0:
+            statements = manager.statements
+    manager.statements = []
+    summaries = summarize_statements(manager, statements)
+    return {
+        "median_ms": round(statistics.median(samples) * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2),
+        "statements": sum(item["executions"] for item in summaries),
+        "full_scans": sorted({name for item in summaries for name in item["full_scans"]}),
+        "queries": summaries,
+    }
+
+
+def benchmark_database(manager: TracingDatabaseManager, ctx: Dict, repeat: int) -> List[Dict]:
+    """测量每个 DatabaseManager 方法"""
+    results = []
+    for cases, times in ((DATABASE_CASES, repeat), (FINAL_CASES, 1)):
+        for name, call in cases:
+            results.append(dict(name=name, **measure(manager, lambda: call(manager, ctx), times)))
+    return results
+
+
+def uncovered_methods(results: List[Dict]) -> List[str]:
+    """没有对应用例的公开方法"""
+    covered = {item["name"].split()[0] for item in results}
+    public = {name for name in dir(DatabaseManager)
+              if not name.startswith("_") and callable(getattr(DatabaseManager, name))}
+    return sorted(public - covered - {"get_connection"})
+
+
+def benchmark_routes(manager: TracingDatabaseManager, ctx: Dict, repeat: int) -> List[Dict]:
+    """
+    通过 TestClient 测量 /api 路由
+
+    路由模块中的数据库管理器替换为被测数据库；响应体缓存替换为不保留条目的实例，
+    每次请求都会重新查询，测得的是未命中缓存时的耗时。
+    """
+    try:
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+    except ImportError as e:
+        return [{"name": "/api", "error": f"无法导入路由: {e}"}]
+    try:
+        from .. import routes
+        from ..http_cache import ConditionalJSONCache
+    except ImportError:
+        import routes
+        from http_cache import ConditionalJSONCache
+
+    app = FastAPI()
+    app.include_router(routes.api_router)
+    app.include_router(routes.metrics_router)
+    client = TestClient(app)
+
+    engine = routes.analytics_engine
+    originals = (routes.db_manager, routes.json_cache, engine.manager)
+    routes.db_manager, routes.json_cache, engine.manager = manager, ConditionalJSONCache(max_entries=0), manager
+    ctx = dict(ctx, job_id=ctx.get("job_id") or manager.enqueue_job("bench", dedupe_statuses=())[0])
+    results = []
+    try:
+        for path, params in ROUTE_CASES:
+            url = path.format(**ctx)
+            query = {key: value.format(**ctx) for key, value in params.items()}
+
+            def request():
+                response = client.get(url, params=query)
+                if response.status_code >= 400:
+                    raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+
+            label = " ".join([path] + [f"{key}={value}" for key, value in params.items()])
+            results.append(dict(name=label, **measure(manager, request, repeat)))
+    finally:
+        routes.db_manager, routes.json_cache, engine.manager = originals
+
+    benchmarked = {path for path, _ in ROUTE_CASES}
+    for route in list(routes.api_router.routes) + list(routes.metrics_router.routes):
+        if "GET" not in getattr(route, "methods", ()) or route.path in benchmarked:
+            continue
+        results.append({"name": route.path, "skipped": SKIPPED_ROUTES.get(route.path, "没有对应用例")})
+    return results
+
+
+def run_size(label: str, days: int, videos_per_day: int, args) -> Dict:
+    """在一种规模的数据库上执行全部用例"""
+    path = prepare_database(args.data_dir, days, videos_per_day, args.seed, args.keep_days, args.regenerate)
+    with working_copy(path) as copy:
+        manager = TracingDatabaseManager(copy, archive_dir=f"{copy}.archive")
+        ctx = build_context(manager)
+        with manager.get_connection() as conn:
+            rows = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                    for table in ("video_info", "video_daily", "online_history")}
+        result = {
+            "size": label,
+            "days": days,
+            "videos_per_day": videos_per_day,
+            "rows": rows,
+            "bytes": os.path.getsize(copy),
+            "archived_dates": len(manager.get_archived_dates()),
+        }
+        if not args.routes_only:
+            result["methods"] = benchmark_database(manager, ctx, args.repeat)
+            result["uncovered_methods"] = uncovered_methods(result["methods"])
+        if not args.skip_routes:
+            result["routes"] = benchmark_routes(manager, ctx, args.repeat)
+        return result
+
+
+def print_report(result: Dict, show_plans: bool):
+    rows = result["rows"]
+    print(f"\n== {result['size']}：{result['days']} 天 x {result['videos_per_day']} 个视频/天，"
+          f"video_info {rows['video_info']} 行，video_daily {rows['video_daily']} 行，"
+          f"online_history {rows['online_history']} 行，已归档 {result['archived_dates']} 天，"
+          f"{result['bytes'] / 1024 / 1024:.1f} MB")
+    for section in ("methods", "routes"):
+        if section not in result:
+            continue
+        print(f"\n{'用例':<48}{'中位数(ms)':>12}{'最大值(ms)':>12}{'语句数':>8}  全表扫描")
+        for item in result[section]:
+            if "skipped" in item:
+                print(f"{item['name']:<48}  跳过: {item['skipped']}")
+                continue
+            if "error" in item:
+                print(f"{item['name']:<48}  失败: {item['error']}")
+                continue
+            scans = ", ".join(item["full_scans"]) or "-"
+            print(f"{item['name']:<48}{item['median_ms']:>12}{item['max_ms']:>12}{item['statements']:>8}  {scans}")
+            if show_plans:
+                for query in item["queries"]:
+                    print(f"    [{query['executions']}次] {query['sql'][:160]}")
+                    for line in query["plan"]:
+                        print(f"        {line}")
+    if result.get("uncovered_methods"):
+        print(f"\n没有用例的方法: {', '.join(result['uncovered_methods'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在合成数据库上测量数据库方法与API路由的耗时和查询计划")
+    parser.add_argument("--sizes", default="small,medium",
+                        help=f"逗号分隔的规模：{', '.join(SIZES)} 或 天数x每天视频数")
+    parser.add_argument("--repeat", type=int, default=5, help="每个用例重复次数")
+    parser.add_argument("--seed", type=int, default=0, help="合成数据的随机种子")
+    parser.add_argument("--keep-days", type=int, default=None,
+                        help="合成数据只在SQLite中保留最近的天数，其余归档（需要 pyarrow）")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="合成数据库的存放目录")
+    parser.add_argument("--regenerate", action="store_true", help="重新生成合成数据库")
+    parser.add_argument("--skip-routes", action="store_true", help="不测量API路由")
+    parser.add_argument("--routes-only", action="store_true", help="只测量API路由")
+    parser.add_argument("--plans", action="store_true", help="输出每个用例执行的语句及查询计划")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出（包含查询计划）")
+    args = parser.parse_args()
+
+    sizes = [_parse_size(value.strip()) for value in args.sizes.split(",") if value.strip()]
+    results = [run_size(label, days, videos_per_day, args) for label, days, videos_per_day in sizes]
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    for result in results:
+        print_report(result, args.plans)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+# 被测模块：API工作进程只需要 routes/main，爬虫进程才需要 crawler/worker
+DEFAULT_MODULES = ["api", "routes", "main", "crawler", "worker"]
+
+# 不应出现在API进程中的浏览器依赖
+BROWSER_MODULES = ["selenium", "webdriver_manager"]
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": elapsed,
+    "browser_modules": [name for name in {browser_modules!r} if name in sys.modules],
+}}))
+"""
+
+
+def measure_import(module: str, repeat: int = 5) -> Dict:
+    """
+    在全新的解释器中多次导入模块并计时
+
+    每次都启动新进程，避免模块缓存影响结果；返回中位数、最小值以及导入后已加载的浏览器依赖。
+    """
+    samples: List[float] = []
+    browser_modules: List[str] = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, browser_modules=BROWSER_MODULES)],
+            cwd=BACKEND_DIR, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()
+            return {"module": module, "error": error[-1] if error else f"exit code {result.returncode}"}
+        # 模块导入时可能有打印输出，结果在最后一行
+        payload = json.loads(result.stdout.strip().splitlines()[-1])
+        samples.append(payload["seconds"])
+        browser_modules = payload["browser_modules"]
+
+    return {
+        "module": module,
+        "median_ms": round(statistics.median(samples) * 1000, 1),
+        "min_ms": round(min(samples) * 1000, 1),
+        "browser_modules": browser_modules,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测量各模块的冷启动导入耗时")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="要测量的模块")
+    parser.add_argument("--repeat", type=int, default=5, help="每个模块重复次数")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出")
+    args = parser.parse_args()
+
+    results = [measure_import(module, args.repeat) for module in args.modules]
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+
+    print(f"{'模块':<10}{'中位数(ms)':>12}{'最小值(ms)':>12}  已加载的浏览器依赖")
+    for item in results:
+        if "error" in item:
+            print(f"{item['module']:<10}  导入失败: {item['error']}")
+            continue
+        loaded = ", ".join(item["browser_modules"]) or "-"
+        print(f"{item['module']:<10}{item['median_ms']:>12}{item['min_ms']:>12}  {loaded}")
+
+
+if __name__ == "__main__":
+    main()
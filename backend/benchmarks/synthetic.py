@@ -0,0 +1,321 @@
+"""
+合成大规模数据集
+
+按热门榜的形态模拟多年的数据：每天的榜单大部分视频延续自前一天，其余由新视频补足；
+分区、原创/转载比例、UP主、播放量与在线人数的分布接近真实榜单。
+数据直接批量写入 video_info / video_daily 等表（videos 为兼容视图），分区日汇总与数据版本由
+DatabaseManager 生成，与线上写入路径一致。
+
+在 backend 目录下运行，例如::
+
+    python -m benchmarks.synthetic bench.db --days 365 --videos-per-day 2000
+"""
+import argparse
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+try:
+    from ..database import DatabaseManager
+except ImportError:
+    from database import DatabaseManager
+
+
+# 热门榜中各主分区的相对占比，未列出的主分区占比为1
+MAIN_ZONE_WEIGHTS = {
+    "1008": 18,  # 游戏
+    "1010": 10,  # 知识
+    "1005": 8,   # 动画
+    "1001": 7,   # 影视
+    "1002": 6,   # 娱乐
+    "1003": 6,   # 音乐
+    "1020": 6,   # 美食
+    "1030": 6,   # 生活兴趣
+    "1012": 5,   # 科技数码
+    "1007": 4,   # 鬼畜
+    "1004": 3,   # 舞蹈
+    "1018": 3,   # 体育运动
+    "1024": 3,   # 动物
+    "1029": 3,   # vlog
+}
+
+# 各主分区中原创视频的比例，未列出的主分区取 DEFAULT_ORIGINAL_RATIO
+ORIGINAL_RATIOS = {
+    "1001": 0.35,  # 影视
+    "1002": 0.6,   # 娱乐
+    "1003": 0.7,   # 音乐
+    "1009": 0.5,   # 资讯
+}
+DEFAULT_ORIGINAL_RATIO = 0.85
+
+# 获取视频详情失败、缺少分区与类型的比例
+MISSING_DETAIL_RATIO = 0.01
+
+# 视频第二天仍留在榜单上的概率，平均在榜约4天
+STAY_PROBABILITY = 0.75
+
+# 标题与简介用词
+WORDS = [
+    "原神", "我的世界", "崩坏", "王者荣耀", "英雄联盟", "黑神话", "猫猫", "狗狗", "日常", "挑战",
+    "教程", "测评", "开箱", "翻唱", "原创", "混剪", "盘点", "解说", "实况", "攻略", "速通",
+    "科普", "历史", "数学", "物理", "编程", "人工智能", "手机", "电脑", "显卡", "耳机",
+    "美食", "探店", "做饭", "烘焙", "旅行", "vlog", "健身", "舞蹈", "翻跳", "鬼畜", "名场面",
+    "电影", "电视剧", "动漫", "新番", "高能", "离谱", "震惊", "终于", "第一次", "全网",
+    "一口气看完", "最后", "真的", "居然", "如何", "为什么", "万字", "深度", "合集", "完整版",
+    "Minecraft", "Genshin", "MMD", "RTX", "iPhone", "Python", "AI", "4K", "60帧", "2024",
+]
+_FILLER = [chr(code) for code in range(0x4E00, 0x4E00 + 2500)]
+
+# BV号使用的字符集（去掉易混淆的 0、I、O、l）
+_BVID_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+
+def _bvid(video_id: int) -> str:
+    """由视频序号生成唯一且看起来随机的BV号"""
+    value = (video_id * 2654435761) % (58 ** 9)
+    chars = []
+    for _ in range(9):
+        value, digit = divmod(value, 58)
+        chars.append(_BVID_ALPHABET[digit])
+    return "BV1" + "".join(chars)
+
+
+def _online_display(online: int) -> str:
+    """按播放器接口的显示格式输出在线人数，如 "856"、"3000+"、"1.2万+" """
+    if online >= 10000:
+        return f"{online / 10000:.1f}万+"
+    if online >= 1000:
+        return f"{online // 1000 * 1000}+"
+    return str(online)
+
+
+def _all_main_zones(manager: DatabaseManager) -> List[str]:
+    """有子分区映射的主分区ID"""
+    return [str(zone) for zone in range(1001, 1032) if manager.resolve_zone_ids(str(zone), None) != [zone]]
+
+
+class _Generator:
+    """逐日模拟热门榜单"""
+
+    def __init__(self, manager: DatabaseManager, videos_per_day: int, seed: int):
+        self.manager = manager
+        self.videos_per_day = videos_per_day
+        self.rng = random.Random(seed)
+        self.next_id = 1
+        self.zones = list(MAIN_ZONE_WEIGHTS)
+        self.zones += [zone for zone in _all_main_zones(manager) if zone not in MAIN_ZONE_WEIGHTS]
+        self.zone_weights = [MAIN_ZONE_WEIGHTS.get(zone, 1) for zone in self.zones]
+        # UP主数量约为每天榜单长度的20倍，头部UP主出现得更频繁
+        self.owner_count = max(100, videos_per_day * 20)
+
+    def _text(self, low: int, high: int) -> str:
+        parts = []
+        length = self.rng.randint(low, high)
+        while sum(len(part) for part in parts) < length:
+            roll = self.rng.random()
+            if roll < 0.45:
+                parts.append(self.rng.choice(WORDS))
+            elif roll < 0.9:
+                parts.append("".join(self.rng.choices(_FILLER, k=self.rng.randint(1, 4))))
+            else:
+                parts.append(self.rng.choice([" ", "！", "？", "【", "】", "，"]))
+        return "".join(parts)
+
+    def new_video(self) -> Dict:
+        rng = self.rng
+        video_id = self.next_id
+        self.next_id += 1
+        main_zone = rng.choices(self.zones, self.zone_weights)[0]
+        sub_zones = self.manager.resolve_zone_ids(main_zone, None)
+        missing_detail = rng.random() < MISSING_DETAIL_RATIO
+        original = rng.random() < ORIGINAL_RATIOS.get(main_zone, DEFAULT_ORIGINAL_RATIO)
+        owner = int(self.owner_count * rng.random() ** 3) + 1
+        return {
+            "id": video_id,
+            "bvid": _bvid(video_id),
+            "aid": 100000000 + video_id,
+            "cid": 200000000 + video_id,
+            "title": self._text(8, 40),
+            "pic": f"http://i0.hdslb.com/bfs/archive/{video_id:x}.jpg",
+            "description": "-" if rng.random() < 0.2 else self._text(0, 150),
+            "tid_v2": None if missing_detail else rng.choice(sub_zones),
+            "copyright": None if missing_detail else (1 if original else 2),
+            "owner_mid": 1000 + owner,
+            "owner_name": f"UP主{owner}",
+            # 播放量与在线人数呈长尾分布
+            "view": int(rng.lognormvariate(12.5, 1.0)),
+            "online": int(rng.lognormvariate(6.0, 1.2)),
+            "age": 0,
+            "max_online": 0,
+            "max_online_time": None,
+        }
+
+    def advance(self, video: Dict, crawl_time: str):
+        """进入新的一天：播放量增长、在线人数随在榜天数衰减"""
+        rng = self.rng
+        if video["age"]:
+            video["view"] += int(video["view"] * 0.6 * 0.7 ** video["age"] * rng.uniform(0.5, 1.5))
+            video["online"] = max(1, int(video["online"] * rng.uniform(0.4, 1.1)))
+        video["age"] += 1
+        if video["online"] > video["max_online"]:
+            video["max_online"] = video["online"]
+            video["max_online_time"] = crawl_time
+
+
+def generate(db_path: str, days: int, videos_per_day: int,
+             end_date: Optional[date] = None, seed: int = 0,
+             history_days: int = 1, keep_days: Optional[int] = None) -> Dict:
+    """
+    生成合成数据库
+
+    Args:
+        db_path: 数据库文件路径（已存在时先删除）
+        days: 天数
+        videos_per_day: 每天榜单上的视频数
+        end_date: 最后一天，默认今天
+        seed: 随机种子，相同参数生成的数据完全相同
+        history_days: 为最近多少天的视频生成每10分钟一次的在线人数采样
+        keep_days: 只在SQLite中保留最近多少天，更早的日期写入 Parquet 归档（需要 pyarrow）
+
+    Returns:
+        生成的行数、文件大小与耗时
+    """
+    started = time.perf_counter()
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    manager = DatabaseManager(db_path, archive_dir=f"{db_path}.archive")
+    manager.init_database()
+
+    end_date = end_date or date.today()
+    generator = _Generator(manager, videos_per_day, seed)
+    rng = generator.rng
+    active: List[Dict] = []
+    daily_rows = video_count = history_rows = 0
+    dates = [(end_date - timedelta(days=offset)).isoformat() for offset in range(days - 1, -1, -1)]
+
+    with manager.get_connection() as conn:
+        # 合成数据可以随时重新生成，关闭同步写盘以加快生成
+        conn.execute("PRAGMA synchronous = OFF")
+        cursor = conn.cursor()
+
+        def retire(videos: List[Dict]):
+            """视频离开榜单时写入最近上榜日期"""
+            cursor.executemany('UPDATE video_info SET last_date = ? WHERE id = ?',
+                               [(video["last_date"], video["id"]) for video in videos])
+
+        for index, crawl_date in enumerate(dates):
+            staying = [video for video in active if rng.random() < STAY_PROBABILITY]
+            staying_ids = {video["id"] for video in staying}
+            retire([video for video in active if video["id"] not in staying_ids])
+            active = staying[:videos_per_day]
+            new_videos = [generator.new_video() for _ in range(videos_per_day - len(active))]
+            cursor.executemany('''
+                INSERT INTO video_info
+                (id, bvid, aid, cid, title, pic, tid_v2, copyright, owner_mid, owner_name,
+                 description, first_date, last_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(
+                video["id"], video["bvid"], video["aid"], video["cid"], video["title"], video["pic"],
+                video["tid_v2"], video["copyright"], video["owner_mid"], video["owner_name"],
+                video["description"], crawl_date, crawl_date,
+            ) for video in new_videos])
+            active.extend(new_videos)
+            video_count += len(new_videos)
+
+            rows = []
+            day_start = datetime.fromisoformat(crawl_date)
+            for position, video in enumerate(active):
+                crawl_time = (day_start + timedelta(hours=2, seconds=position)).isoformat()
+                generator.advance(video, crawl_time)
+                video["last_date"] = crawl_date
+                rows.append((
+                    video["id"], crawl_date, video["view"], _online_display(video["online"]),
+                    video["max_online"], video["max_online_time"], crawl_time,
+                ))
+            cursor.executemany('''
+                INSERT INTO video_daily
+                (video_id, crawl_date, view_count, online_count, max_online_count, max_online_time, crawl_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            daily_rows += len(rows)
+
+            if index >= days - history_days:
+                history_rows += _write_online_history(cursor, rng, active, day_start)
+
+            manager._refresh_zone_rollup(cursor, crawl_date)
+            manager._bump_data_version(cursor, crawl_date)
+            conn.commit()
+
+        retire(active)
+        _write_velocity(cursor, rng, active, datetime.fromisoformat(dates[-1]))
+        # 视频直接批量写入 video_info，最后统一建立全文索引
+        manager._sync_search_index(cursor)
+        conn.commit()
+
+    archived = 0
+    if keep_days is not None and manager.archive.available:
+        for crawl_date in manager.get_archivable_dates(dates[max(0, days - keep_days)]):
+            archived += manager.archive_date(crawl_date)
+        manager.vacuum()
+
+    return {
+        "days": days,
+        "videos_per_day": videos_per_day,
+        "videos": video_count,
+        "daily_rows": daily_rows,
+        "online_history_rows": history_rows,
+        "archived_rows": archived,
+        "bytes": os.path.getsize(db_path),
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+
+
+def _write_online_history(cursor, rng: random.Random, videos: List[Dict], day_start: datetime) -> int:
+    """为当天榜单上的视频写入每10分钟一次的在线人数采样"""
+    start_ts = int(day_start.timestamp())
+    rows = []
+    for video in videos:
+        online = video["online"]
+        for step in range(144):
+            online = max(1, int(online * rng.uniform(0.9, 1.1)))
+            rows.append((video["bvid"], start_ts + step * 600, online))
+    cursor.executemany('INSERT OR IGNORE INTO online_history (bvid, sampled_at, online_count) VALUES (?, ?, ?)', rows)
+    return len(rows)
+
+
+def _write_velocity(cursor, rng: random.Random, videos: List[Dict], day_start: datetime):
+    """为最后一天榜单上的视频写入播放量与在线人数的速度"""
+    ts = day_start.timestamp() + 23 * 3600
+    cursor.executemany('''
+        INSERT OR REPLACE INTO video_velocity
+        (bvid, view_ts, view_last, view_velocity, view_acceleration,
+         online_ts, online_last, online_velocity, online_acceleration)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [(
+        video["bvid"], ts, video["view"], video["view"] / 24 * rng.uniform(0.1, 1.0), rng.gauss(0, 500),
+        ts, video["online"], rng.gauss(0, video["online"] / 10), rng.gauss(0, 50),
+    ) for video in videos])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成的热门榜数据库")
+    parser.add_argument("db_path", help="输出的数据库文件")
+    parser.add_argument("--days", type=int, default=365, help="天数")
+    parser.add_argument("--videos-per-day", type=int, default=1000, help="每天榜单上的视频数")
+    parser.add_argument("--end-date", type=date.fromisoformat, default=None, help="最后一天，默认今天")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--history-days", type=int, default=1, help="生成在线人数采样的天数")
+    parser.add_argument("--keep-days", type=int, default=None, help="只在SQLite中保留最近的天数，其余归档")
+    args = parser.parse_args()
+
+    stats = generate(args.db_path, args.days, args.videos_per_day, args.end_date, args.seed,
+                     args.history_days, args.keep_days)
+    print(f"已生成 {args.db_path}: {stats['videos']} 个视频，{stats['daily_rows']} 条每日记录，"
+          f"{stats['online_history_rows']} 条在线人数采样，归档 {stats['archived_rows']} 条，"
+          f"{stats['bytes'] / 1024 / 1024:.1f} MB，耗时 {stats['seconds']} 秒")
+
+
+if __name__ == "__main__":
+    main()
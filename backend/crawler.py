@@ -1,8 +1,9 @@
 import os
 import sys
+import threading
 import time
 from datetime import datetime, date
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 
 # 兼容不同的执行方式
 try:
@@ -12,17 +13,98 @@ except ImportError:
 
 try:
     from .database import db_manager
-    from .utils import validate_bvid
+    from .utils import validate_bvid, parse_online_count
+    from .events import event_relay
+    from .metrics import CRAWL_TASK_SECONDS, CRAWL_QUEUE_DEPTH
+    from .resources import resource_budget
+    from .refresh import online_refresh_planner
 except ImportError:
     from database import db_manager
-    from utils import validate_bvid
+    from utils import validate_bvid, parse_online_count
+    from events import event_relay
+    from metrics import CRAWL_TASK_SECONDS, CRAWL_QUEUE_DEPTH
+    from resources import resource_budget
+    from refresh import online_refresh_planner
 
 
 class CrawlerService:
     """爬虫服务类 - 封装所有爬虫操作"""
     
+    # 每类任务一把锁：同类任务不重叠，热门视频爬取与在线人数更新可以并行
+    TASKS = ("hot_videos", "online_counts")
+    
+    # 在线人数更新时每批预先并行加载视频页的数量
+    PAGE_PREFETCH_BATCH = 8
+    
     def __init__(self):
-        self.is_crawling = False
+        self._task_locks = {task: threading.Lock() for task in self.TASKS}
+        # 每个视频最近一次的在线人数，用于计算推送的增量
+        self._last_online: Dict[str, int] = {}
+    
+    @property
+    def running_tasks(self) -> List[str]:
+        """正在运行的任务"""
+        return [task for task, lock in self._task_locks.items() if lock.locked()]
+    
+    @property
+    def is_crawling(self) -> bool:
+        """是否有任意任务正在运行"""
+        return any(lock.locked() for lock in self._task_locks.values())
+    
+    def is_task_running(self, task: str) -> bool:
+        """指定任务是否正在运行"""
+        return self._task_locks[task].locked()
+    
+    def _publish(self, event: str, data: Dict):
+        """向订阅者推送事件（包括其他进程中的订阅者），推送失败不影响爬虫任务"""
+        try:
+            event_relay.publish(event, data)
+        except Exception as e:
+            print(f"推送事件 {event} 失败: {e}")
+    
+    def _publish_status(self):
+        """推送当前运行状态"""
+        running = self.running_tasks
+        self._publish("status", {
+            "is_crawling": bool(running),
+            "task": running[0] if running else None,
+            "running_tasks": running,
+        })
+    
+    def _report_progress(self, task: str, current: int, total: int):
+        """推送任务进度并更新待处理队列深度"""
+        CRAWL_QUEUE_DEPTH.set(total - current, task=task)
+        self._publish("progress", {"task": task, "current": current, "total": total})
+    
+    def _start_task(self, task: str) -> Optional[Tuple[float, Optional[int]]]:
+        """
+        获取任务锁并记录任务开始
+        
+        Returns:
+            (计时起点, 运行记录ID)；同类任务正在运行时返回None
+        """
+        if not self._task_locks[task].acquire(blocking=False):
+            return None
+        self._publish_status()
+        try:
+            run_id = db_manager.start_task_run(task)
+        except Exception as e:
+            print(f"记录任务 {task} 开始失败: {e}")
+            run_id = None
+        return time.monotonic(), run_id
+    
+    def _finish_task(self, task: str, started_at: float, run_id: Optional[int], success: bool, count: int):
+        """记录任务耗时与结果，恢复空闲状态并推送任务完成事件"""
+        CRAWL_TASK_SECONDS.observe(time.monotonic() - started_at, task=task, success=str(success).lower())
+        CRAWL_QUEUE_DEPTH.set(0, task=task)
+        if run_id is not None:
+            try:
+                db_manager.finish_task_run(run_id, "success" if success else "failed", count)
+            except Exception as e:
+                print(f"记录任务 {task} 结果失败: {e}")
+        self._task_locks[task].release()
+        self._publish_status()
+        self._publish("task_completed", {"task": task, "success": success, "count": count})
     
     def crawl_hot_videos(self, max_videos: int = 100) -> bool:
         """
@@ -34,18 +116,21 @@ class CrawlerService:
         Returns:
             bool: 是否成功
         """
-        if self.is_crawling:
-            print("爬虫正在运行中，跳过本次任务")
+        started = self._start_task("hot_videos")
+        if started is None:
+            print("热门视频爬取任务正在运行中，跳过本次任务")
             return False
         
-        self.is_crawling = True
+        started_at, run_id = started
+        success = False
+        saved_count = 0
         try:
             print(f"开始获取热门视频列表，时间: {datetime.now()}")
             print(f"当前工作目录: {os.getcwd()}")
             print("正在初始化爬虫...")
             sys.stdout.flush()  # 强制刷新输出
             
-            with BilibiliSpider() as spider:
+            with resource_budget.browser_slot("hot_videos"), BilibiliSpider() as spider:
                 print("爬虫初始化成功，开始获取热门视频列表")
                 sys.stdout.flush()
                 
@@ -60,6 +145,7 @@ class CrawlerService:
                 # 为新视频获取详细信息（包含tid_v2和copyright）
                 for i, video in enumerate(valid_videos):
                     bvid = video.get('bvid')
+                    self._report_progress("hot_videos", i + 1, len(valid_videos))
                     if bvid and not db_manager.video_exists(bvid):
                         print(f"正在获取新视频 {bvid} 的详细信息... ({i+1}/{len(valid_videos)})")
                         sys.stdout.flush()
@@ -70,6 +156,8 @@ class CrawlerService:
                             video.update({
                                 'tid_v2': detail.get('tid_v2'),
                                 'copyright': detail.get('copyright'),
+                                'owner_mid': (detail.get('owner') or {}).get('mid'),
+                                'owner_name': (detail.get('owner') or {}).get('name'),
                                 # 保留其他可能有用的信息
                                 'desc': detail.get('desc'),
                                 'duration': detail.get('duration'),
@@ -79,9 +167,6 @@ class CrawlerService:
                             print(f"成功获取视频 {bvid} 详细信息: tid_v2={detail.get('tid_v2')}, copyright={detail.get('copyright')}")
                         else:
                             print(f"获取视频 {bvid} 详细信息失败")
-                        
-                        # 避免请求过快
-                        time.sleep(0.2)  # 减少延迟，快速API可以更频繁请求
                     elif bvid:
                         print(f"视频 {bvid} 已存在，跳过详细信息获取")
                 
@@ -95,6 +180,8 @@ class CrawlerService:
                 print(f"成功保存 {len(valid_videos)} 个视频基础数据到数据库")
                 sys.stdout.flush()
                 
+                success = True
+                saved_count = len(valid_videos)
                 return True
                 
         except Exception as e:
@@ -103,70 +190,129 @@ class CrawlerService:
             traceback.print_exc()
             return False
         finally:
-            self.is_crawling = False
+            self._finish_task("hot_videos", started_at, run_id, success, saved_count)
     
-    def update_online_counts(self) -> bool:
+    def update_online_counts(self, time_budget_seconds: float = 50) -> bool:
         """
-        更新当天所有视频的在线观看人数
+        按优先级刷新当天视频的在线观看人数
+        
+        热门、变化快的视频优先且更频繁地刷新，冷门视频逐步退避；
+        每轮最多运行 time_budget_seconds 秒，未处理完的到期视频留到下一轮（其优先级会继续升高）。
+        每个视频的刷新结果都记录到数据库，任务中断或超出预算后下一次从未刷新的视频继续。
+        
+        Args:
+            time_budget_seconds: 本轮时间预算（秒）
         
         Returns:
             bool: 是否成功
         """
-        if self.is_crawling:
+        started = self._start_task("online_counts")
+        if started is None:
             print("更新在线人数任务正在运行中，跳过本次任务")
             return False
         
-        self.is_crawling = True
+        started_at, run_id = started
+        deadline = started_at + time_budget_seconds
+        success = False
+        success_count = 0
         try:
-            print(f"开始更新当天所有视频的在线人数，时间: {datetime.now()}")
+            print(f"开始更新当天视频的在线人数，时间: {datetime.now()}")
             sys.stdout.flush()
             
-            # 获取当天所有视频
+            # 获取当天所有视频及最近一次采样，挑出到期的视频
             today = date.today().isoformat()
-            videos_to_update = db_manager.get_videos_to_update(today)
+            candidates = db_manager.get_online_refresh_candidates(today)
+            due = online_refresh_planner.plan(candidates)
             
+            # 只保留当天视频的在线人数记录，避免跨日无限增长
+            today_bvids = {candidate["bvid"] for candidate in candidates}
+            self._last_online = {b: c for b, c in self._last_online.items() if b in today_bvids}
+            
+            # 续跑上次未完成的轮次（未再次到期的已刷新视频不会重复），并把到期的视频并入本轮
+            cycle_id, resumed = db_manager.open_refresh_cycle(today, due)
+            if cycle_id is None:
+                print(f"当天 {len(candidates)} 个视频均未到刷新时间")
+                success = True
+                return True
+            
+            # 待刷新视频按当前优先级排序，上次中断时剩下的视频优先级只会更高
+            by_bvid = {candidate["bvid"]: candidate for candidate in candidates}
+            now = time.time()
+            videos_to_update = sorted(
+                (dict(item, priority=online_refresh_planner.priority(by_bvid[item["bvid"]], now))
+                 for item in db_manager.get_pending_refresh_items(cycle_id) if item["bvid"] in by_bvid),
+                key=lambda item: item["priority"], reverse=True
+            )
             if not videos_to_update:
-                print("当天没有需要更新的视频")
+                db_manager.close_refresh_cycle_if_done(cycle_id)
+                success = True
                 return True
                 
-            print(f"找到 {len(videos_to_update)} 个视频需要更新在线人数")
+            print(f"{'续跑' if resumed else '开始'}第 {cycle_id} 轮在线人数刷新，"
+                  f"{len(candidates)} 个视频中有 {len(videos_to_update)} 个待更新")
             sys.stdout.flush()
             
-            with BilibiliSpider() as spider:
+            with resource_budget.browser_slot("online_counts"), BilibiliSpider() as spider:
                 print("爬虫初始化成功，开始更新在线人数")
                 sys.stdout.flush()
                 
-                success_count = 0
-                for i, (bvid, cid) in enumerate(videos_to_update):
+                for i, video in enumerate(videos_to_update):
+                    if time.monotonic() >= deadline:
+                        print(f"本轮时间预算 {time_budget_seconds:.0f} 秒已用完，"
+                              f"剩余 {len(videos_to_update) - i} 个视频留到下一轮")
+                        break
+                    
+                    # 缺少cid的视频需要打开视频页，按批在多个标签页中并行加载
+                    if i % self.PAGE_PREFETCH_BATCH == 0:
+                        batch = videos_to_update[i:i + self.PAGE_PREFETCH_BATCH]
+                        spider.prefetch_cids([
+                            item["bvid"] for item in batch if not item["cid"] and validate_bvid(item["bvid"])
+                        ])
+                    
+                    bvid, cid = video["bvid"], video["cid"]
+                    if not validate_bvid(bvid):
+                        print(f"跳过无效的bvid: {bvid}")
+                        db_manager.record_refresh_item(cycle_id, bvid, False, max_attempts=1)
+                        continue
+                    
+                    refreshed = False
                     try:
-                        if not validate_bvid(bvid):
-                            print(f"跳过无效的bvid: {bvid}")
-                            continue
-                            
-                        print(f"正在更新视频 {bvid} 的在线人数...")
+                        print(f"正在更新视频 {bvid} 的在线人数（优先级 {video['priority']:.2f}）...")
                         sys.stdout.flush()
                         
                         online_count = spider.get_online_total(bvid, cid if cid else -1)
                         
                         # 更新数据库中的在线人数
                         db_manager.update_video_online_count(bvid, str(online_count), today)
+                        refreshed = True
+                        
+                        # 缺少cid时会打开视频页，顺带用页面状态补全视频信息
+                        page_state = spider.pop_page_state(bvid)
+                        if page_state:
+                            db_manager.enrich_video_from_page_state(bvid, today, page_state)
                         
                         print(f"更新进度: {i+1}/{len(videos_to_update)} - {bvid}: {online_count}")
                         sys.stdout.flush()
                         
-                        success_count += 1
+                        self._publish_online_delta(bvid, online_count, today)
+                        self._report_progress("online_counts", i + 1, len(videos_to_update))
                         
-                        # 添加小延迟避免请求过于频繁
-                        time.sleep(1)
+                        success_count += 1
                         
                     except Exception as e:
                         print(f"更新视频 {bvid} 在线人数失败: {e}")
                         sys.stdout.flush()
+                    finally:
+                        # 逐个视频记录断点，任务中断后从未刷新的视频继续
+                        db_manager.record_refresh_item(cycle_id, bvid, refreshed)
                 
+                if db_manager.close_refresh_cycle_if_done(cycle_id):
+                    print(f"第 {cycle_id} 轮在线人数刷新已完成")
                 print(f"完成更新 {success_count}/{len(videos_to_update)} 个视频的在线人数")
                 sys.stdout.flush()
                 
-                return success_count > 0
+                success = success_count > 0
+                return success
                 
         except Exception as e:
             print(f"更新在线人数任务失败: {e}")
@@ -174,7 +320,21 @@ class CrawlerService:
             traceback.print_exc()
             return False
         finally:
-            self.is_crawling = False
+            self._finish_task("online_counts", started_at, run_id, success, success_count)
+    
+    def _publish_online_delta(self, bvid: str, online_count: str, crawl_date: str):
+        """推送单个视频在线人数的变化"""
+        current = parse_online_count(online_count)
+        previous = self._last_online.get(bvid)
+        self._last_online[bvid] = current
+        if previous == current:
+            return
+        self._publish("online_count", {
+            "bvid": bvid,
+            "crawl_date": crawl_date,
+            "online_count": current,
+            "delta": current - previous if previous is not None else None,
+        })
     
     def _validate_and_clean_videos(self, videos: List[Dict]) -> List[Dict]:
         """
@@ -224,6 +384,8 @@ class CrawlerService:
         """获取爬虫状态"""
         return {
             "is_crawling": self.is_crawling,
+            "running_tasks": self.running_tasks,
+            "resources": resource_budget.get_status(),
             "last_update": datetime.now().isoformat()
         }
 
@@ -1,77 +1,469 @@
+import json
+import os
+import re
 import sqlite3
+import time
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Iterator
 from contextlib import contextmanager
 
+try:
+    from .archive import ARCHIVE_COLUMNS, VideoArchive
+    from .metrics import DB_QUERY_SECONDS
+except ImportError:
+    from archive import ARCHIVE_COLUMNS, VideoArchive
+    from metrics import DB_QUERY_SECONDS
+
+
+def timed_query(func):
+    """记录 DatabaseManager 方法耗时的装饰器"""
+    return DB_QUERY_SECONDS.time(method=func.__name__)(func)
+
+
+_LEADING_INTEGER = re.compile(r'\s*[+-]?\d+')
+
+
+def _sqlite_integer(value) -> Optional[int]:
+    """按 SQLite 的 CAST(value AS INTEGER) 规则转换：取开头的整数部分，没有则为0"""
+    if value is None or isinstance(value, int):
+        return value
+    match = _LEADING_INTEGER.match(str(value))
+    return int(match.group()) if match else 0
+
+
+# 中日韩文字没有空格分词，逐字切开后由 unicode61 分词器按单字建立索引，多字检索词作为相邻短语匹配。
+# 用 str.translate 逐字替换，比正则替换快一个数量级
+_CJK_RANGES = ((0x3040, 0x30ff), (0x3400, 0x4dbf), (0x4e00, 0x9fff), (0xac00, 0xd7af), (0xf900, 0xfaff))
+_CJK_SEGMENT_TABLE = {code: f' {chr(code)} ' for low, high in _CJK_RANGES for code in range(low, high + 1)}
+
+
+def _segment_search_text(text: Optional[str]) -> Optional[str]:
+    """在每个中日韩字符两侧加空格，其余文本保持不变（全文索引与检索词使用同一规则）"""
+    if text is None:
+        return None
+    return text.translate(_CJK_SEGMENT_TABLE)
+
 
 class DatabaseManager:
     """数据库管理器 - 封装所有数据库操作"""
     
-    def __init__(self, db_path: str = 'bilibili_videos.db'):
+    # data_versions表中代表全局版本的键
+    ALL_DATES_VERSION_KEY = '*'
+    
+    def __init__(self, db_path: str = 'bilibili_videos.db', archive_dir: Optional[str] = None):
         self.db_path = db_path
+        # 已结束日期的列式归档，默认位于数据库文件旁的 archive 目录
+        self.archive = VideoArchive(
+            archive_dir or os.path.join(os.path.dirname(os.path.abspath(db_path)), 'archive')
+        )
     
     @contextmanager
     def get_connection(self):
         """获取数据库连接的上下文管理器"""
         conn = sqlite3.connect(self.db_path)
+        # 同步全文索引时用该函数切分文本
+        conn.create_function('search_segment', 1, _segment_search_text, deterministic=True)
         try:
             yield conn
         finally:
             conn.close()
     
+    @timed_query
     def init_database(self):
         """初始化数据库表结构"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
-            # 检查表是否存在
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='videos'")
-            table_exists = cursor.fetchone() is not None
+            # 视频维度表：每个视频一行，保存不随日期变化的属性
+            cursor.execute("SELECT name FROM sqlite_master WHERE name='video_info'")
+            info_exists = cursor.fetchone() is not None
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS video_info (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    bvid TEXT UNIQUE,
+                    aid INTEGER,
+                    cid INTEGER,
+                    title TEXT NOT NULL,
+                    pic TEXT,
+                    tid_v2 INTEGER,
+                    copyright INTEGER,
+                    archived_max_online_count INTEGER,
+                    archived_max_online_time TIMESTAMP,
+                    owner_mid INTEGER,
+                    owner_name TEXT,
+                    description TEXT,
+                    first_date TEXT,
+                    last_date TEXT
+                )
+            ''')
+            cursor.execute("PRAGMA table_info(video_info)")
+            has_listing_span = 'first_date' in {col[1] for col in cursor.fetchall()}
+            # 已归档日期中的最高在线人数，每日记录移出SQLite后仍用于计算历史最高
+            self._add_column_if_not_exists(cursor, 'video_info', 'archived_max_online_count', 'INTEGER')
+            self._add_column_if_not_exists(cursor, 'video_info', 'archived_max_online_time', 'TIMESTAMP')
+            # UP主，用于按UP主统计
+            self._add_column_if_not_exists(cursor, 'video_info', 'owner_mid', 'INTEGER')
+            self._add_column_if_not_exists(cursor, 'video_info', 'owner_name', 'TEXT')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_video_info_owner ON video_info(owner_mid)')
+            # 简介与首次/最近上榜日期，用于全文搜索及按日期筛选（不受归档影响）
+            self._add_column_if_not_exists(cursor, 'video_info', 'description', 'TEXT')
+            self._add_column_if_not_exists(cursor, 'video_info', 'first_date', 'TEXT')
+            self._add_column_if_not_exists(cursor, 'video_info', 'last_date', 'TEXT')
             
-            if not table_exists:
-                # 如果表不存在，创建包含所有字段的完整表结构
-                cursor.execute('''
-                    CREATE TABLE videos (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        bvid TEXT,
-                        aid INTEGER,
-                        cid INTEGER,
-                        title TEXT NOT NULL,
-                        pic TEXT,
-                        view_count INTEGER,
-                        online_count TEXT,
-                        crawl_date TEXT NOT NULL,
-                        crawl_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        max_online_count INTEGER DEFAULT 0,
-                        max_online_time TIMESTAMP,
-                        tid_v2 INTEGER,
-                        copyright INTEGER,
-                        UNIQUE(bvid, crawl_date) ON CONFLICT REPLACE
-                    )
+            # 视频每日事实表：每个视频每天一行，只保存当天的统计数据。
+            # online_count 为整数亲和列，纯数字的显示值（绝大多数）以整数存储，"1.2万+" 等保留原字符串
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS video_daily (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    video_id INTEGER NOT NULL REFERENCES video_info(id),
+                    crawl_date TEXT NOT NULL,
+                    view_count INTEGER,
+                    online_count INTEGER,
+                    max_online_count INTEGER DEFAULT 0,
+                    max_online_time TIMESTAMP,
+                    crawl_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(crawl_date, video_id) ON CONFLICT REPLACE
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_video_daily_video ON video_daily(video_id, crawl_date)')
+            
+            # 旧版本把所有字段存在同一张 videos 表中，迁移到维度表 + 事实表
+            cursor.execute("SELECT type FROM sqlite_master WHERE name='videos'")
+            result = cursor.fetchone()
+            migrated = False
+            if result and result[0] == 'table':
+                self._migrate_legacy_videos(cursor)
+                migrated = True
+            
+            # 兼容视图：字段与顺序与旧 videos 表一致，只读查询无需关心拆分后的表结构
+            cursor.execute(f'CREATE VIEW IF NOT EXISTS videos AS {self._VIDEOS_VIEW_SELECT}')
+            
+            # 已归档到 Parquet 的日期，这些日期的每日记录已从 video_daily 中删除
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS archived_dates (
+                    crawl_date TEXT PRIMARY KEY,
+                    row_count INTEGER NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    archived_at REAL NOT NULL
+                )
+            ''')
+            
+            # 已有视频的上榜日期在新增字段或迁移后回填一次
+            if migrated or (info_exists and not has_listing_span):
+                self._backfill_listing_span(cursor)
+            
+            # 标题与简介的全文索引，写入 video_info 时同步
+            self._init_search_index(cursor)
+            
+            # 数据版本表：每次写入递增，用于生成ETag
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS data_versions (
+                    crawl_date TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            
+            # 在线人数历史表：每次采样追加一行，用于绘制趋势曲线
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS online_history (
+                    bvid TEXT NOT NULL,
+                    sampled_at INTEGER NOT NULL,
+                    online_count INTEGER NOT NULL,
+                    PRIMARY KEY (bvid, sampled_at)
+                ) WITHOUT ROWID
+            ''')
+            
+            # 视频速度表：每个视频一行，随每次观测增量更新播放量/在线人数的速度与加速度
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS video_velocity (
+                    bvid TEXT PRIMARY KEY,
+                    view_ts REAL,
+                    view_last INTEGER,
+                    view_velocity REAL,
+                    view_acceleration REAL,
+                    online_ts REAL,
+                    online_last INTEGER,
+                    online_velocity REAL,
+                    online_acceleration REAL
+                )
+            ''')
+            
+            # 租约表：多进程部署时选举唯一的调度主节点
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS leases (
+                    name TEXT PRIMARY KEY,
+                    holder TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            
+            # 任务运行记录：调度器重启后据此恢复上次执行时间
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS task_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    task TEXT NOT NULL,
+                    started_at REAL NOT NULL,
+                    finished_at REAL,
+                    status TEXT NOT NULL,
+                    item_count INTEGER
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_task_runs_task ON task_runs(task, status, started_at)')
+            
+            # 爬虫任务队列：API只负责入队，由爬虫工作进程消费
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS job_queue (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    task TEXT NOT NULL,
+                    payload TEXT,
+                    status TEXT NOT NULL,
+                    enqueued_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    worker_id TEXT,
+                    result TEXT
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_job_queue_status ON job_queue(status, id)')
+            
+            # 在线人数刷新轮次及其中每个视频的进度，任务中断后可从断点继续
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS online_refresh_cycles (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    crawl_date TEXT NOT NULL,
+                    started_at REAL NOT NULL,
+                    finished_at REAL,
+                    status TEXT NOT NULL
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_online_refresh_cycles_date ON online_refresh_cycles(crawl_date, status)')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS online_refresh_items (
+                    cycle_id INTEGER NOT NULL,
+                    bvid TEXT NOT NULL,
+                    cid INTEGER,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    refreshed_at REAL,
+                    PRIMARY KEY (cycle_id, bvid)
+                ) WITHOUT ROWID
+            ''')
+            
+            # 键值设置表（如爬虫配置），供API进程与爬虫工作进程共享
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS settings (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                )
+            ''')
+            
+            # 爬虫事件日志：爬虫所在进程写入，各API进程轮询后转发给本进程的SSE订阅者
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS crawler_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    origin TEXT NOT NULL,
+                    event TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_crawler_events_created ON crawler_events(created_at)')
+            
+            # 分区日汇总表：写入时增量维护，分区统计直接读取汇总行
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='zone_daily_stats'")
+            rollup_exists = cursor.fetchone() is not None
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS zone_daily_stats (
+                    crawl_date TEXT NOT NULL,
+                    tid_v2 INTEGER NOT NULL,
+                    video_count INTEGER NOT NULL DEFAULT 0,
+                    total_views INTEGER NOT NULL DEFAULT 0,
+                    peak_online INTEGER NOT NULL DEFAULT 0,
+                    original_count INTEGER NOT NULL DEFAULT 0,
+                    reprint_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (crawl_date, tid_v2)
+                ) WITHOUT ROWID
+            ''')
+            if not rollup_exists:
+                # 首次创建时从已有数据回填
+                cursor.execute(f'''
+                    INSERT INTO zone_daily_stats
+                    {self._ZONE_ROLLUP_SELECT}
+                    WHERE tid_v2 IS NOT NULL
+                    GROUP BY crawl_date, tid_v2
                 ''')
-            else:
-                # 表已存在，检查并添加缺失的字段
-                cursor.execute("PRAGMA table_info(videos)")
-                existing_columns = {col[1] for col in cursor.fetchall()}
-                
-                # 需要的字段列表
-                required_columns = {
-                    'max_online_count': 'INTEGER DEFAULT 0',
-                    'max_online_time': 'TIMESTAMP',
-                    'tid_v2': 'INTEGER',  # 新增分区tid_v2字段
-                    'copyright': 'INTEGER'  # 新增视频类型字段 (1:原创, 2:转载)
-                }
-                
-                # 添加缺失的字段
-                for column_name, column_def in required_columns.items():
-                    if column_name not in existing_columns:
-                        try:
-                            cursor.execute(f'ALTER TABLE videos ADD COLUMN {column_name} {column_def}')
-                            print(f"已添加字段: {column_name}")
-                        except sqlite3.OperationalError as e:
-                            print(f"添加字段 {column_name} 失败: {e}")
+            elif migrated:
+                # 迁移时维度表用各天的记录补全了分区/类型，重新汇总历史日期
+                cursor.execute('SELECT DISTINCT crawl_date FROM video_daily')
+                for (crawl_date,) in cursor.fetchall():
+                    self._refresh_zone_rollup(cursor, crawl_date)
             
             conn.commit()
+            
+            if migrated:
+                # 旧表删除后的空闲页只有 VACUUM 后才会从文件中释放
+                conn.execute('VACUUM')
+                print("视频数据已迁移到 video_info / video_daily")
+    
+    # 兼容视图 videos 的查询：字段与顺序与旧 videos 表一致
+    _VIDEOS_VIEW_SELECT = '''
+        SELECT d.id, i.bvid, i.aid, i.cid, i.title, i.pic, d.view_count,
+               CAST(d.online_count AS TEXT) AS online_count,
+               d.crawl_date, d.crawl_time, d.max_online_count, d.max_online_time,
+               i.tid_v2, i.copyright
+        FROM video_daily d
+        JOIN video_info i ON i.id = d.video_id
+    '''
+    
+    def _migrate_legacy_videos(self, cursor):
+        """
+        把旧版 videos 表拆分为维度表与每日事实表（与建表处于同一事务）
+        
+        维度表取每个视频最新一天的标题和封面，aid/cid/分区/类型缺失时用其他日期的值补全；
+        事实行保留原有的 id，旧表删除后由同名视图代替。
+        """
+        # 更早的版本缺少部分字段，先补齐再迁移
+        cursor.execute("PRAGMA table_info(videos)")
+        existing_columns = {col[1] for col in cursor.fetchall()}
+        required_columns = {
+            'max_online_count': 'INTEGER DEFAULT 0',
+            'max_online_time': 'TIMESTAMP',
+            'tid_v2': 'INTEGER',  # 分区tid_v2字段
+            'copyright': 'INTEGER'  # 视频类型字段 (1:原创, 2:转载)
+        }
+        for column_name, column_def in required_columns.items():
+            if column_name not in existing_columns:
+                cursor.execute(f'ALTER TABLE videos ADD COLUMN {column_name} {column_def}')
+        
+        cursor.execute('''
+            INSERT INTO video_info (bvid, aid, cid, title, pic, tid_v2, copyright)
+            SELECT v.bvid, COALESCE(NULLIF(v.aid, 0), g.aid, v.aid), COALESCE(NULLIF(v.cid, 0), g.cid, v.cid),
+                   v.title, v.pic, COALESCE(v.tid_v2, g.tid_v2), COALESCE(v.copyright, g.copyright)
+            FROM (
+                SELECT bvid, MAX(id) AS last_id, MAX(NULLIF(aid, 0)) AS aid, MAX(NULLIF(cid, 0)) AS cid,
+                       MAX(tid_v2) AS tid_v2, MAX(copyright) AS copyright
+                FROM videos
+                WHERE bvid IS NOT NULL
+                GROUP BY bvid
+            ) g
+            JOIN videos v ON v.id = g.last_id
+            ORDER BY g.last_id
+        ''')
+        cursor.execute('''
+            INSERT INTO video_daily
+            (id, video_id, crawl_date, view_count, online_count, max_online_count, max_online_time, crawl_time)
+            SELECT v.id, i.id, v.crawl_date, v.view_count, v.online_count,
+                   v.max_online_count, v.max_online_time, v.crawl_time
+            FROM videos v
+            JOIN video_info i ON i.bvid = v.bvid
+        ''')
+        
+        # 没有BV号的记录无法合并，每行单独对应一个维度行
+        cursor.execute('''
+            SELECT id, aid, cid, title, pic, tid_v2, copyright, crawl_date,
+                   view_count, online_count, max_online_count, max_online_time, crawl_time
+            FROM videos WHERE bvid IS NULL
+        ''')
+        for row in cursor.fetchall():
+            cursor.execute('''
+                INSERT INTO video_info (aid, cid, title, pic, tid_v2, copyright) VALUES (?, ?, ?, ?, ?, ?)
+            ''', row[1:7])
+            cursor.execute('''
+                INSERT INTO video_daily
+                (id, video_id, crawl_date, view_count, online_count, max_online_count, max_online_time, crawl_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (row[0], cursor.lastrowid) + row[7:])
+        
+        cursor.execute('DROP TABLE videos')
+    
+    def _backfill_listing_span(self, cursor):
+        """根据每日记录与已归档的日期回填视频的首次/最近上榜日期"""
+        cursor.execute('''
+            UPDATE video_info SET first_date = d.first_date, last_date = d.last_date
+            FROM (
+                SELECT video_id, MIN(crawl_date) AS first_date, MAX(crawl_date) AS last_date
+                FROM video_daily GROUP BY video_id
+            ) AS d
+            WHERE video_info.id = d.video_id
+        ''')
+        cursor.execute('SELECT crawl_date FROM archived_dates ORDER BY crawl_date')
+        archived = [row[0] for row in cursor.fetchall()]
+        if archived and self.archive.available:
+            cursor.executemany('''
+                UPDATE video_info SET
+                    first_date = MIN(COALESCE(first_date, ?1), ?1),
+                    last_date = MAX(COALESCE(last_date, ?2), ?2)
+                WHERE bvid = ?3
+            ''', [
+                (span['first_date'], span['last_date'], span['bvid'])
+                for span in self.archive.aggregate_by_video(archived)
+            ])
+    
+    def _init_search_index(self, cursor):
+        """
+        创建全文索引，并与 video_info 对齐（补齐缺失的行、重建文本已变化的行）
+        
+        索引中保存切分后的文本，由本类在写入 video_info 时同步，不依赖触发器：
+        触发器需要调用自定义的切分函数，其他 SQLite 客户端（命令行、手工修复、迁移脚本）将无法写入 video_info。
+        其他客户端修改的标题与简介在下次启动时由此处对齐。
+        """
+        cursor.execute("SELECT sql FROM sqlite_master WHERE name='video_search'")
+        existing = cursor.fetchone()
+        # 旧版本为无内容索引并由触发器同步，删除后按新结构重建
+        for trigger in ('video_search_insert', 'video_search_delete', 'video_search_update'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        if existing and 'title_source' not in existing[0]:
+            cursor.execute('DROP TABLE video_search')
+        try:
+            # *_source 保存未切分的原文（不建索引），对齐时直接比较原文，无需为每个视频重新切分
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS video_search USING fts5(
+                    title, description,
+                    title_source UNINDEXED, description_source UNINDEXED,
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            print(f"当前 SQLite 不支持 FTS5，搜索将逐行匹配: {e}")
+            return
+        self._sync_search_index(cursor)
+    
+    def _sync_search_index(self, cursor, video_ids: Optional[List[int]] = None):
+        """
+        重建全文索引中的行（需在通过 get_connection 打开的连接上调用）
+        
+        Args:
+            cursor: 数据库游标
+            video_ids: 需要重建的视频ID；为None时与整个 video_info 对齐
+        """
+        if video_ids is None:
+            cursor.execute('DELETE FROM video_search WHERE rowid NOT IN (SELECT id FROM video_info)')
+            cursor.execute('''
+                SELECT i.id FROM video_info i
+                LEFT JOIN video_search s ON s.rowid = i.id
+                WHERE s.rowid IS NULL
+                   OR s.title_source IS NOT i.title
+                   OR s.description_source IS NOT i.description
+            ''')
+            video_ids = [row[0] for row in cursor.fetchall()]
+        for start in range(0, len(video_ids), 500):
+            batch = video_ids[start:start + 500]
+            placeholders = ','.join(['?'] * len(batch))
+            cursor.execute(f'DELETE FROM video_search WHERE rowid IN ({placeholders})', batch)
+            cursor.execute(f'''
+                INSERT INTO video_search (rowid, title, description, title_source, description_source)
+                SELECT id, search_segment(title), search_segment(description), title, description
+                FROM video_info WHERE id IN ({placeholders})
+            ''', batch)
+    
+    def _index_video_text(self, cursor, video_id: int, title: Optional[str], description: Optional[str]):
+        """视频的标题或简介与索引中的不一致时重建该行（每次保存都会写入相同的标题，通常无需重建）"""
+        try:
+            cursor.execute('SELECT title_source, description_source FROM video_search WHERE rowid = ?', (video_id,))
+        except sqlite3.OperationalError:
+            return  # 不支持 FTS5
+        if cursor.fetchone() != (title, description):
+            self._sync_search_index(cursor, [video_id])
     
     def _add_column_if_not_exists(self, cursor, table: str, column: str, column_type: str):
         """安全地添加列（如果不存在）"""
@@ -80,6 +472,7 @@ class DatabaseManager:
         except sqlite3.OperationalError:
             pass  # 字段已存在
     
+    @timed_query
     def save_videos(self, videos: List[Dict], crawl_date: str):
         """批量保存视频数据"""
         with self.get_connection() as conn:
@@ -88,8 +481,49 @@ class DatabaseManager:
             for video in videos:
                 self._save_single_video(cursor, video, crawl_date)
             
+            self._refresh_zone_rollup(cursor, crawl_date)
+            self._bump_data_version(cursor, crawl_date)
             conn.commit()
     
+    # 由 videos 表计算分区日汇总的查询
+    _ZONE_ROLLUP_SELECT = '''
+        SELECT crawl_date, tid_v2,
+               COUNT(*),
+               COALESCE(SUM(view_count), 0),
+               COALESCE(MAX(CAST(online_count AS INTEGER)), 0),
+               COALESCE(SUM(copyright = 1), 0),
+               COALESCE(SUM(copyright = 2), 0)
+        FROM videos
+    '''
+    
+    def _refresh_zone_rollup(self, cursor, crawl_date: str):
+        """
+        重新汇总指定日期的分区统计（与写入处于同一事务）
+        
+        只扫描当天的行；峰值在线人数取已有值与当前值中的较大者，
+        这样在线人数更新期间记录的峰值不会被覆盖。
+        """
+        cursor.execute('''
+            UPDATE zone_daily_stats
+            SET video_count = 0, total_views = 0, original_count = 0, reprint_count = 0
+            WHERE crawl_date = ?
+        ''', (crawl_date,))
+        cursor.execute(f'''
+            INSERT INTO zone_daily_stats
+            (crawl_date, tid_v2, video_count, total_views, peak_online, original_count, reprint_count)
+            {self._ZONE_ROLLUP_SELECT}
+            WHERE crawl_date = ? AND tid_v2 IS NOT NULL
+            GROUP BY tid_v2
+            ON CONFLICT(crawl_date, tid_v2) DO UPDATE SET
+                video_count = excluded.video_count,
+                total_views = excluded.total_views,
+                peak_online = MAX(peak_online, excluded.peak_online),
+                original_count = excluded.original_count,
+                reprint_count = excluded.reprint_count
+        ''', (crawl_date,))
+        # 当天已没有视频的分区
+        cursor.execute('DELETE FROM zone_daily_stats WHERE crawl_date = ? AND video_count = 0', (crawl_date,))
+    
     def _save_single_video(self, cursor, video: Dict, crawl_date: str):
         """保存单个视频数据"""
         try:
@@ -107,36 +541,156 @@ class DatabaseManager:
             cursor, bvid, current_online, current_time
         )
         
-        # 插入或更新视频记录
+        # 插入或更新视频维度行：标题、封面取最新值，其余属性缺失时保留已有值
         cursor.execute('''
-            INSERT OR REPLACE INTO videos 
-            (bvid, aid, cid, title, pic, view_count, online_count, max_online_count, max_online_time, tid_v2, copyright, crawl_date, crawl_time)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO video_info (bvid, aid, cid, title, pic, tid_v2, copyright, owner_mid, owner_name,
+                                    description, first_date, last_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(bvid) DO UPDATE SET
+                aid = COALESCE(NULLIF(excluded.aid, 0), aid, excluded.aid),
+                cid = COALESCE(NULLIF(excluded.cid, 0), cid, excluded.cid),
+                title = excluded.title,
+                pic = COALESCE(excluded.pic, pic),
+                tid_v2 = COALESCE(excluded.tid_v2, tid_v2),
+                copyright = COALESCE(excluded.copyright, copyright),
+                owner_mid = COALESCE(excluded.owner_mid, owner_mid),
+                owner_name = COALESCE(excluded.owner_name, owner_name),
+                description = COALESCE(excluded.description, description),
+                first_date = MIN(COALESCE(first_date, excluded.first_date), excluded.first_date),
+                last_date = MAX(COALESCE(last_date, excluded.last_date), excluded.last_date)
+            RETURNING id, title, description
         ''', (
-            video.get('bvid'),
+            bvid,
             video.get('aid'),
             video.get('cid'),
             video['title'],
             video.get('pic'),
-            video.get('view'),
-            video.get('online_count'),  # 保持原始字符串格式用于显示
-            max_online_count,           # 存储数字格式用于比较
-            max_online_time,
             video.get('tid_v2'),        # 分区tid_v2
             video.get('copyright'),     # 视频类型
+            video.get('owner_mid'),     # UP主
+            video.get('owner_name'),
+            video.get('desc'),          # 简介
+            crawl_date,                 # 首次/最近上榜日期
             crawl_date,
+        ))
+        video_id, title, description = cursor.fetchone()
+        self._index_video_text(cursor, video_id, title, description)
+        
+        # 插入或替换当天的统计行
+        cursor.execute('''
+            INSERT OR REPLACE INTO video_daily
+            (video_id, crawl_date, view_count, online_count, max_online_count, max_online_time, crawl_time)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            video_id,
+            crawl_date,
+            video.get('view'),
+            video.get('online_count'),  # 保持原始显示格式，纯数字以整数存储
+            max_online_count,           # 存储数字格式用于比较
+            max_online_time,
             current_time
         ))
+        
+        if bvid and video.get('view') is not None:
+            self._record_observation(cursor, bvid, 'view', int(video['view']), time.time())
+    
+    # 速度平滑系数（指数加权，越大越偏向最新一次观测）
+    VELOCITY_SMOOTHING = 0.5
+    
+    def _record_observation(self, cursor, bvid: str, kind: str, value: int, ts: float):
+        """
+        根据新观测值增量更新视频的速度与加速度（单位：每小时）
+        
+        每个视频只保存上一次观测值、平滑后的速度和加速度，不回溯历史记录。
+        
+        Args:
+            cursor: 数据库游标
+            bvid: 视频BV号
+            kind: 观测类型，'view' 或 'online'
+            value: 观测值
+            ts: 观测时间戳（秒）
+        """
+        if kind not in ('view', 'online'):
+            raise ValueError(f"未知的观测类型: {kind}")
+        
+        cursor.execute(
+            f'SELECT {kind}_ts, {kind}_last, {kind}_velocity FROM video_velocity WHERE bvid = ?', (bvid,)
+        )
+        row = cursor.fetchone()
+        velocity = acceleration = None
+        if row and row[0] is not None:
+            last_ts, last_value, last_velocity = row
+            hours = (ts - last_ts) / 3600
+            if hours * 3600 < 1:
+                return  # 同一时刻的重复观测
+            instant = (value - last_value) / hours
+            if last_velocity is None:
+                velocity = instant
+            else:
+                alpha = self.VELOCITY_SMOOTHING
+                velocity = alpha * instant + (1 - alpha) * last_velocity
+                acceleration = (velocity - last_velocity) / hours
+        
+        cursor.execute(f'''
+            INSERT INTO video_velocity (bvid, {kind}_ts, {kind}_last, {kind}_velocity, {kind}_acceleration)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(bvid) DO UPDATE SET
+                {kind}_ts = excluded.{kind}_ts,
+                {kind}_last = excluded.{kind}_last,
+                {kind}_velocity = excluded.{kind}_velocity,
+                {kind}_acceleration = excluded.{kind}_acceleration
+        ''', (bvid, ts, value, velocity, acceleration))
     
+    @timed_query
+    def get_rising_videos(self, kind: str = 'view', limit: int = 50,
+                          window_hours: float = 6) -> List[Dict]:
+        """
+        获取加速度最大的视频
+        
+        Args:
+            kind: 'view' 按播放量加速度排序，'online' 按在线人数加速度排序
+            limit: 返回数量
+            window_hours: 只考虑该时间窗口内有观测的视频
+            
+        Returns:
+            视频列表，包含速度、加速度及最新一天的视频信息
+        """
+        if kind not in ('view', 'online'):
+            raise ValueError(f"未知的观测类型: {kind}")
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT vv.bvid, vv.view_velocity, vv.view_acceleration,
+                       vv.online_velocity, vv.online_acceleration,
+                       v.title, v.pic, v.view_count, v.online_count, v.tid_v2, v.crawl_date
+                FROM (
+                    SELECT * FROM video_velocity
+                    WHERE {kind}_acceleration IS NOT NULL AND {kind}_ts >= ?
+                    ORDER BY {kind}_acceleration DESC
+                    LIMIT ?
+                ) AS vv
+                LEFT JOIN videos v ON v.bvid = vv.bvid
+                    AND v.crawl_date = (SELECT MAX(crawl_date) FROM videos WHERE bvid = vv.bvid)
+                ORDER BY vv.{kind}_acceleration DESC
+            ''', (time.time() - window_hours * 3600, limit))
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    
+    @timed_query
     def _get_or_update_max_online(self, cursor, bvid: str, current_online: int, current_time: str) -> Tuple[int, str]:
         """获取或更新最高在线人数记录"""
         cursor.execute('''
             SELECT max_online_count, max_online_time 
             FROM videos 
             WHERE bvid = ? 
+            UNION ALL
+            SELECT archived_max_online_count, archived_max_online_time
+            FROM video_info
+            WHERE bvid = ? AND archived_max_online_count IS NOT NULL
             ORDER BY max_online_count DESC 
             LIMIT 1
-        ''', (bvid,))
+        ''', (bvid, bvid))
         
         result = cursor.fetchone()
         
@@ -154,21 +708,52 @@ class DatabaseManager:
             # 首次记录
             return current_online, current_time
     
+    def _bump_data_version(self, cursor, crawl_date: str):
+        """递增指定日期及全局的数据版本号（与写入处于同一事务）"""
+        cursor.executemany('''
+            INSERT INTO data_versions (crawl_date, version) VALUES (?, 1)
+            ON CONFLICT(crawl_date) DO UPDATE SET version = version + 1
+        ''', [(crawl_date,), (self.ALL_DATES_VERSION_KEY,)])
+    
+    @timed_query
+    def get_data_version(self, crawl_date: Optional[str] = None) -> int:
+        """
+        获取数据版本号
+        
+        Args:
+            crawl_date: 爬取日期，为None时返回全局版本号（任意日期写入都会递增）
+            
+        Returns:
+            版本号，没有任何写入时为0
+        """
+        key = crawl_date if crawl_date is not None else self.ALL_DATES_VERSION_KEY
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute('SELECT version FROM data_versions WHERE crawl_date = ?', (key,))
+            except sqlite3.OperationalError:
+                return 0  # 版本表尚未创建
+            result = cursor.fetchone()
+            return result[0] if result else 0
+    
+    @timed_query
     def video_exists(self, bvid: str) -> bool:
         """检查视频是否已存在于数据库中"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('SELECT 1 FROM videos WHERE bvid = ? LIMIT 1', (bvid,))
+            cursor.execute('SELECT 1 FROM video_info WHERE bvid = ?', (bvid,))
             return cursor.fetchone() is not None
     
+    @timed_query
     def video_has_tid_v2(self, bvid: str) -> bool:
         """检查视频是否已经有tid_v2数据"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('SELECT tid_v2 FROM videos WHERE bvid = ? LIMIT 1', (bvid,))
+            cursor.execute('SELECT tid_v2 FROM video_info WHERE bvid = ?', (bvid,))
             result = cursor.fetchone()
             return result is not None and result[0] is not None
     
+    @timed_query
     def update_video_online_count(self, bvid: str, online_count: str, crawl_date: str):
         """更新单个视频的在线观看人数"""
         try:
@@ -191,66 +776,92 @@ class DatabaseManager:
                 
                 # 更新当天的记录
                 cursor.execute('''
-                    UPDATE videos 
+                    UPDATE video_daily 
                     SET online_count = ?, max_online_count = ?, max_online_time = ?, crawl_time = ?
-                    WHERE bvid = ? AND crawl_date = ?
-                ''', (online_count, max_online_count, max_online_time, current_time, bvid, crawl_date))
+                    WHERE crawl_date = ? AND video_id = (SELECT id FROM video_info WHERE bvid = ?)
+                ''', (online_count, max_online_count, max_online_time, current_time, crawl_date, bvid))
                 
+                if cursor.rowcount:
+                    # 增量更新分区当日峰值
+                    cursor.execute('''
+                        UPDATE zone_daily_stats SET peak_online = MAX(peak_online, ?)
+                        WHERE crawl_date = ?
+                          AND tid_v2 = (SELECT tid_v2 FROM video_info WHERE bvid = ?)
+                    ''', (current_online, crawl_date, bvid))
+                    self._bump_data_version(cursor, crawl_date)
+                
+                self._record_observation(cursor, bvid, 'online', current_online, time.time())
+                
+                # 追加历史采样
+                cursor.execute('''
+                    INSERT OR REPLACE INTO online_history (bvid, sampled_at, online_count)
+                    VALUES (?, ?, ?)
+                ''', (bvid, int(time.time()), current_online))
                 conn.commit()
                 
             except Exception as e:
                 print(f"更新视频 {bvid} 在线人数时出错: {e}")
                 raise
     
+    @timed_query
+    def get_online_history(self, bvid: str,
+                           start_ts: Optional[int] = None,
+                           end_ts: Optional[int] = None) -> List[Tuple[int, int]]:
+        """
+        获取视频的在线人数历史采样
+        
+        Args:
+            bvid: 视频BV号
+            start_ts: 起始时间戳（秒，含），为None时不限制
+            end_ts: 结束时间戳（秒，含），为None时不限制
+            
+        Returns:
+            按时间升序的 (时间戳, 在线人数) 列表
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT sampled_at, online_count FROM online_history
+                WHERE bvid = ? AND sampled_at BETWEEN ? AND ?
+                ORDER BY sampled_at
+            ''', (bvid,
+                  start_ts if start_ts is not None else 0,
+                  end_ts if end_ts is not None else 2 ** 62))
+            return cursor.fetchall()
+    
+    @timed_query
     def get_videos_by_date(self, date: Optional[str] = None, 
                           sort_by: str = "view_count", 
                           order: str = "desc",
                           main_zone: Optional[str] = None,
                           sub_zone: Optional[str] = None) -> List[Dict]:
-        """根据日期获取视频列表，支持分区筛选"""
+        """根据日期获取视频列表，支持分区筛选（已归档的日期从归档读取）"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
+            if not date:
+                # 获取最新日期的数据
+                date = self._latest_crawl_date(cursor)
+                if date is None:
+                    return []
+            
+            if self._is_archived(cursor, date):
+                return self._get_archived_videos(date, sort_by, order, main_zone, sub_zone)
+            
             # 动态获取表的字段信息，确保字段顺序正确
             cursor.execute("PRAGMA table_info(videos)")
             columns_info = cursor.fetchall()
             columns = [col[1] for col in columns_info]  # 获取字段名列表
             
             # 构建查询语句和参数
-            params = []
-            where_clauses = []
-            
-            # 日期筛选
-            if date:
-                where_clauses.append("crawl_date = ?")
-                params.append(date)
-            else:
-                # 获取最新日期的数据
-                where_clauses.append("crawl_date = (SELECT MAX(crawl_date) FROM videos)")
+            where_clauses = ["crawl_date = ?"]
+            params = [date]
             
             # 分区筛选
-            if sub_zone:
-                # 如果指定了子分区，直接筛选子分区
-                where_clauses.append("tid_v2 = ?")
-                params.append(int(sub_zone))
-            elif main_zone:
-                # 如果只指定了主分区，需要获取该主分区下的所有子分区ID
-                sub_zone_ids = self._get_sub_zone_ids(main_zone)
-                if sub_zone_ids:
-                    placeholders = ','.join(['?'] * len(sub_zone_ids))
-                    where_clauses.append(f"tid_v2 IN ({placeholders})")
-                    params.extend(sub_zone_ids)
-                else:
-                    # 如果主分区没有子分区，直接筛选主分区ID
-                    where_clauses.append("tid_v2 = ?")
-                    params.append(int(main_zone))
+            self._append_zone_filter(where_clauses, params, main_zone, sub_zone)
             
             # 构建完整的查询语句
-            base_query = "SELECT * FROM videos"
-            if where_clauses:
-                query = f"{base_query} WHERE {' AND '.join(where_clauses)}"
-            else:
-                query = base_query
+            query = f"SELECT * FROM videos WHERE {' AND '.join(where_clauses)}"
             
             # 添加排序
             query += self._build_order_clause(sort_by, order)
@@ -261,6 +872,112 @@ class DatabaseManager:
             # 转换为字典列表 - 使用动态获取的字段顺序
             return [dict(zip(columns, row)) for row in rows]
     
+    def _latest_crawl_date(self, cursor) -> Optional[str]:
+        """最新的爬取日期（包括已归档的日期）"""
+        cursor.execute('''
+            SELECT MAX(crawl_date) FROM (
+                SELECT MAX(crawl_date) AS crawl_date FROM video_daily
+                UNION ALL
+                SELECT MAX(crawl_date) FROM archived_dates
+            )
+        ''')
+        return cursor.fetchone()[0]
+    
+    def _is_archived(self, cursor, crawl_date: str) -> bool:
+        cursor.execute('SELECT 1 FROM archived_dates WHERE crawl_date = ?', (crawl_date,))
+        return cursor.fetchone() is not None
+    
+    def _archived_dates_between(self, cursor, start_date: str, end_date: str) -> List[str]:
+        cursor.execute('''
+            SELECT crawl_date FROM archived_dates
+            WHERE crawl_date BETWEEN ? AND ?
+            ORDER BY crawl_date
+        ''', (start_date, end_date))
+        return [row[0] for row in cursor.fetchall()]
+    
+    def _get_archived_videos(self, date: str, sort_by: str, order: str,
+                             main_zone: Optional[str], sub_zone: Optional[str]) -> List[Dict]:
+        """从归档读取某天的视频，筛选与排序规则与 SQLite 查询一致"""
+        rows = self.archive.read_rows(date, tid_v2_in=self.resolve_zone_ids(main_zone, sub_zone))
+        
+        if sort_by == "online_count":
+            key = lambda row: _sqlite_integer(row['online_count'])
+        elif sort_by in ("max_online_count", "view_count", "title"):
+            key = lambda row: row[sort_by]
+        else:
+            key, order = (lambda row: row['view_count']), "desc"
+        
+        # 与 _build_order_clause 一致：NULL 视为最小值；归档行已按ID排序，稳定排序保证相同值按ID升序
+        rows.sort(key=lambda row: (key(row) is not None, key(row)), reverse=order.upper() == "DESC")
+        return rows
+    
+    def resolve_zone_ids(self, main_zone: Optional[str], sub_zone: Optional[str]) -> Optional[List[int]]:
+        """分区筛选对应的 tid_v2 列表，未筛选时返回None"""
+        if sub_zone:
+            # 如果指定了子分区，直接筛选子分区
+            return [int(sub_zone)]
+        if main_zone:
+            # 如果只指定了主分区，需要获取该主分区下的所有子分区ID；主分区没有子分区时直接筛选主分区ID
+            return self._get_sub_zone_ids(main_zone) or [int(main_zone)]
+        return None
+    
+    def _append_zone_filter(self, where_clauses: List[str], params: List,
+                            main_zone: Optional[str], sub_zone: Optional[str]):
+        """向查询条件中追加分区筛选"""
+        zone_ids = self.resolve_zone_ids(main_zone, sub_zone)
+        if zone_ids is not None:
+            where_clauses.append(f"tid_v2 IN ({','.join(['?'] * len(zone_ids))})")
+            params.extend(zone_ids)
+    
+    def iter_videos_in_range(self, start_date: str, end_date: str,
+                             zone_ids: Optional[List[int]] = None,
+                             batch_size: int = 500) -> Iterator[Tuple[List[str], List[tuple]]]:
+        """
+        按日期范围分批读取视频记录，用于流式导出
+        
+        使用服务端游标逐批 fetchmany，内存占用与日期范围大小无关；已归档的日期按批读取归档文件。
+        连接在生成器耗尽或被关闭时释放。
+        
+        Args:
+            start_date: 起始日期（含），格式YYYY-MM-DD
+            end_date: 结束日期（含），格式YYYY-MM-DD
+            zone_ids: 分区ID列表（由 resolve_zone_ids 解析，调用方需在开始流式输出前校验分区参数）
+            batch_size: 每批读取的行数
+            
+        Yields:
+            (字段名列表, 该批记录) 元组
+        """
+        # 流式响应会在线程池的不同线程中推进生成器，因此关闭同线程检查
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        try:
+            cursor = conn.cursor()
+            archived = self._archived_dates_between(cursor, start_date, end_date)
+            cursor.execute('SELECT DISTINCT crawl_date FROM video_daily WHERE crawl_date BETWEEN ? AND ?',
+                           (start_date, end_date))
+            hot = [row[0] for row in cursor.fetchall()]
+            
+            # 按日期顺序逐日读取，每天的数据来自归档或 SQLite
+            for crawl_date in sorted(set(archived) | set(hot)):
+                if crawl_date in archived:
+                    for rows in self.archive.iter_batches(crawl_date, zone_ids, batch_size):
+                        yield list(ARCHIVE_COLUMNS), rows
+                    continue
+                
+                where_clauses = ["crawl_date = ?"]
+                params: List = [crawl_date]
+                if zone_ids is not None:
+                    where_clauses.append(f"tid_v2 IN ({','.join(['?'] * len(zone_ids))})")
+                    params.extend(zone_ids)
+                cursor.execute(f"SELECT * FROM videos WHERE {' AND '.join(where_clauses)} ORDER BY id", params)
+                columns = [desc[0] for desc in cursor.description]
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield columns, rows
+        finally:
+            conn.close()
+    
     def _get_sub_zone_ids(self, main_zone_id: str) -> List[int]:
         """获取指定主分区下的所有子分区ID"""
         # B站分区映射 - 这里使用硬编码的映射关系
@@ -302,27 +1019,258 @@ class DatabaseManager:
         return zone_mapping.get(main_zone_id, [])
     
     def _build_order_clause(self, sort_by: str, order: str) -> str:
-        """构建排序子句"""
+        """构建排序子句（排序值相同时按记录ID排序，结果与表结构和索引无关）"""
         order_upper = order.upper()
         
         if sort_by == "online_count":
-            return f" ORDER BY CAST(online_count AS INTEGER) {order_upper}"
+            return f" ORDER BY CAST(online_count AS INTEGER) {order_upper}, id"
         elif sort_by == "max_online_count":
-            return f" ORDER BY max_online_count {order_upper}"
+            return f" ORDER BY max_online_count {order_upper}, id"
         elif sort_by == "view_count":
-            return f" ORDER BY view_count {order_upper}"
+            return f" ORDER BY view_count {order_upper}, id"
         elif sort_by == "title":
-            return f" ORDER BY title {order_upper}"
+            return f" ORDER BY title {order_upper}, id"
         else:
-            return " ORDER BY view_count DESC"
+            return " ORDER BY view_count DESC, id"
+    
+    # 排行榜支持的指标及对应的聚合表达式
+    LEADERBOARD_METRICS = {
+        'days_on_list': 'COUNT(*)',
+        'peak_online': 'MAX(max_online_count)',
+        'view_growth': 'MAX(view_count) - MIN(view_count)',
+    }
+    
+    @timed_query
+    def get_leaderboard(self, start_date: str, end_date: str,
+                        metric: str = 'days_on_list',
+                        zone: Optional[str] = None,
+                        limit: int = 50) -> List[Dict]:
+        """
+        按视频聚合日期范围内的数据并返回排行前K名
+        
+        聚合只读取该日期段的每日统计窄行，随后仅为前K个视频取最新一天的展示字段。
+        
+        Args:
+            start_date: 起始日期（含），格式YYYY-MM-DD
+            end_date: 结束日期（含），格式YYYY-MM-DD
+            metric: 排序指标，见 LEADERBOARD_METRICS
+            zone: 分区ID，主分区会展开为其全部子分区
+            limit: 返回数量
+            
+        Returns:
+            视频列表，包含聚合指标与最新一天的视频信息
+        """
+        if metric not in self.LEADERBOARD_METRICS:
+            raise ValueError(f"不支持的排行指标: {metric}")
+        
+        where_clauses = ["crawl_date BETWEEN ? AND ?", "bvid IS NOT NULL"]
+        params: List = [start_date, end_date]
+        self._append_zone_filter(where_clauses, params, zone, None)
+        where_sql = ' AND '.join(where_clauses)
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            archived = self._archived_dates_between(cursor, start_date, end_date)
+            if archived:
+                ranking = self._merge_archived_leaderboard(cursor, where_sql, params, archived, zone, metric, limit)
+            else:
+                cursor.execute(f'''
+                    SELECT bvid,
+                           COUNT(*) AS days_on_list,
+                           MAX(max_online_count) AS peak_online,
+                           MAX(view_count) - MIN(view_count) AS view_growth,
+                           MIN(crawl_date) AS first_date,
+                           MAX(crawl_date) AS last_date
+                    FROM videos
+                    WHERE {where_sql}
+                    GROUP BY bvid
+                    ORDER BY {self.LEADERBOARD_METRICS[metric]} DESC, bvid
+                    LIMIT ?
+                ''', params + [limit])
+                columns = [desc[0] for desc in cursor.description]
+                ranking = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            if not ranking:
+                return []
+            
+            # 仅为上榜视频取最新一天的展示字段：按BV号查 video_info，再按 (crawl_date, video_id) 唯一索引取当天的行。
+            # 不能经 videos 视图按 (bvid, crawl_date) 过滤，视图上的该条件无法使用索引，会扫描全部每日记录
+            cursor.execute(f'''
+                WITH wanted(bvid, crawl_date) AS (VALUES {','.join(['(?, ?)'] * len(ranking))})
+                SELECT i.bvid, i.aid, i.title, i.pic, d.view_count, i.tid_v2, i.copyright
+                FROM wanted w
+                JOIN video_info i ON i.bvid = w.bvid
+                JOIN video_daily d ON d.video_id = i.id AND d.crawl_date = w.crawl_date
+            ''', [value for item in ranking for value in (item['bvid'], item['last_date'])])
+            detail_columns = [desc[0] for desc in cursor.description]
+            details = {row[0]: dict(zip(detail_columns, row)) for row in cursor.fetchall()}
+            missing = [item for item in ranking if item['bvid'] not in details]
+            if missing:
+                details.update(self._archived_leaderboard_details(cursor, missing))
+            
+            for item in ranking:
+                item.update(details.get(item['bvid'], {}))
+            return ranking
+    
+    def _merge_archived_leaderboard(self, cursor, where_sql: str, params: List, archived: List[str],
+                                    zone: Optional[str], metric: str, limit: int) -> List[Dict]:
+        """合并 SQLite 与归档中按视频聚合的部分结果，再按指标排序取前K名"""
+        cursor.execute(f'''
+            SELECT bvid,
+                   COUNT(*) AS days_on_list,
+                   MAX(max_online_count) AS peak_online,
+                   MAX(view_count) AS max_view,
+                   MIN(view_count) AS min_view,
+                   MIN(crawl_date) AS first_date,
+                   MAX(crawl_date) AS last_date
+            FROM videos
+            WHERE {where_sql}
+            GROUP BY bvid
+        ''', params)
+        columns = [desc[0] for desc in cursor.description]
+        partials = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        partials.extend(self.archive.aggregate_by_video(archived, self.resolve_zone_ids(zone, None)))
+        
+        merged: Dict[str, Dict] = {}
+        for part in partials:
+            item = merged.get(part['bvid'])
+            if item is None:
+                merged[part['bvid']] = dict(part)
+                continue
+            item['days_on_list'] += part['days_on_list']
+            for key, pick in (('peak_online', max), ('max_view', max), ('min_view', min),
+                              ('first_date', min), ('last_date', max)):
+                values = [value for value in (item[key], part[key]) if value is not None]
+                item[key] = pick(values) if values else None
+        
+        ranking = [{
+            'bvid': item['bvid'],
+            'days_on_list': item['days_on_list'],
+            'peak_online': item['peak_online'],
+            'view_growth': (item['max_view'] - item['min_view']
+                            if item['max_view'] is not None and item['min_view'] is not None else None),
+            'first_date': item['first_date'],
+            'last_date': item['last_date'],
+        } for item in merged.values()]
+        # 与 SQL 一致：按指标降序（NULL 在最后），相同时按BV号升序
+        ranking.sort(key=lambda item: item['bvid'])
+        ranking.sort(key=lambda item: (item[metric] is not None, item[metric]), reverse=True)
+        return ranking[:limit]
+    
+    def _archived_leaderboard_details(self, cursor, items: List[Dict]) -> Dict[str, Dict]:
+        """最新一天已归档的上榜视频：播放量取自归档，其余展示字段取自视频维度表"""
+        bvids = [item['bvid'] for item in items]
+        cursor.execute(f'''
+            SELECT bvid, aid, title, pic, tid_v2, copyright FROM video_info
+            WHERE bvid IN ({','.join(['?'] * len(bvids))})
+        ''', bvids)
+        static = {row[0]: row for row in cursor.fetchall()}
+        
+        views: Dict[str, Optional[int]] = {}
+        by_date: Dict[str, List[str]] = {}
+        for item in items:
+            by_date.setdefault(item['last_date'], []).append(item['bvid'])
+        for crawl_date, date_bvids in by_date.items():
+            for row in self.archive.read_rows(crawl_date, ['bvid', 'view_count'], bvid_in=date_bvids):
+                views[row['bvid']] = row['view_count']
+        
+        details = {}
+        for bvid, (_, aid, title, pic, tid_v2, copyright) in static.items():
+            details[bvid] = {
+                'bvid': bvid, 'aid': aid, 'title': title, 'pic': pic,
+                'view_count': views.get(bvid), 'tid_v2': tid_v2, 'copyright': copyright,
+            }
+        return details
+    
+    @timed_query
+    def search_videos(self, query: str,
+                      start_date: Optional[str] = None,
+                      end_date: Optional[str] = None,
+                      zone: Optional[str] = None,
+                      limit: int = 20,
+                      offset: int = 0) -> List[Dict]:
+        """
+        按标题与简介全文搜索视频，按 BM25 相关度排序（标题权重高于简介）
+        
+        检索词以空白分隔，须全部出现：中文按连续字符匹配，英文单词按前缀匹配，不区分大小写。
+        当前 SQLite 不支持 FTS5 时退化为逐行子串匹配，按最近上榜日期排序。
+        
+        Args:
+            query: 检索词
+            start_date: 起始日期（含），只返回在榜期间与日期范围有交集的视频
+            end_date: 结束日期（含）
+            zone: 分区ID，主分区会展开为其全部子分区
+            limit: 返回数量
+            offset: 跳过的数量，用于分页
+            
+        Returns:
+            视频列表，score 为相关度（越大越相关，逐行匹配时为None）
+        """
+        # 只由标点组成的检索词不产生任何词元，忽略
+        terms = [term for term in query.split() if re.search(r'\w', term)]
+        if not terms:
+            return []
+        
+        where_clauses: List[str] = []
+        params: List = []
+        if start_date:
+            where_clauses.append("i.last_date >= ?")
+            params.append(start_date)
+        if end_date:
+            where_clauses.append("i.first_date <= ?")
+            params.append(end_date)
+        zone_ids = self.resolve_zone_ids(zone, None)
+        if zone_ids is not None:
+            where_clauses.append(f"i.tid_v2 IN ({','.join(['?'] * len(zone_ids))})")
+            params.extend(zone_ids)
+        
+        columns = '''
+            i.bvid, i.aid, i.title, i.pic, i.description, i.tid_v2, i.copyright,
+            i.owner_mid, i.owner_name, i.first_date, i.last_date
+        '''
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name='video_search'")
+            if cursor.fetchone() is not None:
+                # 每个检索词作为一个短语（末尾单词按前缀匹配），用户输入不会被解析为 FTS5 查询语法
+                match = ' '.join('"' + _segment_search_text(term).replace('"', '""') + '" *' for term in terms)
+                where_sql = ' AND '.join(['video_search MATCH ?'] + where_clauses)
+                cursor.execute(f'''
+                    SELECT {columns}, -bm25(video_search, 10.0, 1.0, 0.0, 0.0) AS score
+                    FROM video_search
+                    JOIN video_info i ON i.id = video_search.rowid
+                    WHERE {where_sql}
+                    ORDER BY score DESC, i.id
+                    LIMIT ? OFFSET ?
+                ''', [match] + params + [limit, offset])
+            else:
+                for term in terms:
+                    pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+                    where_clauses.append("(i.title LIKE ? ESCAPE '\\' OR i.description LIKE ? ESCAPE '\\')")
+                    params.extend([pattern, pattern])
+                cursor.execute(f'''
+                    SELECT {columns}, NULL AS score
+                    FROM video_info i
+                    WHERE {' AND '.join(where_clauses)}
+                    ORDER BY i.last_date DESC, i.id
+                    LIMIT ? OFFSET ?
+                ''', params + [limit, offset])
+            result_columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(result_columns, row)) for row in cursor.fetchall()]
     
+    @timed_query
     def get_available_dates(self) -> List[str]:
-        """获取可用的爬取日期列表"""
+        """获取可用的爬取日期列表（包括已归档的日期）"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT DISTINCT crawl_date FROM videos ORDER BY crawl_date DESC")
+            cursor.execute('''
+                SELECT crawl_date FROM video_daily
+                UNION
+                SELECT crawl_date FROM archived_dates
+                ORDER BY crawl_date DESC
+            ''')
             return [row[0] for row in cursor.fetchall()]
     
+    @timed_query
     def get_videos_to_update(self, crawl_date: str) -> List[Tuple[str, int]]:
         """获取需要更新在线人数的视频列表"""
         with self.get_connection() as conn:
@@ -335,7 +1283,75 @@ class DatabaseManager:
             ''', (crawl_date,))
             
             return cursor.fetchall()
+    
+    @timed_query
+    def enrich_video_from_page_state(self, bvid: str, crawl_date: str, state: Dict) -> bool:
+        """
+        用视频页的页面状态补全视频记录：只填充缺失的aid/cid/分区/类型/UP主，播放量取较大值
+        
+        Args:
+            bvid: 视频BV号
+            crawl_date: 日期
+            state: BilibiliSpider.get_page_state 返回的字典
+            
+        Returns:
+            是否更新了记录
+        """
+        cids = state.get('cids') or []
+        view = (state.get('stat') or {}).get('view')
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE video_daily SET view_count = MAX(COALESCE(view_count, 0), COALESCE(?, 0))
+                WHERE crawl_date = ? AND video_id = (SELECT id FROM video_info WHERE bvid = ?)
+            ''', (view, crawl_date, bvid))
+            if cursor.rowcount == 0:
+                return False
+            cursor.execute('''
+                UPDATE video_info SET
+                    aid = CASE WHEN aid IS NULL OR aid = 0 THEN COALESCE(?, aid) ELSE aid END,
+                    cid = CASE WHEN cid IS NULL OR cid = 0 THEN COALESCE(?, cid) ELSE cid END,
+                    tid_v2 = COALESCE(tid_v2, ?),
+                    copyright = COALESCE(copyright, ?),
+                    owner_mid = COALESCE(owner_mid, ?),
+                    owner_name = COALESCE(owner_name, ?)
+                WHERE bvid = ?
+            ''', (
+                state.get('aid'), cids[0] if cids else None, state.get('tid_v2'),
+                state.get('copyright'), state.get('owner_mid'), state.get('owner_name'), bvid,
+            ))
+            
+            if view is not None:
+                self._record_observation(cursor, bvid, 'view', int(view), time.time())
+            # 分区或类型可能由空变为有值，重新汇总当天的分区统计
+            self._refresh_zone_rollup(cursor, crawl_date)
+            self._bump_data_version(cursor, crawl_date)
+            conn.commit()
+            return True
+    
+    @timed_query
+    def get_online_refresh_candidates(self, crawl_date: str) -> List[Dict]:
+        """
+        获取当天所有视频及其最近一次在线人数采样，用于按优先级安排刷新
+        
+        Returns:
+            每项包含 bvid、cid、online_ts、online_last、online_velocity（从未采样时为None）
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT v.bvid, v.cid, vv.online_ts, vv.online_last, vv.online_velocity
+                FROM (
+                    SELECT bvid, MIN(cid) AS cid FROM videos
+                    WHERE crawl_date = ? AND bvid IS NOT NULL
+                    GROUP BY bvid
+                ) v
+                LEFT JOIN video_velocity vv ON vv.bvid = v.bvid
+            ''', (crawl_date,))
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
 
+    @timed_query
     def get_zone_statistics(self, crawl_date: Optional[str] = None) -> Dict[str, int]:
         """
         获取分区统计信息
@@ -351,18 +1367,15 @@ class DatabaseManager:
             
             if crawl_date is None:
                 # 获取最新日期
-                cursor.execute("SELECT crawl_date FROM videos ORDER BY crawl_date DESC LIMIT 1")
-                result = cursor.fetchone()
-                if not result:
+                crawl_date = self._latest_crawl_date(cursor)
+                if crawl_date is None:
                     return {}
-                crawl_date = result[0]
             
-            # 统计每个分区的视频数量
+            # 从分区日汇总表读取每个分区的视频数量
             cursor.execute('''
-                SELECT tid_v2, COUNT(*) as video_count
-                FROM videos 
-                WHERE crawl_date = ? AND tid_v2 IS NOT NULL
-                GROUP BY tid_v2
+                SELECT tid_v2, video_count
+                FROM zone_daily_stats
+                WHERE crawl_date = ?
                 ORDER BY tid_v2
             ''', (crawl_date,))
             
@@ -373,6 +1386,537 @@ class DatabaseManager:
                 zone_stats[str(tid_v2)] = count
                 
             return zone_stats
+    
+    @timed_query
+    def get_zone_statistics_range(self, start_date: str, end_date: str,
+                                  zone: Optional[str] = None) -> List[Dict]:
+        """
+        获取日期范围内的分区日汇总
+        
+        Args:
+            start_date: 起始日期（含），格式YYYY-MM-DD
+            end_date: 结束日期（含），格式YYYY-MM-DD
+            zone: 分区ID，主分区会展开为其全部子分区
+            
+        Returns:
+            按日期、分区排序的汇总行列表
+        """
+        where_clauses = ["crawl_date BETWEEN ? AND ?"]
+        params: List = [start_date, end_date]
+        self._append_zone_filter(where_clauses, params, zone, None)
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT crawl_date, tid_v2, video_count, total_views, peak_online, original_count, reprint_count
+                FROM zone_daily_stats
+                WHERE {' AND '.join(where_clauses)}
+                ORDER BY crawl_date, tid_v2
+            ''', params)
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    
+    @timed_query
+    def try_acquire_lease(self, name: str, holder: str, ttl_seconds: float) -> bool:
+        """
+        获取或续期租约
+        
+        租约空闲、已过期或本来就由 holder 持有时成功，单条UPSERT语句保证原子性。
+        
+        Args:
+            name: 租约名
+            holder: 持有者标识
+            ttl_seconds: 租约有效期
+            
+        Returns:
+            是否持有租约
+        """
+        now = time.time()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    holder = excluded.holder,
+                    expires_at = excluded.expires_at
+                WHERE leases.holder = excluded.holder OR leases.expires_at < ?
+            ''', (name, holder, now + ttl_seconds, now))
+            conn.commit()
+            return cursor.rowcount > 0
+    
+    @timed_query
+    def release_lease(self, name: str, holder: str):
+        """释放租约（仅当仍由 holder 持有时）"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM leases WHERE name = ? AND holder = ?', (name, holder))
+            conn.commit()
+    
+    @timed_query
+    def get_lease(self, name: str) -> Optional[Dict]:
+        """获取租约当前的持有者与到期时间"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT holder, expires_at FROM leases WHERE name = ?', (name,))
+            result = cursor.fetchone()
+            if not result:
+                return None
+            return {"holder": result[0], "expires_at": result[1]}
+
+    @timed_query
+    def append_event(self, origin: str, event: str, data: Dict, retention_seconds: float = 600) -> int:
+        """
+        写入一条爬虫事件，并清理超过保留时间的旧事件
+        
+        Args:
+            origin: 发布事件的进程标识
+            event: 事件名
+            data: 事件数据
+            retention_seconds: 事件保留时间（秒）
+        
+        Returns:
+            事件ID
+        """
+        now = time.time()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'INSERT INTO crawler_events (origin, event, data, created_at) VALUES (?, ?, ?, ?)',
+                (origin, event, json.dumps(data, ensure_ascii=False), now)
+            )
+            event_id = cursor.lastrowid
+            cursor.execute('DELETE FROM crawler_events WHERE created_at < ?', (now - retention_seconds,))
+            conn.commit()
+            return event_id
+    
+    @timed_query
+    def get_events_after(self, after_id: int, exclude_origin: Optional[str] = None, limit: int = 500) -> List[Dict]:
+        """获取ID大于 after_id 的爬虫事件（按ID升序），可排除指定进程写入的事件"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, event, data FROM crawler_events
+                WHERE id > ? AND origin IS NOT ? ORDER BY id LIMIT ?
+            ''', (after_id, exclude_origin, limit))
+            return [{"id": row[0], "event": row[1], "data": json.loads(row[2])} for row in cursor.fetchall()]
+    
+    @timed_query
+    def get_latest_event(self, event: Optional[str] = None) -> Optional[Dict]:
+        """获取最近一条爬虫事件（可指定事件名），没有时返回None"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            if event is None:
+                cursor.execute('SELECT id, event, data FROM crawler_events ORDER BY id DESC LIMIT 1')
+            else:
+                cursor.execute(
+                    'SELECT id, event, data FROM crawler_events WHERE event = ? ORDER BY id DESC LIMIT 1',
+                    (event,)
+                )
+            row = cursor.fetchone()
+            if not row:
+                return None
+            return {"id": row[0], "event": row[1], "data": json.loads(row[2])}
+
+
+    @timed_query
+    def start_task_run(self, task: str) -> int:
+        """记录任务开始，返回运行记录ID"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO task_runs (task, started_at, status) VALUES (?, ?, 'running')",
+                (task, time.time())
+            )
+            conn.commit()
+            return cursor.lastrowid
+    
+    @timed_query
+    def finish_task_run(self, run_id: int, status: str, item_count: Optional[int] = None):
+        """记录任务结束"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'UPDATE task_runs SET finished_at = ?, status = ?, item_count = ? WHERE id = ?',
+                (time.time(), status, item_count, run_id)
+            )
+            conn.commit()
+    
+    @timed_query
+    def mark_interrupted_task_runs(self) -> int:
+        """将进程退出前未结束的运行记录标记为中断，返回标记的条数"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE task_runs SET status = 'interrupted' WHERE status = 'running'")
+            conn.commit()
+            return cursor.rowcount
+    
+    @timed_query
+    def get_last_task_run(self, task: str, status: Optional[str] = None) -> Optional[Dict]:
+        """获取任务最近一次运行记录，可按状态筛选"""
+        query = 'SELECT * FROM task_runs WHERE task = ?'
+        params: List = [task]
+        if status:
+            query += ' AND status = ?'
+            params.append(status)
+        query += ' ORDER BY started_at DESC LIMIT 1'
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            row = cursor.fetchone()
+            if not row:
+                return None
+            return dict(zip([desc[0] for desc in cursor.description], row))
+    
+    @timed_query
+    def get_task_runs(self, task: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        """获取最近的任务运行记录"""
+        query = 'SELECT * FROM task_runs'
+        params: List = []
+        if task:
+            query += ' WHERE task = ?'
+            params.append(task)
+        query += ' ORDER BY started_at DESC LIMIT ?'
+        params.append(limit)
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    
+    @timed_query
+    def enqueue_job(self, task: str, payload: Optional[Dict] = None,
+                    dedupe_statuses: Tuple[str, ...] = ('queued',)) -> Tuple[int, bool]:
+        """
+        将任务加入队列
+        
+        Args:
+            task: 任务名
+            payload: 任务参数
+            dedupe_statuses: 同名任务处于这些状态时不重复入队，直接返回已有任务
+            
+        Returns:
+            (任务ID, 是否新建)
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            if dedupe_statuses:
+                placeholders = ','.join(['?'] * len(dedupe_statuses))
+                cursor.execute(
+                    f'SELECT id FROM job_queue WHERE task = ? AND status IN ({placeholders}) ORDER BY id LIMIT 1',
+                    (task, *dedupe_statuses)
+                )
+                existing = cursor.fetchone()
+                if existing:
+                    return existing[0], False
+            cursor.execute(
+                "INSERT INTO job_queue (task, payload, status, enqueued_at) VALUES (?, ?, 'queued', ?)",
+                (task, json.dumps(payload or {}, ensure_ascii=False), time.time())
+            )
+            conn.commit()
+            return cursor.lastrowid, True
+    
+    @timed_query
+    def claim_next_job(self, worker_id: str, exclude_tasks: Tuple[str, ...] = ()) -> Optional[Dict]:
+        """
+        原子地领取最早入队的任务，没有任务时返回None
+        
+        Args:
+            worker_id: 领取者标识
+            exclude_tasks: 跳过这些任务（如同类任务正在运行），让其他任务先执行
+        """
+        exclude_clause = ''
+        if exclude_tasks:
+            exclude_clause = f" AND task NOT IN ({','.join(['?'] * len(exclude_tasks))})"
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                UPDATE job_queue SET status = 'running', started_at = ?, worker_id = ?
+                WHERE id = (SELECT id FROM job_queue WHERE status = 'queued'{exclude_clause} ORDER BY id LIMIT 1)
+                RETURNING id, task, payload
+            ''', (time.time(), worker_id, *exclude_tasks))
+            row = cursor.fetchone()
+            conn.commit()
+            if not row:
+                return None
+            return {"id": row[0], "task": row[1], "payload": json.loads(row[2] or '{}')}
+    
+    @timed_query
+    def finish_job(self, job_id: int, status: str, result: Optional[str] = None):
+        """记录任务结束状态（done / failed / skipped）"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'UPDATE job_queue SET status = ?, finished_at = ?, result = ? WHERE id = ?',
+                (status, time.time(), result, job_id)
+            )
+            conn.commit()
+    
+    @timed_query
+    def fail_orphaned_jobs(self) -> int:
+        """将上一个消费进程遗留的运行中任务标记为失败，返回条数"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE job_queue SET status = 'failed', finished_at = ?, result = '工作进程退出，任务中断'
+                WHERE status = 'running'
+            ''', (time.time(),))
+            conn.commit()
+            return cursor.rowcount
+    
+    @timed_query
+    def get_job(self, job_id: int) -> Optional[Dict]:
+        """获取单个队列任务"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM job_queue WHERE id = ?', (job_id,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            return dict(zip([desc[0] for desc in cursor.description], row))
+    
+    @timed_query
+    def get_jobs(self, status: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        """获取最近的队列任务"""
+        query = 'SELECT * FROM job_queue'
+        params: List = []
+        if status:
+            query += ' WHERE status = ?'
+            params.append(status)
+        query += ' ORDER BY id DESC LIMIT ?'
+        params.append(limit)
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    
+    @timed_query
+    def get_setting(self, key: str) -> Optional[Dict]:
+        """读取JSON格式的设置项"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT value FROM settings WHERE key = ?', (key,))
+            row = cursor.fetchone()
+            return json.loads(row[0]) if row else None
+    
+    @timed_query
+    def set_setting(self, key: str, value: Dict):
+        """写入JSON格式的设置项"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'INSERT INTO settings (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value',
+                (key, json.dumps(value, ensure_ascii=False))
+            )
+            conn.commit()
+
+    
+    @timed_query
+    def open_refresh_cycle(self, crawl_date: str, items: List[Dict]) -> Tuple[Optional[int], bool]:
+        """
+        获取当天未完成的在线人数刷新轮次并追加到期的视频；没有未完成轮次且有到期视频时新建一轮
+        
+        续跑时，本轮中已刷新但再次到期的视频会重新标记为待刷新。
+        
+        Args:
+            crawl_date: 日期
+            items: 本次到期的视频，每项包含 bvid、cid
+            
+        Returns:
+            (轮次ID, 是否为续跑的旧轮次)；没有未完成轮次也没有到期视频时轮次ID为None
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            # 跨日遗留的轮次不再续跑
+            cursor.execute('''
+                UPDATE online_refresh_cycles SET status = 'abandoned', finished_at = ?
+                WHERE status = 'running' AND crawl_date != ?
+            ''', (time.time(), crawl_date))
+            cursor.execute(
+                "SELECT id FROM online_refresh_cycles WHERE crawl_date = ? AND status = 'running' ORDER BY id DESC LIMIT 1",
+                (crawl_date,)
+            )
+            row = cursor.fetchone()
+            resumed = row is not None
+            if resumed:
+                cycle_id = row[0]
+            elif items:
+                cursor.execute(
+                    "INSERT INTO online_refresh_cycles (crawl_date, started_at, status) VALUES (?, ?, 'running')",
+                    (crawl_date, time.time())
+                )
+                cycle_id = cursor.lastrowid
+            else:
+                conn.commit()
+                return None, False
+            
+            # 本轮已刷新但再次到期的视频（如跨多次时间预算的轮次中的热门视频）重新待刷新，
+            # 其余视频保持原有进度；已失败的视频留到下一轮再重试
+            cursor.executemany('''
+                INSERT INTO online_refresh_items (cycle_id, bvid, cid) VALUES (?, ?, ?)
+                ON CONFLICT(cycle_id, bvid) DO UPDATE SET status = 'pending', attempts = 0
+                WHERE online_refresh_items.status = 'done'
+            ''', [(cycle_id, item['bvid'], item.get('cid')) for item in items])
+            conn.commit()
+            return cycle_id, resumed
+    
+    @timed_query
+    def get_pending_refresh_items(self, cycle_id: int) -> List[Dict]:
+        """获取轮次中尚未刷新的视频"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT bvid, cid, attempts FROM online_refresh_items WHERE cycle_id = ? AND status = 'pending'",
+                (cycle_id,)
+            )
+            return [{"bvid": row[0], "cid": row[1], "attempts": row[2]} for row in cursor.fetchall()]
+    
+    @timed_query
+    def record_refresh_item(self, cycle_id: int, bvid: str, success: bool, max_attempts: int = 3):
+        """
+        记录单个视频的刷新结果（断点）
+        
+        失败的视频保持待刷新状态，累计失败 max_attempts 次后标记为失败，不再阻塞本轮完成。
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            if success:
+                cursor.execute('''
+                    UPDATE online_refresh_items SET status = 'done', attempts = attempts + 1, refreshed_at = ?
+                    WHERE cycle_id = ? AND bvid = ?
+                ''', (time.time(), cycle_id, bvid))
+            else:
+                cursor.execute('''
+                    UPDATE online_refresh_items
+                    SET attempts = attempts + 1,
+                        status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE status END
+                    WHERE cycle_id = ? AND bvid = ?
+                ''', (max_attempts, cycle_id, bvid))
+            conn.commit()
+    
+    @timed_query
+    def close_refresh_cycle_if_done(self, cycle_id: int) -> bool:
+        """轮次中所有视频都已处理时将其标记为完成，返回是否完成"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE online_refresh_cycles SET status = 'completed', finished_at = ?
+                WHERE id = ? AND status = 'running' AND NOT EXISTS (
+                    SELECT 1 FROM online_refresh_items WHERE cycle_id = ? AND status = 'pending'
+                )
+            ''', (time.time(), cycle_id, cycle_id))
+            conn.commit()
+            return cursor.rowcount > 0
+    
+    @timed_query
+    def get_latest_refresh_cycle(self, crawl_date: str) -> Optional[Dict]:
+        """获取当天最近一轮在线人数刷新的进度"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT c.id, c.started_at, c.finished_at, c.status,
+                       COUNT(i.bvid),
+                       COALESCE(SUM(i.status = 'done'), 0),
+                       COALESCE(SUM(i.status = 'failed'), 0)
+                FROM online_refresh_cycles c
+                LEFT JOIN online_refresh_items i ON i.cycle_id = c.id
+                WHERE c.id = (SELECT MAX(id) FROM online_refresh_cycles WHERE crawl_date = ?)
+                GROUP BY c.id
+            ''', (crawl_date,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            return {
+                "id": row[0],
+                "started_at": row[1],
+                "finished_at": row[2],
+                "status": row[3],
+                "planned": row[4],
+                "refreshed": row[5],
+                "failed": row[6],
+            }
+    
+    @timed_query
+    def get_archivable_dates(self, before_date: str) -> List[str]:
+        """获取早于 before_date、且没有进行中的在线人数刷新轮次的日期"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT DISTINCT crawl_date FROM video_daily
+                WHERE crawl_date < ?
+                  AND crawl_date NOT IN (SELECT crawl_date FROM online_refresh_cycles WHERE status = 'running')
+                ORDER BY crawl_date
+            ''', (before_date,))
+            return [row[0] for row in cursor.fetchall()]
+    
+    @timed_query
+    def archive_date(self, crawl_date: str) -> int:
+        """
+        将一个日期的每日记录写入 Parquet 归档并从 video_daily 中删除
+        
+        整个过程持有写锁，写入完成并校验行数后才删除 SQLite 中的记录；
+        中途失败时 SQLite 数据保持不变，重新归档会覆盖分区文件。
+        
+        Returns:
+            归档的记录数
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('SELECT * FROM videos WHERE crawl_date = ? ORDER BY id', (crawl_date,))
+            columns = [desc[0] for desc in cursor.description]
+            rows = cursor.fetchall()
+            if not rows:
+                conn.rollback()
+                return 0
+            
+            if self._is_archived(cursor, crawl_date):
+                # 归档后又写入了该日期的记录：与已归档的记录合并，同一视频以新记录为准
+                bvid_index = columns.index('bvid')
+                fresh = {row[bvid_index] for row in rows}
+                for batch in self.archive.iter_batches(crawl_date):
+                    rows.extend(row for row in batch if row[1] is None or row[1] not in fresh)
+            
+            size = self.archive.write_partition(crawl_date, columns, rows)
+            
+            # 保留已归档日期中的最高在线人数，供之后计算历史最高
+            cursor.execute('''
+                UPDATE video_info
+                SET archived_max_online_count = d.max_online_count,
+                    archived_max_online_time = d.max_online_time
+                FROM (
+                    SELECT video_id, max_online_count, max_online_time
+                    FROM video_daily WHERE crawl_date = ?
+                ) AS d
+                WHERE video_info.id = d.video_id
+                  AND d.max_online_count > COALESCE(video_info.archived_max_online_count, -1)
+            ''', (crawl_date,))
+            cursor.execute('''
+                INSERT OR REPLACE INTO archived_dates (crawl_date, row_count, size_bytes, archived_at)
+                VALUES (?, ?, ?, ?)
+            ''', (crawl_date, len(rows), size, time.time()))
+            cursor.execute('DELETE FROM video_daily WHERE crawl_date = ?', (crawl_date,))
+            conn.commit()
+            return len(rows)
+    
+    @timed_query
+    def get_archived_dates(self) -> List[Dict]:
+        """获取已归档的日期及其记录数、文件大小"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM archived_dates ORDER BY crawl_date DESC')
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    
+    def vacuum(self):
+        """重建数据库文件，释放删除记录后留下的空闲页"""
+        with self.get_connection() as conn:
+            conn.execute('VACUUM')
 
 
 # 创建全局数据库管理器实例
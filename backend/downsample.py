@@ -0,0 +1,96 @@
+from typing import List, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError as e:
+    print(f"导入NumPy失败，趋势降采样将使用纯Python实现: {e}")
+    np = None
+
+
+def lttb(x: Sequence[float], y: Sequence[float], threshold: int) -> Tuple[List[float], List[float]]:
+    """
+    Largest-Triangle-Three-Buckets 降采样
+
+    保留首尾两点，其余点均分到 threshold-2 个桶中，
+    每个桶选出与"上一个已选点"和"下一个桶的平均点"构成三角形面积最大的点，
+    从而在点数大幅减少的同时保留曲线的峰谷形状。
+
+    Args:
+        x: 横坐标（需升序），如时间戳
+        y: 纵坐标，如在线人数
+        threshold: 目标点数
+
+    Returns:
+        降采样后的 (x, y)
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return list(x), list(y)
+    if np is not None:
+        return _lttb_numpy(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64), threshold)
+    return _lttb_python(list(x), list(y), threshold)
+
+
+def _bucket_edges(n: int, threshold: int) -> List[int]:
+    """计算中间 threshold-2 个桶的边界下标（不含首尾两点）"""
+    every = (n - 2) / (threshold - 2)
+    return [int(i * every) + 1 for i in range(threshold - 2)] + [n - 1]
+
+
+def _lttb_numpy(x, y, threshold: int) -> Tuple[List[float], List[float]]:
+    """NumPy实现：下一桶平均点通过前缀和一次算出，桶内三角形面积向量化计算"""
+    n = len(x)
+    edges = np.array(_bucket_edges(n, threshold))
+    starts, ends = edges[:-1], edges[1:]
+
+    # 每个桶的平均点，最后追加末尾点作为最后一个桶的"下一桶"
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+    sizes = ends - starts
+    avg_x = np.append((cx[ends] - cx[starts]) / sizes, x[-1])
+    avg_y = np.append((cy[ends] - cy[starts]) / sizes, y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = starts[i], ends[i]
+        bx, by = x[lo:hi], y[lo:hi]
+        # 三角形面积的两倍（省略常数因子不影响 argmax）
+        areas = np.abs((x[a] - avg_x[i + 1]) * (by - y[a]) - (x[a] - bx) * (avg_y[i + 1] - y[a]))
+        a = lo + int(np.argmax(areas))
+        selected[i + 1] = a
+
+    return x[selected].tolist(), y[selected].tolist()
+
+
+def _lttb_python(x: List[float], y: List[float], threshold: int) -> Tuple[List[float], List[float]]:
+    """纯Python实现，未安装NumPy时使用"""
+    n = len(x)
+    edges = _bucket_edges(n, threshold)
+
+    out_x, out_y = [x[0]], [y[0]]
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_lo, next_hi = edges[i + 1], edges[i + 2]
+            size = next_hi - next_lo
+            avg_x = sum(x[next_lo:next_hi]) / size
+            avg_y = sum(y[next_lo:next_hi]) / size
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        out_x.append(x[best])
+        out_y.append(y[best])
+        a = best
+
+    out_x.append(x[-1])
+    out_y.append(y[-1])
+    return out_x, out_y
@@ -0,0 +1,179 @@
+import asyncio
+import itertools
+import json
+import os
+import socket
+import threading
+import uuid
+from typing import Any, Dict, Optional, Set
+
+try:
+    from .database import db_manager
+    from .metrics import EVENT_SUBSCRIBERS, EVENT_QUEUE_DEPTH
+except ImportError:
+    from database import db_manager
+    from metrics import EVENT_SUBSCRIBERS, EVENT_QUEUE_DEPTH
+
+
+class Subscription:
+    """单个订阅者的事件队列"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_queue: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0  # 因客户端过慢被丢弃的事件总数
+        self._needs_resync = False
+
+    def _offer(self, message: str):
+        """在事件循环线程中入队；队列已满时丢弃最旧的事件，并标记需要通知客户端重新同步"""
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            self.dropped += 1
+            self._needs_resync = True
+        self.queue.put_nowait(message)
+
+    async def next_message(self, timeout: float) -> Optional[str]:
+        """等待下一条消息，超时返回None；发生过丢弃时优先返回 resync 事件"""
+        if self._needs_resync:
+            # 客户端收到后应重新拉取完整数据，之后的增量事件在此基础上继续应用
+            self._needs_resync = False
+            return format_sse("resync", {"reason": "slow_consumer", "dropped": self.dropped})
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+def format_sse(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    """按 text/event-stream 格式编码一条事件"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}")
+    return '\n'.join(lines) + '\n\n'
+
+
+class EventBroadcaster:
+    """
+    进程内事件广播器
+
+    爬虫线程通过 EventRelay.publish() 发布事件，事件只编码一次，
+    再通过 call_soon_threadsafe 分发到各订阅者所在的事件循环。
+    每个订阅者的队列有上限，慢客户端只会丢失自己的旧事件，不会阻塞发布方。
+    """
+
+    def __init__(self, max_queue: int = 256):
+        self.max_queue = max_queue
+        self._subscribers: Set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._state: Dict[str, Any] = {"is_crawling": False}
+
+    def subscribe(self) -> Subscription:
+        """注册订阅者（需在事件循环中调用），并立即推送当前状态快照"""
+        subscription = Subscription(asyncio.get_running_loop(), self.max_queue)
+        with self._lock:
+            self._subscribers.add(subscription)
+            snapshot = dict(self._state)
+        subscription._offer(format_sse("status", snapshot))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """注销订阅者"""
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event: str, data: Dict[str, Any]):
+        """发布事件（线程安全，可在任意线程调用）"""
+        message = format_sse(event, data, next(self._ids))
+        with self._lock:
+            if event == "status":
+                self._state.update(data)
+            subscribers = list(self._subscribers)
+
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._offer, message)
+            except RuntimeError:
+                # 事件循环已关闭
+                self.unsubscribe(subscription)
+
+    def subscriber_count(self) -> int:
+        """当前订阅者数量"""
+        with self._lock:
+            return len(self._subscribers)
+
+    def queue_depth(self) -> int:
+        """所有订阅者队列中待发送的事件总数"""
+        with self._lock:
+            return sum(subscription.queue.qsize() for subscription in self._subscribers)
+
+
+class EventRelay:
+    """
+    跨进程事件转发
+
+    爬虫可能运行在独立的工作进程（CRAWLER_MODE=external）或多个API进程选出的主节点中，
+    而 EventBroadcaster 只能送达同一进程内的订阅者。爬虫发布的事件在推送给本进程订阅者的同时
+    写入 crawler_events 表；每个API进程轮询该表，把其他进程写入的事件转发给本进程的广播器。
+    """
+
+    # 轮询事件表的间隔（秒）
+    poll_interval = 0.5
+
+    def __init__(self, broadcaster: EventBroadcaster):
+        self.broadcaster = broadcaster
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._last_id = 0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(self, event: str, data: Dict[str, Any]):
+        """发布事件：立即推送给本进程的订阅者，并写入事件表供其他进程转发"""
+        self.broadcaster.publish(event, data)
+        db_manager.append_event(self.origin, event, data)
+
+    def start(self):
+        """开始转发其他进程发布的事件（API进程启动时调用），不回放启动前的历史事件"""
+        if self._thread and self._thread.is_alive():
+            return
+        latest = db_manager.get_latest_event()
+        self._last_id = latest["id"] if latest else 0
+        # 以最近一次状态事件作为新订阅者收到的状态快照，API进程在爬取途中启动时也能显示正确状态
+        status = db_manager.get_latest_event("status")
+        if status:
+            self.broadcaster.publish("status", status["data"])
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="event-relay")
+        self._thread.start()
+
+    def stop(self):
+        """停止转发"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        """轮询循环"""
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                events = db_manager.get_events_after(self._last_id, exclude_origin=self.origin)
+            except Exception as e:
+                print(f"读取爬虫事件失败: {e}")
+                continue
+            for row in events:
+                self._last_id = row["id"]
+                self.broadcaster.publish(row["event"], row["data"])
+
+
+# 创建全局事件广播器实例
+event_broadcaster = EventBroadcaster()
+EVENT_SUBSCRIBERS.set_function(event_broadcaster.subscriber_count)
+EVENT_QUEUE_DEPTH.set_function(event_broadcaster.queue_depth)
+
+# 创建全局跨进程事件转发实例
+event_relay = EventRelay(event_broadcaster)
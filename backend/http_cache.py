@@ -0,0 +1,146 @@
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    from fastapi import Request
+    from fastapi.responses import Response
+except ImportError as e:
+    print(f"导入FastAPI相关模块失败: {e}")
+    Request = None
+    Response = None
+
+try:
+    import brotli  # 可选依赖，未安装时仅使用gzip
+except ImportError:
+    brotli = None
+
+
+# 小于该字节数的响应不压缩，压缩收益抵不上CPU开销
+MIN_COMPRESS_SIZE = 1024
+
+# 已编码响应体的缓存条目上限
+MAX_CACHED_BODIES = 64
+
+
+class ConditionalJSONCache:
+    """
+    基于数据版本号的条件请求缓存
+
+    - 由路由名、查询参数和数据版本号生成强ETag
+    - If-None-Match 命中时直接返回304，不查询数据库
+    - 较大的响应体按 Accept-Encoding 使用 brotli/gzip 压缩
+    - 已序列化、已压缩的响应体按ETag缓存，重复请求无需再次编码
+    """
+
+    def __init__(self, max_entries: int = MAX_CACHED_BODIES, min_compress_size: int = MIN_COMPRESS_SIZE):
+        self.max_entries = max_entries
+        self.min_compress_size = min_compress_size
+        self._bodies: "OrderedDict[Tuple[str, str], Tuple[bytes, Optional[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_etag(route: str, params: Dict[str, Any], version: int) -> str:
+        """生成ETag的基础部分（不含引号与编码后缀）"""
+        key = json.dumps([route, sorted(params.items()), version], ensure_ascii=False, default=str)
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+
+    @staticmethod
+    def _format_etag(etag_base: str, content_encoding: Optional[str]) -> str:
+        """强ETag需区分不同的内容编码"""
+        return f'{etag_base}-{content_encoding}' if content_encoding else etag_base
+
+    @staticmethod
+    def _matched_etag(if_none_match: Optional[str], candidates: Tuple[str, ...]) -> Optional[str]:
+        """返回 If-None-Match 中与候选ETag相同的一个（不含引号），* 视为命中第一个候选"""
+        if not if_none_match:
+            return None
+        for token in if_none_match.split(','):
+            token = token.strip()
+            if token == '*':
+                return candidates[0]
+            if token.startswith('W/'):
+                token = token[2:]
+            token = token.strip('"')
+            if token in candidates:
+                return token
+        return None
+
+    def _choose_encoding(self, accept_encoding: str) -> str:
+        """根据 Accept-Encoding 选择压缩算法"""
+        accepted = {part.split(';', 1)[0].strip().lower() for part in accept_encoding.split(',')}
+        if brotli is not None and 'br' in accepted:
+            return 'br'
+        if 'gzip' in accepted:
+            return 'gzip'
+        return 'identity'
+
+    def _encode(self, payload: Any, encoding: str) -> Tuple[bytes, Optional[str]]:
+        """序列化并按需压缩响应体，返回 (响应体, Content-Encoding)"""
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        if encoding == 'identity' or len(body) < self.min_compress_size:
+            return body, None
+        if encoding == 'br':
+            return brotli.compress(body, quality=5), 'br'
+        return gzip.compress(body, compresslevel=6), 'gzip'
+
+    def respond(self, request: "Request", route: str, params: Dict[str, Any],
+                version: int, build_payload: Callable[[], Any]) -> "Response":
+        """
+        生成带ETag的JSON响应
+
+        Args:
+            request: 当前请求
+            route: 路由标识，用于区分不同端点
+            params: 影响响应内容的查询参数
+            version: 数据版本号
+            build_payload: 缓存未命中时构建响应数据的函数
+
+        Returns:
+            304响应或（可能已压缩的）JSON响应
+        """
+        etag_base = self.make_etag(route, params, version)
+        headers = {
+            'Cache-Control': 'no-cache',
+            'Vary': 'Accept-Encoding',
+        }
+
+        encoding = self._choose_encoding(request.headers.get('accept-encoding', ''))
+        cache_key = (etag_base, encoding)
+        with self._lock:
+            cached = self._bodies.get(cache_key)
+            if cached is not None:
+                self._bodies.move_to_end(cache_key)
+
+        # 304 必须重复客户端持有的、与本次所选编码一致的ETag
+        if cached is not None:
+            candidates = (self._format_etag(etag_base, cached[1]),)
+        elif encoding == 'identity':
+            candidates = (etag_base,)
+        else:
+            # 响应体未缓存时不知道是否小到不压缩，两种ETag都可能是本次编码下的取值
+            candidates = (self._format_etag(etag_base, encoding), etag_base)
+        matched = self._matched_etag(request.headers.get('if-none-match'), candidates)
+        if matched is not None:
+            headers['ETag'] = f'"{matched}"'
+            return Response(status_code=304, headers=headers)
+
+        if cached is None:
+            cached = self._encode(build_payload(), encoding)
+            with self._lock:
+                self._bodies[cache_key] = cached
+                while len(self._bodies) > self.max_entries:
+                    self._bodies.popitem(last=False)
+
+        body, content_encoding = cached
+        headers['ETag'] = f'"{self._format_etag(etag_base, content_encoding)}"'
+        if content_encoding:
+            headers['Content-Encoding'] = content_encoding
+        return Response(content=body, media_type='application/json', headers=headers)
+
+
+# 创建全局响应缓存实例
+json_cache = ConditionalJSONCache()
@@ -0,0 +1,107 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Any, Optional
+
+try:
+    from .database import db_manager
+except ImportError:
+    from database import db_manager
+
+
+class LeaderElector:
+    """
+    基于SQLite租约的主节点选举
+    
+    多个工作进程共享同一个数据库文件，只有持有租约的进程运行调度器。
+    主节点每隔 ttl/3 秒续期一次；主节点崩溃后租约过期，其他进程在下一次尝试时接管。
+    """
+    
+    def __init__(self, name: str = "scheduler", ttl_seconds: float = 30):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.holder_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self._lease_expires_at = 0.0  # 本进程最近一次成功续期后租约的到期时间
+        
+        self._on_elected: Optional[Callable[[], None]] = None
+        self._on_demoted: Optional[Callable[[], None]] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self, on_elected: Callable[[], None], on_demoted: Callable[[], None]):
+        """
+        开始参与选举
+        
+        Args:
+            on_elected: 成为主节点时调用
+            on_demoted: 失去主节点身份时调用
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._on_elected = on_elected
+        self._on_demoted = on_demoted
+        self._stop_event.clear()
+        # 先同步尝试一次，使启动流程能立即知道本进程是否为主节点
+        self._heartbeat()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="leader-elector")
+        self._thread.start()
+    
+    def stop(self):
+        """停止参与选举并释放租约，便于其他进程立即接管"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        if self.is_leader:
+            self._set_leader(False)
+            try:
+                db_manager.release_lease(self.name, self.holder_id)
+            except Exception as e:
+                print(f"释放调度租约失败: {e}")
+    
+    def _run(self):
+        """续期/抢占循环"""
+        while not self._stop_event.wait(self.ttl_seconds / 3):
+            self._heartbeat()
+    
+    def _heartbeat(self):
+        """尝试获取或续期租约，并在身份变化时回调"""
+        attempt_at = time.time()
+        try:
+            acquired = db_manager.try_acquire_lease(self.name, self.holder_id, self.ttl_seconds)
+            if acquired:
+                self._lease_expires_at = attempt_at + self.ttl_seconds
+        except Exception as e:
+            # 数据库暂时不可用（如被锁）时，租约到期前其他进程无法接管，可以继续担任主节点
+            print(f"调度租约续期失败: {e}")
+            acquired = self.is_leader and attempt_at < self._lease_expires_at
+        if acquired != self.is_leader:
+            self._set_leader(acquired)
+    
+    def _set_leader(self, is_leader: bool):
+        self.is_leader = is_leader
+        callback = self._on_elected if is_leader else self._on_demoted
+        print(f"进程 {self.holder_id} {'成为' if is_leader else '不再是'}调度主节点")
+        if callback:
+            try:
+                callback()
+            except Exception as e:
+                print(f"主节点切换回调出错: {e}")
+    
+    def get_status(self) -> Dict[str, Any]:
+        """获取选举状态"""
+        try:
+            lease = db_manager.get_lease(self.name)
+        except Exception:
+            lease = None
+        return {
+            "is_leader": self.is_leader,
+            "holder_id": self.holder_id,
+            "leader_id": lease["holder"] if lease else None,
+        }
+
+
+# 创建全局选举器实例
+leader_elector = LeaderElector()
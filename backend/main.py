@@ -1,23 +1,38 @@
+import os
 import threading
+import time
 from contextlib import asynccontextmanager
 
 try:
-    from fastapi import FastAPI
+    from fastapi import FastAPI, Request
     from fastapi.middleware.cors import CORSMiddleware
 except ImportError as e:
     print(f"导入FastAPI失败: {e}")
     FastAPI = None
+    Request = None
     CORSMiddleware = None
 
 # 导入模块化组件
 try:
     from .database import db_manager
-    from .scheduler import task_scheduler
-    from .routes import api_router
+    from .leader import leader_elector
+    from .worker import crawler_worker
+    from .events import event_relay
+    from .routes import api_router, metrics_router
+    from .metrics import HTTP_REQUEST_SECONDS
 except ImportError:
     from database import db_manager
-    from scheduler import task_scheduler
-    from routes import api_router
+    from leader import leader_elector
+    from worker import crawler_worker
+    from events import event_relay
+    from routes import api_router, metrics_router
+    from metrics import HTTP_REQUEST_SECONDS
+
+
+# 爬虫运行方式：
+#   embedded - API进程内参与选举，主节点同时运行调度器并消费任务队列（默认，单进程部署）
+#   external - 爬虫由独立的 `python worker.py` 进程运行，API进程只入队任务和读取状态
+CRAWLER_MODE = os.environ.get("CRAWLER_MODE", "embedded")
 
 
 @asynccontextmanager
@@ -30,14 +45,16 @@ async def lifespan(app: FastAPI):
     db_manager.init_database()
     print("数据库初始化完成")
     
-    # 启动调度器
-    task_scheduler.start()
-    print("调度器已启动")
+    # 爬虫可能运行在其他进程中，把其他进程发布的爬虫事件转发给本进程的SSE订阅者
+    event_relay.start()
     
-    # 立即执行一次热门视频爬取
-    result = task_scheduler.trigger_hot_videos_task()
-    if result["success"]:
-        print("首次热门视频爬取任务已启动")
+    # 多个工作进程中只有选举出的主节点运行调度器和爬虫任务
+    if CRAWLER_MODE == "external":
+        print("爬虫由独立工作进程运行，当前进程仅提供API服务")
+    else:
+        leader_elector.start(on_elected=crawler_worker.start, on_demoted=crawler_worker.stop)
+        if not leader_elector.is_leader:
+            print("当前进程不是调度主节点，仅提供API服务")
     
     print("应用启动完成")
     
@@ -45,8 +62,8 @@ async def lifespan(app: FastAPI):
     
     # 关闭时执行
     print("正在关闭应用...")
-    task_scheduler.stop()
-    print("调度器已停止")
+    leader_elector.stop()
+    event_relay.stop()
     print("应用已关闭")
 
 
@@ -68,8 +85,27 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     
+    # 记录每个路由的请求耗时，使用路由模板而非原始路径，避免标签基数膨胀
+    @app.middleware("http")
+    async def record_request_metrics(request: Request, call_next):
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            route = request.scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=request.method,
+                route=getattr(route, "path", "unmatched"),
+                status=status,
+            )
+    
     # 注册API路由
     app.include_router(api_router)
+    app.include_router(metrics_router)
     
     return app
 
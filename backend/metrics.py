@@ -0,0 +1,336 @@
+import abc
+import bisect
+import functools
+import http.server
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+# 默认的耗时直方图分桶（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    """转义标签值"""
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    """拼接 {a="1",b="2"} 形式的标签串"""
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class _Metric(abc.ABC):
+    """指标基类：按标签值组合分别记录，每个指标一把锁"""
+
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    @abc.abstractmethod
+    def _samples(self) -> List[str]:
+        """各样本行（不含 HELP/TYPE）"""
+
+    def render(self) -> str:
+        """按Prometheus文本格式输出"""
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type_name}']
+        lines.extend(self._samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {value}' for key, value in items]
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值，也可以在采集时通过回调函数取值"""
+
+    type_name = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, func: Callable[[], float], **labels):
+        """注册采集时调用的取值函数"""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = func
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+            functions = list(self._functions.items())
+        for key, func in functions:
+            try:
+                values[key] = func()
+            except Exception:
+                continue
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {value}' for key, value in values.items()]
+
+
+class _Timer:
+    """直方图计时器，可作为上下文管理器或装饰器使用"""
+
+    def __init__(self, histogram: 'Histogram', labels: Dict[str, str]):
+        self._histogram = histogram
+        self._labels = labels
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._histogram.observe(time.perf_counter() - self._start, **self._labels)
+
+    def __call__(self, func: Callable) -> Callable:
+        histogram, labels = self._histogram, self._labels
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, **labels)
+
+        return wrapper
+
+
+class Histogram(_Metric):
+    """分桶直方图"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签: [各桶计数..., +Inf计数, 总和]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    def time(self, **labels) -> _Timer:
+        """计时，例如 ``with hist.time(route="/x"):`` 或 ``@hist.time(method="m")``"""
+        return _Timer(self, labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts)) for key, counts in self._values.items()]
+        lines = []
+        for key, counts in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelnames, key, 'le="%s"' % bound)
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            cumulative += counts[len(self.buckets)]
+            bucket_labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {counts[-1]}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Optional[Sequence[float]] = None) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets or DEFAULT_BUCKETS))
+
+    def render(self) -> str:
+        """输出全部指标（Prometheus文本格式 0.0.4）"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+class MetricsServer:
+    """
+    在独立端口上提供 /metrics
+
+    爬虫相关指标只记录在运行爬虫的进程中；该进程不一定提供API（CRAWLER_MODE=external 的工作进程），
+    也不一定是负载均衡选中的API进程，因此由爬虫主节点单独监听一个端口供 Prometheus 采集。
+    """
+
+    def __init__(self, metrics_registry: MetricsRegistry):
+        self.registry = metrics_registry
+        self._server: Optional[http.server.ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, port: int, host: str = '0.0.0.0') -> bool:
+        """开始监听，返回是否成功（端口被占用时不影响调用方）"""
+        if self._server is not None:
+            return True
+        metrics_registry = self.registry
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics_registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._server = http.server.ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:
+            print(f"启动指标服务失败（端口 {port}）: {e}")
+            return False
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name="metrics-server")
+        self._thread.start()
+        print(f"指标服务已启动: http://{host}:{port}/metrics")
+        return True
+
+    def stop(self):
+        """停止监听并释放端口"""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        self._thread = None
+
+
+# 创建全局指标注册表
+registry = MetricsRegistry()
+metrics_server = MetricsServer(registry)
+
+# HTTP 接口
+HTTP_REQUEST_SECONDS = registry.histogram(
+    'marisa_http_request_duration_seconds', 'API请求耗时', ('method', 'route', 'status'))
+
+# 数据库
+DB_QUERY_SECONDS = registry.histogram(
+    'marisa_db_query_duration_seconds', 'DatabaseManager方法耗时', ('method',))
+
+# B站上游接口
+UPSTREAM_REQUEST_SECONDS = registry.histogram(
+    'marisa_upstream_request_duration_seconds', 'B站上游接口请求耗时', ('endpoint',),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+UPSTREAM_REQUESTS = registry.counter(
+    'marisa_upstream_requests_total', 'B站上游接口请求次数（按HTTP状态码或业务code）', ('endpoint', 'code'))
+RESPONSE_CACHE_REQUESTS = registry.counter(
+    'marisa_response_cache_requests_total', '上游响应缓存查询次数（hit / miss / stale）', ('endpoint', 'result'))
+
+# 爬虫任务
+CRAWL_TASK_SECONDS = registry.histogram(
+    'marisa_crawl_task_duration_seconds', '爬虫任务耗时', ('task', 'success'),
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600))
+CRAWL_QUEUE_DEPTH = registry.gauge(
+    'marisa_crawl_queue_depth', '爬虫任务中尚未处理的视频数', ('task',))
+BROWSER_SLOTS_IN_USE = registry.gauge(
+    'marisa_browser_slots_in_use', '已占用的浏览器槽位数')
+RATE_LIMIT_WAIT_SECONDS = registry.histogram(
+    'marisa_rate_limit_wait_seconds', '上游请求因共享限速而等待的时间', ('endpoint',),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+
+# SSE 推送
+EVENT_SUBSCRIBERS = registry.gauge(
+    'marisa_event_subscribers', '当前SSE订阅者数')
+EVENT_QUEUE_DEPTH = registry.gauge(
+    'marisa_event_queue_depth', '所有SSE订阅者队列中待发送的事件总数')
+
+# Chrome 驱动
+CHROME_DRIVERS_ACTIVE = registry.gauge(
+    'marisa_chrome_drivers_active', '当前存活的Chrome驱动数')
+CHROME_DRIVER_LIFETIME_SECONDS = registry.histogram(
+    'marisa_chrome_driver_lifetime_seconds', 'Chrome驱动从启动到退出的存活时间',
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600))
+PAGE_LOAD_SECONDS = registry.histogram(
+    'marisa_page_load_duration_seconds', 'Selenium页面加载耗时', ('page',),
+    buckets=(0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0))
+PAGE_LOAD_BYTES = registry.histogram(
+    'marisa_page_load_bytes', '每次页面加载传输的字节数（Resource Timing统计）', ('page',),
+    buckets=(10e3, 50e3, 100e3, 250e3, 500e3, 1e6, 2.5e6, 5e6, 10e6))
+
+
+def upstream_endpoint(url: str) -> str:
+    """从URL提取上游接口标识（去掉协议、查询参数），避免标签基数膨胀"""
+    path = url.split('?', 1)[0]
+    if '://' in path:
+        path = path.split('://', 1)[1]
+    host, _, rest = path.partition('/')
+    if host.endswith('hdslb.com'):
+        return 'image'
+    if host == 'www.bilibili.com' and rest.startswith('video/'):
+        return 'www.bilibili.com/video'
+    return f'{host}/{rest}'.rstrip('/')
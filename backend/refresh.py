@@ -0,0 +1,92 @@
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+class OnlineRefreshPlanner:
+    """
+    在线人数刷新优先级规划
+    
+    每个视频根据最近一次在线人数和在线人数变化速度得到一个期望刷新间隔：
+    越热门、变化越快的视频间隔越短（最短 min_interval），冷门视频逐步退避到 max_interval。
+    优先级 = 距上次采样的时间 / 期望间隔，达到 due_threshold 即视为到期；从未采样过的视频优先级最高。
+    """
+    
+    # 采样时刻在每轮中的位置会有前后浮动，留出余量，避免最热门的视频因差几秒而被推迟整整一轮
+    due_threshold = 0.8
+    
+    def __init__(self, min_interval: float = 60, max_interval: float = 1800,
+                 reference_online: float = 50, velocity_horizon_hours: float = 1 / 6):
+        """
+        Args:
+            min_interval: 最短刷新间隔（秒）
+            max_interval: 最长刷新间隔（秒）
+            reference_online: 活跃度达到该值时间隔减半
+            velocity_horizon_hours: 按变化速度预估未来这段时间内的变化量，计入活跃度
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.reference_online = reference_online
+        self.velocity_horizon_hours = velocity_horizon_hours
+    
+    def refresh_interval(self, online: Optional[float], velocity: Optional[float]) -> float:
+        """计算期望刷新间隔（秒）"""
+        activity = (online or 0) + abs(velocity or 0) * self.velocity_horizon_hours
+        interval = self.max_interval / (1 + activity / self.reference_online)
+        return min(self.max_interval, max(self.min_interval, interval))
+    
+    def priority(self, candidate: Dict, now: float) -> float:
+        """计算单个视频的刷新优先级"""
+        sampled_at = candidate.get("online_ts")
+        if sampled_at is None:
+            return float("inf")
+        interval = self.refresh_interval(candidate.get("online_last"), candidate.get("online_velocity"))
+        return (now - sampled_at) / interval
+    
+    def plan(self, candidates: List[Dict], now: Optional[float] = None) -> List[Dict]:
+        """
+        返回到期需要刷新的视频，按优先级从高到低排序
+        
+        Args:
+            candidates: 视频列表，每项包含 bvid、cid、online_ts、online_last、online_velocity
+            now: 当前时间戳，默认取当前时间
+        """
+        now = time.time() if now is None else now
+        scored = [(self.priority(candidate, now), candidate) for candidate in candidates]
+        due = [(priority, candidate) for priority, candidate in scored if priority >= self.due_threshold]
+        due.sort(key=lambda item: item[0], reverse=True)
+        return [dict(candidate, priority=priority) for priority, candidate in due]
+    
+    def coverage(self, candidates: List[Dict], now: Optional[float] = None) -> Dict:
+        """
+        统计在线人数数据的新鲜度
+        
+        Returns:
+            total/sampled/overdue 计数，以及每个视频距上次采样的时间和期望间隔（最陈旧的在前）
+        """
+        now = time.time() if now is None else now
+        videos = []
+        for candidate in candidates:
+            sampled_at = candidate.get("online_ts")
+            interval = self.refresh_interval(candidate.get("online_last"), candidate.get("online_velocity"))
+            staleness = now - sampled_at if sampled_at is not None else None
+            videos.append({
+                "bvid": candidate["bvid"],
+                "online_count": candidate.get("online_last"),
+                "last_sampled_at": datetime.fromtimestamp(sampled_at).isoformat() if sampled_at is not None else None,
+                "staleness_seconds": round(staleness, 1) if staleness is not None else None,
+                "target_interval_seconds": round(interval, 1),
+                "overdue": staleness is None or staleness > interval,
+            })
+        videos.sort(key=lambda video: float("inf") if video["staleness_seconds"] is None else video["staleness_seconds"],
+                    reverse=True)
+        return {
+            "total": len(videos),
+            "sampled": sum(1 for video in videos if video["staleness_seconds"] is not None),
+            "overdue": sum(1 for video in videos if video["overdue"]),
+            "videos": videos,
+        }
+
+
+# 创建全局刷新规划器实例
+online_refresh_planner = OnlineRefreshPlanner()
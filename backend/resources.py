@@ -0,0 +1,119 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+try:
+    from .metrics import BROWSER_SLOTS_IN_USE, RATE_LIMIT_WAIT_SECONDS
+except ImportError:
+    from metrics import BROWSER_SLOTS_IN_USE, RATE_LIMIT_WAIT_SECONDS
+
+
+class RateLimiter:
+    """
+    令牌桶限速器，多个线程共享
+    
+    令牌以 rate 个/秒的速度补充，最多累积 burst 个；取不到令牌的线程睡眠到下一个令牌生成。
+    """
+    
+    def __init__(self, rate: float = 2.0, burst: int = 2):
+        self._lock = threading.Lock()
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+    
+    def configure(self, rate: float, burst: Optional[int] = None):
+        """调整速率，已累积的令牌不超过新的上限"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+            self.burst = burst if burst is not None else max(1, int(rate))
+            self._tokens = min(self._tokens, self.burst)
+    
+    def _refill(self, now: float):
+        """按经过的时间补充令牌（调用方持有锁）"""
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+    
+    def acquire(self, endpoint: str = "default"):
+        """阻塞直到取得一个令牌"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    break
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+        if waited:
+            RATE_LIMIT_WAIT_SECONDS.observe(waited, endpoint=endpoint)
+
+
+class ResourceBudget:
+    """
+    爬虫任务共享的资源预算
+    
+    - 浏览器槽位：同时存活的Chrome实例上限，热门视频爬取与在线人数更新各占一个槽位并行运行
+    - 请求速率：所有任务发往B站的请求共用一个令牌桶，并行时总速率也不会超过上限
+    """
+    
+    def __init__(self, max_browsers: int = 2, requests_per_second: float = 2.0):
+        self.max_browsers = max_browsers
+        self._browsers_in_use = 0
+        self._condition = threading.Condition()
+        self.rate_limiter = RateLimiter(requests_per_second, max(1, int(requests_per_second)))
+        BROWSER_SLOTS_IN_USE.set_function(lambda: self._browsers_in_use)
+    
+    def configure(self, max_browsers: int, requests_per_second: float):
+        """更新预算，已占用的槽位在释放后按新上限生效"""
+        if max_browsers < 1 or requests_per_second <= 0:
+            raise ValueError("max_browsers 至少为1，requests_per_second 必须为正数")
+        with self._condition:
+            self.max_browsers = max_browsers
+            self._condition.notify_all()
+        self.rate_limiter.configure(requests_per_second)
+    
+    @contextmanager
+    def browser_slot(self, task: str, timeout: Optional[float] = None) -> Iterator[None]:
+        """
+        占用一个浏览器槽位
+        
+        Args:
+            task: 任务名，仅用于日志
+            timeout: 最长等待秒数，超时抛出TimeoutError；None表示一直等待
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._condition:
+            while self._browsers_in_use >= self.max_browsers:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"任务 {task} 等待浏览器槽位超时")
+                print(f"任务 {task} 等待浏览器槽位 ({self._browsers_in_use}/{self.max_browsers})")
+                self._condition.wait(timeout=remaining)
+            self._browsers_in_use += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._browsers_in_use -= 1
+                self._condition.notify()
+    
+    def throttle(self, endpoint: str = "default"):
+        """发出一次上游请求前调用，按共享速率限速"""
+        self.rate_limiter.acquire(endpoint)
+    
+    def get_status(self):
+        """获取资源占用情况"""
+        return {
+            "browsers_in_use": self._browsers_in_use,
+            "max_browsers": self.max_browsers,
+            "requests_per_second": self.rate_limiter.rate,
+        }
+
+
+# 创建全局资源预算实例
+resource_budget = ResourceBudget()
@@ -0,0 +1,201 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlencode
+
+try:
+    from .metrics import RESPONSE_CACHE_REQUESTS
+except ImportError:
+    from metrics import RESPONSE_CACHE_REQUESTS
+
+
+# 缓存文件位置，与 chromedriver 路径缓存放在同一目录
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'responses.db')
+
+# 各上游接口的默认缓存时间（秒），未列出的接口不缓存。
+# 视频详情中的分区、类型、分P、发布时间几乎不会变化，可以缓存较长时间；
+# 需要最新统计数据（播放量等）的调用方通过 max_age 收紧时效。
+DEFAULT_TTLS = {
+    'api.bilibili.com/x/web-interface/view': 7 * 24 * 3600,
+    'api.bilibili.com/x/web-interface/popular': 60,
+    'api.bilibili.com/x/player/online/total': 10,
+}
+
+# 读取统计数据的调用方使用的最大缓存时间（秒）
+STATS_MAX_AGE = 30
+
+
+class ResponseCache:
+    """
+    上游接口响应的本地持久化缓存
+    
+    以"接口 + 排序后的参数"为键，响应体以紧凑JSON经zlib压缩后存入SQLite文件，
+    多个进程（API进程、爬虫工作进程）共享同一份缓存。总大小超过上限时按最近访问时间淘汰。
+    """
+    
+    # 命中时最近访问时间的最小更新间隔，避免每次读取都产生写操作
+    touch_interval = 60
+    
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = 64 * 1024 * 1024,
+                 ttls: Optional[Dict[str, float]] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self._initialized = False
+        self._init_lock = threading.Lock()
+    
+    @contextmanager
+    def get_connection(self):
+        """获取缓存数据库连接，首次使用时建表"""
+        if not self._initialized:
+            self._init_storage()
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            yield conn
+        finally:
+            conn.close()
+    
+    def _init_storage(self):
+        with self._init_lock:
+            if self._initialized:
+                return
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5)
+            try:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS responses (
+                        key TEXT PRIMARY KEY,
+                        endpoint TEXT NOT NULL,
+                        stored_at REAL NOT NULL,
+                        last_access REAL NOT NULL,
+                        size INTEGER NOT NULL,
+                        body BLOB NOT NULL
+                    )
+                ''')
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access, size)')
+                conn.commit()
+            finally:
+                conn.close()
+            self._initialized = True
+    
+    @staticmethod
+    def make_key(endpoint: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """生成缓存键：参数按名称排序，保证同一请求得到同一个键"""
+        query = urlencode(sorted((params or {}).items()))
+        return f"{endpoint}?{query}" if query else endpoint
+    
+    def get(self, endpoint: str, params: Optional[Dict[str, Any]] = None,
+            max_age: Optional[float] = None) -> Optional[Any]:
+        """
+        读取缓存
+        
+        Args:
+            endpoint: 上游接口标识（见 metrics.upstream_endpoint）
+            params: 请求参数
+            max_age: 调用方可接受的最大缓存时间，不超过接口的默认缓存时间
+        
+        Returns:
+            缓存的响应数据，未命中或已过期时返回None
+        """
+        ttl = self.ttls.get(endpoint, 0)
+        if max_age is not None:
+            ttl = min(ttl, max_age)
+        if ttl <= 0:
+            return None
+        
+        key = self.make_key(endpoint, params)
+        now = time.time()
+        try:
+            with self.get_connection() as conn:
+                row = conn.execute(
+                    'SELECT stored_at, last_access, body FROM responses WHERE key = ?', (key,)
+                ).fetchone()
+                if row is None:
+                    RESPONSE_CACHE_REQUESTS.inc(endpoint=endpoint, result='miss')
+                    return None
+                stored_at, last_access, body = row
+                if now - stored_at > ttl:
+                    RESPONSE_CACHE_REQUESTS.inc(endpoint=endpoint, result='stale')
+                    return None
+                if now - last_access > self.touch_interval:
+                    conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (now, key))
+                    conn.commit()
+            RESPONSE_CACHE_REQUESTS.inc(endpoint=endpoint, result='hit')
+            return json.loads(zlib.decompress(body))
+        except (sqlite3.Error, zlib.error, ValueError) as e:
+            print(f"读取响应缓存失败 {key}: {e}")
+            return None
+    
+    def set(self, endpoint: str, params: Optional[Dict[str, Any]], payload: Any):
+        """写入缓存（只缓存配置了缓存时间的接口），写入后按需淘汰"""
+        if self.ttls.get(endpoint, 0) <= 0:
+            return
+        key = self.make_key(endpoint, params)
+        body = zlib.compress(json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), 6)
+        now = time.time()
+        try:
+            with self.get_connection() as conn:
+                conn.execute('''
+                    INSERT INTO responses (key, endpoint, stored_at, last_access, size, body)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                        stored_at = excluded.stored_at,
+                        last_access = excluded.last_access,
+                        size = excluded.size,
+                        body = excluded.body
+                ''', (key, endpoint, now, now, len(body), body))
+                self._evict(conn, now)
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"写入响应缓存失败 {key}: {e}")
+    
+    def get_or_fetch(self, endpoint: str, params: Optional[Dict[str, Any]],
+                     fetch: Callable[[], Optional[Any]], max_age: Optional[float] = None) -> Optional[Any]:
+        """读取缓存，未命中时调用 fetch 获取并写入（fetch 返回None表示失败，不缓存）"""
+        cached = self.get(endpoint, params, max_age)
+        if cached is not None:
+            return cached
+        payload = fetch()
+        if payload is not None:
+            self.set(endpoint, params, payload)
+        return payload
+    
+    def _evict(self, conn, now: float):
+        """
+        总大小超过上限时淘汰：先删除超过接口默认缓存时间的条目，
+        仍超出则按最近访问时间从旧到新删除，直到降到上限的90%
+        """
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        
+        for endpoint, ttl in self.ttls.items():
+            conn.execute('DELETE FROM responses WHERE endpoint = ? AND stored_at < ?', (endpoint, now - ttl))
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        
+        target = self.max_bytes * 0.9
+        if total > target:
+            cursor = conn.execute('SELECT key, size FROM responses ORDER BY last_access')
+            doomed = []
+            for key, size in cursor:
+                if total <= target:
+                    break
+                doomed.append((key,))
+                total -= size
+            conn.executemany('DELETE FROM responses WHERE key = ?', doomed)
+    
+    def get_status(self) -> Dict[str, Any]:
+        """获取缓存条目数与占用空间"""
+        with self.get_connection() as conn:
+            count, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        return {"entries": count, "bytes": total, "max_bytes": self.max_bytes}
+
+
+# 创建全局响应缓存实例
+response_cache = ResponseCache()
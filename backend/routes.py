@@ -1,9 +1,12 @@
-from typing import Optional
-from datetime import date
+import csv
+import io
+import json
+from typing import Optional, Iterator, Tuple, List
+from datetime import date, datetime
 
 try:
-    from fastapi import APIRouter, HTTPException, BackgroundTasks
-    from fastapi.responses import Response
+    from fastapi import APIRouter, HTTPException, BackgroundTasks, Request, Query
+    from fastapi.responses import Response, StreamingResponse
     import httpx
 except ImportError as e:
     print(f"导入FastAPI相关模块失败: {e}")
@@ -28,25 +31,55 @@ except ImportError as e:
     class BackgroundTasks:
         pass
     
+    class Request:
+        pass
+    
+    def Query(default=None, **kwargs):
+        return default
+    
     class Response:
         def __init__(self, content, media_type, headers=None):
             self.content = content
             self.media_type = media_type
             self.headers = headers or {}
+    
+    class StreamingResponse(Response):
+        pass
 
 try:
     from .database import db_manager
-    from .scheduler import task_scheduler, CrawlConfig
+    from .scheduler import task_scheduler, CrawlConfig, CONFIG_SETTING_KEY
+    from .worker import crawler_worker
     from .api import FastBilibiliAPI
+    from .http_cache import json_cache
+    from .events import event_broadcaster
+    from .leader import leader_elector
+    from .metrics import registry, UPSTREAM_REQUEST_SECONDS, UPSTREAM_REQUESTS, upstream_endpoint
+    from .downsample import lttb
+    from .refresh import online_refresh_planner
+    from .response_cache import response_cache, STATS_MAX_AGE
+    from .analytics import analytics_engine
 except ImportError:
     from database import db_manager
-    from scheduler import task_scheduler, CrawlConfig
+    from scheduler import task_scheduler, CrawlConfig, CONFIG_SETTING_KEY
+    from worker import crawler_worker
     from api import FastBilibiliAPI
+    from http_cache import json_cache
+    from events import event_broadcaster
+    from leader import leader_elector
+    from metrics import registry, UPSTREAM_REQUEST_SECONDS, UPSTREAM_REQUESTS, upstream_endpoint
+    from downsample import lttb
+    from refresh import online_refresh_planner
+    from response_cache import response_cache, STATS_MAX_AGE
+    from analytics import analytics_engine
 
 
 # 创建API路由器
 api_router = APIRouter(prefix="/api")
 
+# 监控指标路由器（不带 /api 前缀，便于Prometheus抓取）
+metrics_router = APIRouter()
+
 
 @api_router.get("/")
 async def root():
@@ -56,6 +89,7 @@ async def root():
 
 @api_router.get("/videos")
 async def get_videos(
+    request: Request,
     date: Optional[str] = None,
     sort_by: str = "view_count",  # title, online_count, view_count, max_online_count
     order: str = "desc",  # desc, asc
@@ -73,61 +107,207 @@ async def get_videos(
         sub_zone: 子分区ID，用于筛选特定子分区的视频
     """
     try:
-        videos = db_manager.get_videos_by_date(date, sort_by, order, main_zone, sub_zone)
-        return {"videos": videos, "total": len(videos)}
+        def build_payload():
+            videos = db_manager.get_videos_by_date(date, sort_by, order, main_zone, sub_zone)
+            return {"videos": videos, "total": len(videos)}
+        
+        params = {"date": date, "sort_by": sort_by, "order": order,
+                  "main_zone": main_zone, "sub_zone": sub_zone}
+        return json_cache.respond(request, "videos", params,
+                                  db_manager.get_data_version(date), build_payload)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取视频数据失败: {str(e)}")
 
 
 @api_router.get("/dates")
-async def get_available_dates():
+async def get_available_dates(request: Request):
     """获取可用的爬取日期列表"""
     try:
-        dates = db_manager.get_available_dates()
-        return {"dates": dates}
+        return json_cache.respond(request, "dates", {}, db_manager.get_data_version(),
+                                  lambda: {"dates": db_manager.get_available_dates()})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取日期列表失败: {str(e)}")
 
 
+def _enqueue_crawl_job(task: str, message: str) -> dict:
+    """将爬虫任务写入队列，由爬虫工作进程执行；同名任务已在排队或运行时不重复入队"""
+    job_id, created = db_manager.enqueue_job(task, dedupe_statuses=('queued', 'running'))
+    crawler_worker.notify()
+    return {
+        "message": message if created else "同名任务已在队列中",
+        "job_id": job_id,
+        "created": created,
+    }
+
+
 @api_router.post("/crawl/start")
 async def start_crawl(background_tasks: BackgroundTasks):
-    """手动启动热门视频爬取任务"""
+    """手动启动热门视频爬取任务（入队后立即返回，通过 /api/crawl/jobs/{job_id} 查询进度）"""
     try:
-        result = task_scheduler.trigger_hot_videos_task()
-        if result["success"]:
-            return {"message": result["message"]}
-        else:
-            raise HTTPException(status_code=400, detail=result["message"])
+        return _enqueue_crawl_job("hot_videos", "热门视频爬取任务已加入队列")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"启动爬取任务失败: {str(e)}")
 
 
 @api_router.post("/crawl/update-online")
 async def start_update_online(background_tasks: BackgroundTasks):
-    """手动启动在线人数更新任务"""
+    """手动启动在线人数更新任务（入队后立即返回）"""
     try:
-        result = task_scheduler.trigger_online_count_task()
-        if result["success"]:
-            return {"message": result["message"]}
-        else:
-            raise HTTPException(status_code=400, detail=result["message"])
+        return _enqueue_crawl_job("online_count", "在线人数更新任务已加入队列")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"启动在线人数更新任务失败: {str(e)}")
 
 
+@api_router.post("/archive/compact")
+async def start_archive():
+    """手动启动归档任务：将超过保留天数的日期移入 Parquet 归档（入队后立即返回）"""
+    try:
+        return _enqueue_crawl_job("archive", "归档任务已加入队列")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"启动归档任务失败: {str(e)}")
+
+
+@api_router.get("/archive")
+async def get_archive_status():
+    """获取已归档的日期及归档文件占用空间"""
+    try:
+        return {"dates": db_manager.get_archived_dates(), **db_manager.archive.get_status()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取归档状态失败: {str(e)}")
+
+
+@api_router.get("/crawl/jobs")
+async def get_crawl_jobs(status: Optional[str] = None, limit: int = 20):
+    """
+    获取队列任务列表
+    
+    Args:
+        status: 按状态筛选（queued / running / done / failed / skipped）
+        limit: 返回数量，最大200
+    """
+    if limit < 1 or limit > 200:
+        raise HTTPException(status_code=400, detail="limit 取值范围为 1-200")
+    try:
+        return {"jobs": db_manager.get_jobs(status, limit)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取队列任务失败: {str(e)}")
+
+
+@api_router.get("/crawl/jobs/{job_id}")
+async def get_crawl_job(job_id: int):
+    """获取单个队列任务的状态"""
+    job = db_manager.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"队列任务 {job_id} 不存在")
+    return job
+
+
+@api_router.get("/events")
+async def subscribe_events(request: Request):
+    """
+    通过Server-Sent Events推送爬虫状态、进度、在线人数变化和任务完成事件
+    
+    连接建立后首先推送一次当前状态快照；客户端收到 resync 事件时应重新拉取完整数据。
+    """
+    subscription = event_broadcaster.subscribe()
+    
+    async def event_stream():
+        try:
+            while not await request.is_disconnected():
+                message = await subscription.next_message(timeout=15)
+                # 超时发送注释行作为心跳，保持连接并及时发现断开的客户端
+                yield message if message is not None else ": keepalive\n\n"
+        finally:
+            event_broadcaster.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _stored_crawl_config() -> dict:
+    """读取持久化的爬虫配置，未设置时返回默认配置"""
+    return db_manager.get_setting(CONFIG_SETTING_KEY) or CrawlConfig().model_dump()
+
+
+def _crawl_status_from_database() -> dict:
+    """
+    从数据库汇总爬虫状态
+    
+    调度器只在爬虫主节点（或独立工作进程）中运行，其他进程无法读取其内存状态，
+    因此根据任务运行记录给出与 task_scheduler.get_status() 相同结构的结果。
+    """
+    def format_run(run):
+        return datetime.fromtimestamp(run["started_at"]).isoformat() if run else None
+    
+    recent_runs = db_manager.get_task_runs(limit=10)
+    running = [run for run in recent_runs if run["status"] == "running"]
+    lease = db_manager.get_lease(leader_elector.name)
+    return {
+        "is_running": bool(lease and lease["expires_at"] > datetime.now().timestamp()),
+        "config": _stored_crawl_config(),
+        "crawler_status": {
+            "is_crawling": bool(running),
+            "last_update": datetime.now().isoformat(),
+        },
+        "last_hot_videos_run": format_run(db_manager.get_last_task_run("hot_videos", status="success")),
+        "last_online_count_run": format_run(db_manager.get_last_task_run("online_counts", status="success")),
+        "next_hot_videos_run": None,
+        "next_online_count_run": None,
+        "recent_runs": recent_runs,
+    }
+
+
 @api_router.get("/crawl/status")
 async def get_crawl_status():
     """获取爬虫和调度器状态"""
     try:
-        return task_scheduler.get_status()
+        if leader_elector.is_leader:
+            status = task_scheduler.get_status()
+        else:
+            status = _crawl_status_from_database()
+        status["leader"] = leader_elector.get_status()
+        # 当天在线人数刷新覆盖率：最近一轮进度与每个视频的数据新鲜度
+        today = date.today().isoformat()
+        status["online_refresh"] = {
+            "cycle": db_manager.get_latest_refresh_cycle(today),
+            **online_refresh_planner.coverage(db_manager.get_online_refresh_candidates(today)),
+        }
+        status["queue"] = {
+            "queued": db_manager.get_jobs("queued", limit=50),
+            "running": db_manager.get_jobs("running", limit=10),
+        }
+        return status
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取状态失败: {str(e)}")
 
 
+@api_router.get("/crawl/history")
+async def get_crawl_history(task: Optional[str] = None, limit: int = 20):
+    """
+    获取爬虫任务运行记录
+    
+    Args:
+        task: 任务名（hot_videos / online_counts），不指定则返回全部
+        limit: 返回数量，最大200
+    """
+    if limit < 1 or limit > 200:
+        raise HTTPException(status_code=400, detail="limit 取值范围为 1-200")
+    try:
+        return {"runs": db_manager.get_task_runs(task, limit)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取任务记录失败: {str(e)}")
+
+
 @api_router.post("/video/update")
-async def update_video_info(bvid: str):
+def update_video_info(bvid: str):
     """
     更新数据库中指定视频的详细信息
+    
+    上游请求与爬虫共用限速令牌桶，等待令牌时会阻塞线程，
+    因此定义为同步路由，由 FastAPI 放到线程池执行，不阻塞事件循环。
     """
     try:
         # 检查视频是否存在于数据库中
@@ -145,9 +325,9 @@ async def update_video_info(bvid: str):
                 "reason": "已有tid_v2数据"
             }
         
-        # 使用快速API获取视频详情（不需要浏览器）
+        # 使用快速API获取视频详情（不需要浏览器），播放量等统计数据会写入数据库，只接受很新的缓存
         with FastBilibiliAPI() as fast_api:
-            detail = fast_api.get_video_detail(bvid)
+            detail = fast_api.get_video_detail(bvid, max_age=STATS_MAX_AGE)
             
             if not detail:
                 raise HTTPException(
@@ -172,6 +352,9 @@ async def update_video_info(bvid: str):
                 'online_count': '0',  # 在线人数保持为0，这个由专门的任务更新
                 'tid_v2': detail.get('tid_v2'),
                 'copyright': detail.get('copyright'),
+                'owner_mid': (detail.get('owner') or {}).get('mid'),
+                'owner_name': (detail.get('owner') or {}).get('name'),
+                'desc': detail.get('desc'),
             }
             
             # 更新数据库
@@ -207,8 +390,7 @@ async def update_video_info(bvid: str):
 async def get_crawl_config():
     """获取当前爬虫配置"""
     try:
-        config = task_scheduler.get_config()
-        return {"config": config}
+        return {"config": _stored_crawl_config()}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取配置失败: {str(e)}")
 
@@ -218,15 +400,22 @@ async def update_crawl_config(config: CrawlConfig):
     """
     更新爬虫配置
     
+    配置写入数据库后通过任务队列通知爬虫工作进程重新加载。
+    
     Args:
         config: 新的配置参数
     """
     try:
-        task_scheduler.update_config(config)
+        task_scheduler.validate_config(config)
+        db_manager.set_setting(CONFIG_SETTING_KEY, config.model_dump())
+        db_manager.enqueue_job("reload_config")
+        crawler_worker.notify()
         return {
             "message": "配置已更新", 
-            "config": task_scheduler.get_config()
+            "config": config.model_dump()
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"配置无效: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"更新配置失败: {str(e)}")
 
@@ -245,7 +434,10 @@ async def proxy_image(url: str):
                 'Referer': 'https://www.bilibili.com/',
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
             }
-            response = await client.get(url, headers=headers)
+            endpoint = upstream_endpoint(url)
+            with UPSTREAM_REQUEST_SECONDS.time(endpoint=endpoint):
+                response = await client.get(url, headers=headers)
+            UPSTREAM_REQUESTS.inc(endpoint=endpoint, code=f"http_{response.status_code}")
             if response.status_code == 200:
                 return Response(
                     content=response.content,
@@ -273,22 +465,32 @@ async def get_video_detail(bvid: Optional[str] = None, aid: Optional[str] = None
         elif aid:
             params['aid'] = aid
             
+        url = "https://api.bilibili.com/x/web-interface/view"
+        endpoint = upstream_endpoint(url)
+        # 与爬虫共用本地响应缓存，详情页展示统计数据，只接受很新的缓存
+        cached = response_cache.get(endpoint, params, max_age=STATS_MAX_AGE)
+        if cached is not None:
+            return cached
+        
         async with httpx.AsyncClient() as client:
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
                 'Referer': 'https://www.bilibili.com/',
             }
             
-            url = "https://api.bilibili.com/x/web-interface/view"
-            response = await client.get(url, params=params, headers=headers)
+            with UPSTREAM_REQUEST_SECONDS.time(endpoint=endpoint):
+                response = await client.get(url, params=params, headers=headers)
             
             if response.status_code == 200:
                 data = response.json()
+                UPSTREAM_REQUESTS.inc(endpoint=endpoint, code=str(data.get('code')))
                 if data.get('code') == 0:
+                    response_cache.set(endpoint, params, data['data'])
                     return data['data']
                 else:
                     raise HTTPException(status_code=400, detail=data.get('message', '获取视频信息失败'))
             else:
+                UPSTREAM_REQUESTS.inc(endpoint=endpoint, code=f"http_{response.status_code}")
                 raise HTTPException(status_code=response.status_code, detail="请求bilibili API失败")
                 
     except Exception as e:
@@ -296,18 +498,392 @@ async def get_video_detail(bvid: Optional[str] = None, aid: Optional[str] = None
         raise HTTPException(status_code=500, detail=f"获取视频详情失败: {str(e)}")
 
 
+def _stream_ndjson(batches: Iterator[Tuple[List[str], List[tuple]]]) -> Iterator[bytes]:
+    """将分批记录编码为NDJSON，每批输出一个数据块"""
+    for columns, rows in batches:
+        chunk = ''.join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n' for row in rows)
+        yield chunk.encode('utf-8')
+
+
+def _stream_csv(batches: Iterator[Tuple[List[str], List[tuple]]]) -> Iterator[bytes]:
+    """将分批记录编码为CSV，首个数据块包含表头（带BOM便于Excel识别UTF-8）"""
+    header_written = False
+    for columns, rows in batches:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if not header_written:
+            buffer.write('\ufeff')
+            writer.writerow(columns)
+            header_written = True
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+
+
+@api_router.get("/export")
+async def export_videos(
+    date_from: str = Query(..., alias="from"),
+    date_to: str = Query(..., alias="to"),
+    format: str = "ndjson",  # ndjson, csv
+    main_zone: Optional[str] = None,
+    sub_zone: Optional[str] = None
+):
+    """
+    流式导出日期范围内的视频数据
+    
+    Args:
+        date_from: 起始日期（含），格式为YYYY-MM-DD
+        date_to: 结束日期（含），格式为YYYY-MM-DD
+        format: 导出格式，ndjson 或 csv
+        main_zone: 主分区ID
+        sub_zone: 子分区ID
+    """
+    try:
+        start = date.fromisoformat(date_from)
+        end = date.fromisoformat(date_to)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="日期格式应为YYYY-MM-DD")
+    if start > end:
+        raise HTTPException(status_code=400, detail="起始日期不能晚于结束日期")
+    
+    if format == "ndjson":
+        encoder, media_type = _stream_ndjson, "application/x-ndjson"
+    elif format == "csv":
+        encoder, media_type = _stream_csv, "text/csv; charset=utf-8"
+    else:
+        raise HTTPException(status_code=400, detail="format 仅支持 ndjson 或 csv")
+    
+    # 分区参数须在开始流式输出前校验：响应头发出后再出错，客户端只会得到一个被截断的"成功"下载
+    try:
+        zone_ids = db_manager.resolve_zone_ids(main_zone, sub_zone)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="分区ID必须为整数")
+    
+    batches = db_manager.iter_videos_in_range(start.isoformat(), end.isoformat(), zone_ids)
+    filename = f"videos_{start.isoformat()}_{end.isoformat()}.{format}"
+    return StreamingResponse(
+        encoder(batches),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@api_router.get("/leaderboard")
+async def get_leaderboard(
+    date_from: str = Query(..., alias="from"),
+    date_to: str = Query(..., alias="to"),
+    metric: str = "days_on_list",  # days_on_list, peak_online, view_growth
+    zone: Optional[str] = None,
+    limit: int = 50
+):
+    """
+    多日排行榜：按视频聚合日期范围内的数据
+    
+    Args:
+        date_from: 起始日期（含），格式为YYYY-MM-DD
+        date_to: 结束日期（含），格式为YYYY-MM-DD
+        metric: 排序指标，上榜天数 / 峰值在线人数 / 播放量增长
+        zone: 分区ID（主分区或子分区）
+        limit: 返回数量，最大500
+    """
+    try:
+        start = date.fromisoformat(date_from)
+        end = date.fromisoformat(date_to)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="日期格式应为YYYY-MM-DD")
+    if start > end:
+        raise HTTPException(status_code=400, detail="起始日期不能晚于结束日期")
+    if metric not in db_manager.LEADERBOARD_METRICS:
+        raise HTTPException(status_code=400, detail=f"metric 仅支持: {', '.join(db_manager.LEADERBOARD_METRICS)}")
+    if limit < 1 or limit > 500:
+        raise HTTPException(status_code=400, detail="limit 取值范围为 1-500")
+    
+    try:
+        videos = db_manager.get_leaderboard(start.isoformat(), end.isoformat(), metric, zone, limit)
+        return {"videos": videos, "total": len(videos), "metric": metric}
+    except Exception as e:
+        print(f"获取排行榜失败: {e}")
+        raise HTTPException(status_code=500, detail=f"获取排行榜失败: {str(e)}")
+
+
+@api_router.get("/search")
+async def search_videos(
+    request: Request,
+    q: str,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    zone: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0
+):
+    """
+    按标题与简介全文搜索视频，按相关度排序
+    
+    Args:
+        q: 检索词，多个词以空格分隔，须全部出现
+        date_from: 起始日期（含），格式为YYYY-MM-DD，只返回在榜期间与日期范围有交集的视频
+        date_to: 结束日期（含），格式为YYYY-MM-DD
+        zone: 分区ID（主分区或子分区）
+        limit: 返回数量，最大100
+        offset: 跳过的数量，用于分页
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="检索词不能为空")
+    try:
+        start = date.fromisoformat(date_from).isoformat() if date_from else None
+        end = date.fromisoformat(date_to).isoformat() if date_to else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="日期格式应为YYYY-MM-DD")
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="起始日期不能晚于结束日期")
+    if limit < 1 or limit > 100:
+        raise HTTPException(status_code=400, detail="limit 取值范围为 1-100")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="offset 不能为负数")
+    
+    params = {"q": q, "from": start, "to": end, "zone": zone, "limit": limit, "offset": offset}
+    try:
+        return json_cache.respond(request, "search", params, db_manager.get_data_version(), lambda: {
+            "videos": db_manager.search_videos(q, start, end, zone, limit, offset),
+        })
+    except Exception as e:
+        print(f"搜索视频失败: {e}")
+        raise HTTPException(status_code=500, detail=f"搜索视频失败: {str(e)}")
+
+
+@api_router.get("/rising")
+async def get_rising_videos(
+    metric: str = "view",  # view, online
+    limit: int = 50,
+    window_hours: float = 6
+):
+    """
+    获取正在加速上涨的视频，按加速度降序
+    
+    Args:
+        metric: view 按播放量加速度，online 按在线人数加速度
+        limit: 返回数量，最大500
+        window_hours: 只考虑最近多少小时内有观测的视频
+    """
+    if metric not in ("view", "online"):
+        raise HTTPException(status_code=400, detail="metric 仅支持 view 或 online")
+    if limit < 1 or limit > 500:
+        raise HTTPException(status_code=400, detail="limit 取值范围为 1-500")
+    
+    try:
+        videos = db_manager.get_rising_videos(metric, limit, window_hours)
+        return {"videos": videos, "total": len(videos), "metric": metric}
+    except Exception as e:
+        print(f"获取上升视频失败: {e}")
+        raise HTTPException(status_code=500, detail=f"获取上升视频失败: {str(e)}")
+
+
+def _parse_timestamp(value: Optional[str], end_of_day: bool = False) -> Optional[int]:
+    """将 YYYY-MM-DD 或 ISO 时间字符串解析为时间戳（秒），纯日期作为结束时间时取当天末尾"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"无效的时间格式: {value}")
+    if end_of_day and len(value) == 10:
+        parsed = parsed.replace(hour=23, minute=59, second=59)
+    return int(parsed.timestamp())
+
+
+@api_router.get("/video/{bvid}/trend")
+async def get_video_trend(
+    bvid: str,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    points: int = 500
+):
+    """
+    获取视频在线人数趋势曲线（LTTB降采样）
+    
+    Args:
+        bvid: 视频BV号
+        date_from: 起始时间，YYYY-MM-DD 或 ISO 时间，不指定则不限制
+        date_to: 结束时间，YYYY-MM-DD 或 ISO 时间，不指定则不限制
+        points: 返回的最大点数
+    """
+    if points < 3 or points > 5000:
+        raise HTTPException(status_code=400, detail="points 取值范围为 3-5000")
+    
+    start_ts = _parse_timestamp(date_from)
+    end_ts = _parse_timestamp(date_to, end_of_day=True)
+    
+    try:
+        history = db_manager.get_online_history(bvid, start_ts, end_ts)
+        timestamps = [row[0] for row in history]
+        counts = [row[1] for row in history]
+        sampled_ts, sampled_counts = lttb(timestamps, counts, points)
+        
+        return {
+            "bvid": bvid,
+            "raw_count": len(history),
+            "points": [
+                {"time": datetime.fromtimestamp(ts).isoformat(), "online_count": int(count)}
+                for ts, count in zip(sampled_ts, sampled_counts)
+            ]
+        }
+    except Exception as e:
+        print(f"获取视频 {bvid} 趋势失败: {e}")
+        raise HTTPException(status_code=500, detail=f"获取视频趋势失败: {str(e)}")
+
+
 @api_router.get("/zone/stats")
-async def get_zone_stats(date: Optional[str] = None):
+async def get_zone_stats(request: Request, date: Optional[str] = None):
     """获取分区统计信息"""
     try:
         # 获取分区统计数据
-        zone_stats = db_manager.get_zone_statistics(date)
-        return {"zone_stats": zone_stats}
+        return json_cache.respond(request, "zone_stats", {"date": date}, db_manager.get_data_version(date),
+                                  lambda: {"zone_stats": db_manager.get_zone_statistics(date)})
     except Exception as e:
         print(f"获取分区统计失败: {e}")
         raise HTTPException(status_code=500, detail=f"获取分区统计失败: {str(e)}")
 
 
+@api_router.get("/zone/stats/range")
+async def get_zone_stats_range(
+    request: Request,
+    date_from: str = Query(..., alias="from"),
+    date_to: str = Query(..., alias="to"),
+    zone: Optional[str] = None
+):
+    """
+    获取日期范围内的分区日汇总（视频数、总播放量、峰值在线、原创/转载数）
+    
+    Args:
+        date_from: 起始日期（含），格式为YYYY-MM-DD
+        date_to: 结束日期（含），格式为YYYY-MM-DD
+        zone: 分区ID（主分区或子分区）
+    """
+    try:
+        start = date.fromisoformat(date_from)
+        end = date.fromisoformat(date_to)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="日期格式应为YYYY-MM-DD")
+    if start > end:
+        raise HTTPException(status_code=400, detail="起始日期不能晚于结束日期")
+    
+    try:
+        params = {"from": start.isoformat(), "to": end.isoformat(), "zone": zone}
+        return json_cache.respond(
+            request, "zone_stats_range", params, db_manager.get_data_version(),
+            lambda: {"zone_stats": db_manager.get_zone_statistics_range(start.isoformat(), end.isoformat(), zone)}
+        )
+    except Exception as e:
+        print(f"获取分区汇总失败: {e}")
+        raise HTTPException(status_code=500, detail=f"获取分区汇总失败: {str(e)}")
+
+
+def _parse_date_range(date_from: str, date_to: str) -> Tuple[str, str]:
+    """校验日期范围参数，返回ISO格式的起止日期"""
+    try:
+        start = date.fromisoformat(date_from)
+        end = date.fromisoformat(date_to)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="日期格式应为YYYY-MM-DD")
+    if start > end:
+        raise HTTPException(status_code=400, detail="起始日期不能晚于结束日期")
+    return start.isoformat(), end.isoformat()
+
+
+def _analytics_response(request: Request, name: str, params: dict, build):
+    """分析接口的公共处理：检查依赖、按数据版本缓存、转换错误"""
+    if not analytics_engine.available:
+        raise HTTPException(status_code=503, detail="历史数据分析需要安装 duckdb")
+    if params.get("granularity") is not None and params["granularity"] not in analytics_engine.GRANULARITIES:
+        raise HTTPException(status_code=400,
+                            detail=f"granularity 仅支持: {', '.join(analytics_engine.GRANULARITIES)}")
+    try:
+        return json_cache.respond(request, name, params, db_manager.get_data_version(), build)
+    except Exception as e:
+        print(f"历史数据分析失败 {name}: {e}")
+        raise HTTPException(status_code=500, detail=f"历史数据分析失败: {str(e)}")
+
+
+@api_router.get("/analytics/zones/trend")
+async def get_zone_trends(
+    request: Request,
+    date_from: str = Query(..., alias="from"),
+    date_to: str = Query(..., alias="to"),
+    granularity: str = "month",  # day, week, month
+    zone: Optional[str] = None
+):
+    """
+    各分区按日/周/月的趋势：上榜次数、视频数、总播放量、平均播放量、峰值在线人数
+    
+    Args:
+        date_from: 起始日期（含），格式为YYYY-MM-DD
+        date_to: 结束日期（含），格式为YYYY-MM-DD
+        granularity: 时间粒度
+        zone: 分区ID（主分区或子分区）
+    """
+    start, end = _parse_date_range(date_from, date_to)
+    params = {"from": start, "to": end, "granularity": granularity, "zone": zone}
+    return _analytics_response(
+        request, "analytics_zone_trends", params,
+        lambda: {"trends": analytics_engine.zone_trends(start, end, granularity, zone)}
+    )
+
+
+@api_router.get("/analytics/owners")
+async def get_owner_stats(
+    request: Request,
+    date_from: str = Query(..., alias="from"),
+    date_to: str = Query(..., alias="to"),
+    zone: Optional[str] = None,
+    sort: str = "total_views",  # total_views, videos, appearances, peak_online
+    limit: int = 50
+):
+    """
+    按UP主统计日期范围内的上榜视频
+    
+    Args:
+        date_from: 起始日期（含），格式为YYYY-MM-DD
+        date_to: 结束日期（含），格式为YYYY-MM-DD
+        zone: 分区ID（主分区或子分区）
+        sort: 排序字段
+        limit: 返回数量，最大500
+    """
+    start, end = _parse_date_range(date_from, date_to)
+    if sort not in analytics_engine.OWNER_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort 仅支持: {', '.join(analytics_engine.OWNER_SORTS)}")
+    if limit < 1 or limit > 500:
+        raise HTTPException(status_code=400, detail="limit 取值范围为 1-500")
+    params = {"from": start, "to": end, "zone": zone, "sort": sort, "limit": limit}
+    return _analytics_response(
+        request, "analytics_owners", params,
+        lambda: {"owners": analytics_engine.owner_stats(start, end, zone, sort, limit)}
+    )
+
+
+@api_router.get("/analytics/copyright")
+async def get_copyright_ratios(
+    request: Request,
+    date_from: str = Query(..., alias="from"),
+    date_to: str = Query(..., alias="to"),
+    granularity: str = "month",  # day, week, month
+    zone: Optional[str] = None
+):
+    """
+    按日/周/月统计原创与转载视频数及原创占比
+    
+    Args:
+        date_from: 起始日期（含），格式为YYYY-MM-DD
+        date_to: 结束日期（含），格式为YYYY-MM-DD
+        granularity: 时间粒度
+        zone: 分区ID（主分区或子分区）
+    """
+    start, end = _parse_date_range(date_from, date_to)
+    params = {"from": start, "to": end, "granularity": granularity, "zone": zone}
+    return _analytics_response(
+        request, "analytics_copyright", params,
+        lambda: {"ratios": analytics_engine.copyright_ratios(start, end, granularity, zone)}
+    )
+
+
 # 健康检查端点
 @api_router.get("/health")
 async def health_check():
@@ -317,3 +893,12 @@ async def health_check():
         "service": "魔理沙的秘密☆书屋",
         "version": "1.0.0"
     }
+
+
+@metrics_router.get("/metrics")
+async def get_metrics():
+    """Prometheus文本格式的监控指标"""
+    return Response(
+        content=registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -1,7 +1,10 @@
+import heapq
+import itertools
+import random
 import time
 import threading
-from datetime import datetime
-from typing import Dict, Any
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, Callable, List, Optional
 
 try:
     from pydantic import BaseModel
@@ -17,31 +20,160 @@ except ImportError:
 
 try:
     from .crawler import crawler_service
+    from .cron import CronExpression
+    from .database import db_manager
+    from .resources import resource_budget
 except ImportError:
     from crawler import crawler_service
+    from cron import CronExpression
+    from database import db_manager
+    from resources import resource_budget
+
+
+# 爬虫配置在 settings 表中的键
+CONFIG_SETTING_KEY = "crawl_config"
 
 
 class CrawlConfig(BaseModel):
     """爬虫配置模型"""
     max_videos: int = 100
     interval_minutes: int = 60
+    # 在线人数按优先级刷新：每轮只处理到期的视频，热门视频每分钟采样一次
+    online_interval_minutes: int = 1
+    # 每轮在线人数刷新的时间预算（秒），应小于刷新间隔
+    online_cycle_budget_seconds: int = 50
+    # cron表达式（分 时 日 月 周），设置后覆盖对应的间隔配置
+    hot_videos_cron: Optional[str] = None
+    online_count_cron: Optional[str] = None
+    # 每次触发时间随机延后 0~jitter_seconds 秒，避免固定时刻集中请求
+    jitter_seconds: int = 0
+    # 错过触发时间超过该秒数则放弃本次执行
+    misfire_grace_seconds: int = 300
+    # 错过多次触发时只补执行一次
+    coalesce: bool = True
+    # 同时存活的浏览器实例上限，以及所有任务共享的上游请求速率（次/秒）
+    max_browsers: int = 2
+    requests_per_second: float = 2.0
+    # 超过保留天数的已结束日期归档为 Parquet，默认每天凌晨执行
+    archive_after_days: int = 7
+    archive_cron: Optional[str] = "30 4 * * *"
+
+
+class ScheduledJob:
+    """调度任务：按间隔或cron表达式计算下次触发时间"""
+    
+    def __init__(self, name: str, func: Callable[[], bool], history_task: Optional[str] = None):
+        self.name = name
+        self.func = func
+        # 爬虫在 task_runs 表中记录该任务时使用的名称
+        self.history_task = history_task or name
+        self.interval_seconds: float = 0
+        self.cron: Optional[CronExpression] = None
+        self.jitter_seconds: float = 0
+        self.misfire_grace_seconds: float = 300
+        self.coalesce = True
+        
+        self.next_run: float = 0  # 下次计划触发时间（不含抖动）
+        self.due_at: float = 0    # 实际触发时间（含抖动）
+        self.running = False
+        self.last_run: float = 0  # 最近一次成功完成的开始时间
+        self.last_result: Optional[bool] = None
+        self.misfires = 0
+    
+    def configure(self, interval_seconds: float = 0, cron: Optional[str] = None,
+                  jitter_seconds: float = 0, misfire_grace_seconds: float = 300,
+                  coalesce: bool = True):
+        """设置触发规则，运行状态保持不变"""
+        self.interval_seconds = interval_seconds
+        self.cron = CronExpression(cron) if cron else None
+        self.jitter_seconds = jitter_seconds
+        self.misfire_grace_seconds = misfire_grace_seconds
+        self.coalesce = coalesce
+    
+    def following(self, after: float) -> float:
+        """计算 after 之后的下一个计划触发时间"""
+        if self.cron is not None:
+            following = self.cron.next_after(datetime.fromtimestamp(after)).timestamp()
+        else:
+            following = after + self.interval_seconds
+        # 不晚于 after 的触发时间会让补跑循环无法结束
+        if following <= after:
+            raise ValueError(f"任务 {self.name} 的下次触发时间未晚于 {after}")
+        return following
+    
+    def schedule(self, next_run: float):
+        """设置下次触发时间并叠加随机抖动"""
+        self.next_run = next_run
+        jitter = random.uniform(0, self.jitter_seconds) if self.jitter_seconds > 0 else 0
+        self.due_at = next_run + jitter
 
 
 class TaskScheduler:
     """任务调度器 - 负责管理定时任务"""
     
+    # 任务执行失败（或因爬虫忙碌被跳过）后的重试间隔
+    retry_delay = 60
+    
     def __init__(self):
         self.stop_scheduler = False
         self.crawler_thread = None
         self.config = CrawlConfig()
         
-        # 任务执行时间记录
-        self.last_hot_videos_run = 0
-        self.last_online_count_run = 0
+        # 按到期时间排序的最小堆: (due_at, 序号, 任务名)，序号用于识别失效条目
+        self._heap = []
+        self._counter = itertools.count()
+        self._entry_ids: Dict[str, int] = {}
+        self._condition = threading.Condition()
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self._build_jobs(first_run=time.time())
+    
+    # 兼容旧字段：任务最近一次成功执行的时间
+    @property
+    def last_hot_videos_run(self) -> float:
+        return self.jobs["hot_videos"].last_run
+    
+    @property
+    def last_online_count_run(self) -> float:
+        return self.jobs["online_count"].last_run
+    
+    def _build_jobs(self, first_run: float):
+        """根据当前配置创建任务或更新已有任务的触发规则，并重新排期"""
+        config = self.config
+        common = dict(
+            jitter_seconds=config.jitter_seconds,
+            misfire_grace_seconds=config.misfire_grace_seconds,
+            coalesce=config.coalesce,
+        )
+        if not self.jobs:
+            self.jobs = {
+                "hot_videos": ScheduledJob(
+                    "hot_videos", lambda: crawler_service.crawl_hot_videos(self.config.max_videos)),
+                "online_count": ScheduledJob(
+                    "online_count",
+                    lambda: crawler_service.update_online_counts(self.config.online_cycle_budget_seconds),
+                    history_task="online_counts"),
+                "archive": ScheduledJob("archive", self._archive_closed_dates),
+            }
         
-        # 配置参数
-        self.check_interval = 30  # 每30秒检查一次
-        self.online_count_interval = 5 * 60  # 5分钟更新一次在线人数
+        with self._condition:
+            self.jobs["hot_videos"].configure(
+                interval_seconds=config.interval_minutes * 60, cron=config.hot_videos_cron, **common)
+            self.jobs["online_count"].configure(
+                interval_seconds=config.online_interval_minutes * 60, cron=config.online_count_cron, **common)
+            self.jobs["archive"].configure(interval_seconds=24 * 3600, cron=config.archive_cron, **common)
+            
+            self._heap = []
+            for job in self.jobs.values():
+                # cron任务等待下一个匹配时刻，间隔任务立即执行
+                job.schedule(job.following(first_run) if job.cron is not None else first_run)
+                self._push(job)
+            self._condition.notify_all()
+    
+    def _push(self, job: ScheduledJob):
+        """将任务放入堆中（调用方需持有锁），旧条目通过序号失效"""
+        entry_id = next(self._counter)
+        self._entry_ids[job.name] = entry_id
+        heapq.heappush(self._heap, (job.due_at, entry_id, job.name))
     
     def start(self):
         """启动调度器"""
@@ -49,126 +181,280 @@ class TaskScheduler:
             print("调度器已经在运行中")
             return
         
+        self._restore_from_history()
         self.stop_scheduler = False
         self.crawler_thread = threading.Thread(target=self._run_scheduler, daemon=True)
         self.crawler_thread.start()
         print("调度器已启动")
     
+    def _restore_from_history(self):
+        """
+        根据持久化的任务运行记录恢复调度进度
+        
+        上次成功执行距今未超过间隔的任务不会在启动时立即重跑，而是按原计划时间触发。
+        """
+        try:
+            interrupted = db_manager.mark_interrupted_task_runs()
+            if interrupted:
+                print(f"已将 {interrupted} 条未完成的任务记录标记为中断")
+        except Exception as e:
+            print(f"标记中断任务失败: {e}")
+        
+        now = time.time()
+        with self._condition:
+            for job in self.jobs.values():
+                try:
+                    last = db_manager.get_last_task_run(job.history_task, status="success")
+                except Exception as e:
+                    print(f"读取任务 {job.name} 运行记录失败: {e}")
+                    continue
+                if not last:
+                    continue
+                
+                job.last_run = max(job.last_run, last["started_at"])
+                job.last_result = True
+                if job.cron is None:
+                    next_run = max(now, job.last_run + job.interval_seconds)
+                    job.schedule(next_run)
+                    self._push(job)
+                    if next_run > now:
+                        print(f"任务 {job.name} 上次成功于 {self._format_time(job.last_run)}，"
+                              f"下次执行: {self._format_time(job.due_at)}")
+            self._condition.notify_all()
+    
     def stop(self):
         """停止调度器"""
-        self.stop_scheduler = True
+        with self._condition:
+            self.stop_scheduler = True
+            self._condition.notify_all()
         if self.crawler_thread:
             self.crawler_thread.join(timeout=5)
         print("调度器已停止")
     
     def _run_scheduler(self):
-        """调度器主循环"""
+        """调度器主循环：睡眠到堆顶任务到期，或被配置变更/停止唤醒"""
         print("调度器开始运行")
         
-        while not self.stop_scheduler:
-            try:
-                time.sleep(self.check_interval)
-                current_time = time.time()
+        with self._condition:
+            while not self.stop_scheduler:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
                 
-                # 检查是否需要爬取热门视频
-                if self._should_run_hot_videos_task(current_time):
-                    self._run_hot_videos_task(current_time)
+                due_at, entry_id, name = self._heap[0]
+                if self._entry_ids.get(name) != entry_id:
+                    heapq.heappop(self._heap)  # 已失效的条目
+                    continue
                 
-                # 检查是否需要更新在线人数
-                if self._should_run_online_count_task(current_time):
-                    self._run_online_count_task(current_time)
-                    
-            except Exception as e:
-                print(f"调度器出错: {e}")
-                time.sleep(60)  # 出错后等待更长时间
-    
-    def _should_run_hot_videos_task(self, current_time: float) -> bool:
-        """判断是否应该运行热门视频爬取任务"""
-        interval_seconds = self.config.interval_minutes * 60
-        return current_time - self.last_hot_videos_run >= interval_seconds
-    
-    def _should_run_online_count_task(self, current_time: float) -> bool:
-        """判断是否应该运行在线人数更新任务"""
-        return current_time - self.last_online_count_run >= self.online_count_interval
-    
-    def _run_hot_videos_task(self, current_time: float):
-        """运行热门视频爬取任务"""
-        print(f"开始爬取热门视频任务...")
+                now = time.time()
+                if due_at > now:
+                    self._condition.wait(timeout=due_at - now)
+                    continue
+                
+                heapq.heappop(self._heap)
+                job = self.jobs[name]
+                try:
+                    self._fire(job, now)
+                except Exception as e:
+                    print(f"调度任务 {name} 出错: {e}")
+                    job.schedule(now + self.retry_delay)
+                self._push(job)
+    
+    def _fire(self, job: ScheduledJob, now: float):
+        """处理到期任务：错过触发判断、合并补跑、防止重叠，并计算下次触发时间（调用方持有锁）"""
+        lateness = now - job.due_at
+        if lateness > job.misfire_grace_seconds:
+            job.misfires += 1
+            print(f"任务 {job.name} 错过触发时间 {lateness:.0f} 秒，跳过本次执行")
+        elif job.running:
+            print(f"任务 {job.name} 上一次执行尚未结束，跳过本次触发")
+        else:
+            self._launch(job)
+        
+        next_run = job.following(job.next_run)
+        if job.coalesce:
+            # 错过的多次触发合并为一次：直接跳到当前时间之后的下一个触发点
+            while next_run <= now:
+                next_run = job.following(next_run)
+        job.schedule(next_run)
+    
+    def _launch(self, job: ScheduledJob):
+        """在后台线程中执行任务，避免阻塞调度循环（调用方持有锁）"""
+        job.running = True
+        started_at = time.time()
+        threading.Thread(target=self._execute, args=(job, started_at), daemon=True, name=f"job-{job.name}").start()
+    
+    def _execute(self, job: ScheduledJob, started_at: float) -> bool:
+        """执行任务并更新任务状态，调用前需已将 job.running 置为 True"""
+        success = False
         try:
-            success = crawler_service.crawl_hot_videos(self.config.max_videos)
-            if success:
-                self.last_hot_videos_run = current_time
-                print(f"热门视频爬取任务完成")
-            else:
-                print(f"热门视频爬取任务失败")
+            print(f"开始执行任务 {job.name}...")
+            success = bool(job.func())
+            print(f"任务 {job.name} {'完成' if success else '失败'}")
         except Exception as e:
-            print(f"热门视频爬取任务异常: {e}")
+            print(f"任务 {job.name} 异常: {e}")
+        finally:
+            with self._condition:
+                job.running = False
+                job.last_result = success
+                if success:
+                    job.last_run = started_at
+                elif job.due_at > time.time() + self.retry_delay:
+                    # 失败后提前重试，而不是等待完整的间隔
+                    job.schedule(time.time() + self.retry_delay)
+                    self._push(job)
+                self._condition.notify_all()
+        return success
     
-    def _run_online_count_task(self, current_time: float):
-        """运行在线人数更新任务"""
-        print(f"开始更新在线人数任务...")
+    def _archive_closed_dates(self) -> bool:
+        """将超过保留天数的已结束日期归档为 Parquet，并收缩数据库文件"""
+        if not db_manager.archive.available:
+            print("未安装 pyarrow，跳过归档")
+            return True
+        
+        before = (date.today() - timedelta(days=self.config.archive_after_days)).isoformat()
+        run_id = db_manager.start_task_run("archive")
+        archived_rows = 0
+        success = False
         try:
-            success = crawler_service.update_online_counts()
-            if success:
-                self.last_online_count_run = current_time
-                print(f"在线人数更新任务完成")
-            else:
-                print(f"在线人数更新任务失败")
-        except Exception as e:
-            print(f"在线人数更新任务异常: {e}")
+            dates = db_manager.get_archivable_dates(before)
+            for crawl_date in dates:
+                archived_rows += db_manager.archive_date(crawl_date)
+                print(f"已归档 {crawl_date}")
+            if dates:
+                db_manager.vacuum()
+                print(f"归档完成: {len(dates)} 天，{archived_rows} 条记录")
+            success = True
+            return True
+        finally:
+            db_manager.finish_task_run(run_id, "success" if success else "failed", archived_rows)
     
-    def update_config(self, new_config: CrawlConfig):
-        """更新配置"""
+    def run_job(self, name: str) -> Optional[bool]:
+        """
+        在当前线程中立即执行任务（供任务队列消费者使用），与定时触发共用防重叠判断
+        
+        Returns:
+            执行结果；任务正在运行时返回None
+        """
+        with self._condition:
+            job = self.jobs[name]
+            if job.running:
+                return None
+            job.running = True
+            # 手动执行后从当前时间重新计算下次定时触发
+            job.schedule(job.following(time.time()))
+            self._push(job)
+            self._condition.notify_all()
+        return self._execute(job, time.time())
+    
+    def running_jobs(self) -> List[str]:
+        """正在执行的任务名"""
+        with self._condition:
+            return [name for name, job in self.jobs.items() if job.running]
+    
+    @staticmethod
+    def validate_config(config: CrawlConfig):
+        """校验配置，cron表达式、触发间隔或资源预算无效时抛出ValueError"""
+        for expression in (config.hot_videos_cron, config.online_count_cron, config.archive_cron):
+            if expression:
+                CronExpression(expression)
+        if config.interval_minutes < 1 or config.online_interval_minutes < 1:
+            raise ValueError("interval_minutes 与 online_interval_minutes 至少为1")
+        if config.online_cycle_budget_seconds <= 0:
+            raise ValueError("online_cycle_budget_seconds 必须为正数")
+        if config.max_browsers < 1 or config.requests_per_second <= 0:
+            raise ValueError("max_browsers 至少为1，requests_per_second 必须为正数")
+        if config.archive_after_days < 1:
+            raise ValueError("archive_after_days 至少为1")
+    
+    def update_config(self, new_config: CrawlConfig, persist: bool = True):
+        """
+        更新配置
+        
+        Args:
+            new_config: 新的配置
+            persist: 是否写入数据库，供其他进程（API进程、重启后的工作进程）读取
+        """
+        # 先校验cron表达式，避免配置写入一半
+        self.validate_config(new_config)
+        if persist:
+            db_manager.set_setting(CONFIG_SETTING_KEY, new_config.model_dump())
+        
         self.config = new_config
-        # 重置热门视频任务计时器，以便新配置立即生效
-        self.last_hot_videos_run = 0
+        resource_budget.configure(new_config.max_browsers, new_config.requests_per_second)
+        # 重建任务，间隔任务立即按新配置执行一次
+        self._build_jobs(first_run=time.time())
         print(f"调度器配置已更新: {new_config.model_dump()}")
     
+    def load_config(self):
+        """从数据库加载持久化的配置（不存在时保持当前配置）"""
+        try:
+            stored = db_manager.get_setting(CONFIG_SETTING_KEY)
+        except Exception as e:
+            print(f"读取爬虫配置失败: {e}")
+            return
+        if stored:
+            try:
+                self.update_config(CrawlConfig(**stored), persist=False)
+            except ValueError as e:
+                # 旧版本可能保存了现在不再允许的配置（如间隔为0），保持当前配置继续运行
+                print(f"已保存的爬虫配置无效，继续使用当前配置: {e}")
+    
     def get_config(self) -> Dict[str, Any]:
         """获取当前配置"""
         return self.config.model_dump()
     
+    @staticmethod
+    def _format_time(timestamp: float) -> Optional[str]:
+        return datetime.fromtimestamp(timestamp).isoformat() if timestamp > 0 else None
+    
     def get_status(self) -> Dict[str, Any]:
         """获取调度器状态"""
-        current_time = time.time()
+        hot_job = self.jobs["hot_videos"]
+        online_job = self.jobs["online_count"]
         
         return {
             "is_running": not self.stop_scheduler and self.crawler_thread and self.crawler_thread.is_alive(),
             "config": self.get_config(),
             "crawler_status": crawler_service.get_status(),
-            "last_hot_videos_run": datetime.fromtimestamp(self.last_hot_videos_run).isoformat() if self.last_hot_videos_run > 0 else None,
-            "last_online_count_run": datetime.fromtimestamp(self.last_online_count_run).isoformat() if self.last_online_count_run > 0 else None,
-            "next_hot_videos_run": datetime.fromtimestamp(self.last_hot_videos_run + self.config.interval_minutes * 60).isoformat() if self.last_hot_videos_run > 0 else "立即执行",
-            "next_online_count_run": datetime.fromtimestamp(self.last_online_count_run + self.online_count_interval).isoformat() if self.last_online_count_run > 0 else "立即执行"
+            "last_hot_videos_run": self._format_time(hot_job.last_run),
+            "last_online_count_run": self._format_time(online_job.last_run),
+            "next_hot_videos_run": self._format_time(hot_job.due_at),
+            "next_online_count_run": self._format_time(online_job.due_at),
+            "recent_runs": db_manager.get_task_runs(limit=10),
+            "jobs": {
+                name: {
+                    "running": job.running,
+                    "trigger": job.cron.expression if job.cron else f"every {job.interval_seconds:.0f}s",
+                    "next_run": self._format_time(job.due_at),
+                    "last_run": self._format_time(job.last_run),
+                    "last_result": job.last_result,
+                    "misfires": job.misfires,
+                }
+                for name, job in self.jobs.items()
+            },
         }
     
+    def _trigger(self, name: str, message: str) -> Dict[str, Any]:
+        """手动触发任务，与定时触发共用防重叠判断"""
+        with self._condition:
+            job = self.jobs[name]
+            if job.running:
+                return {"success": False, "message": "该任务正在运行中"}
+            self._launch(job)
+            # 手动执行后从当前时间重新计算下次定时触发
+            job.schedule(job.following(time.time()))
+            self._push(job)
+            self._condition.notify_all()
+        return {"success": True, "message": message}
+    
     def trigger_hot_videos_task(self):
         """手动触发热门视频爬取任务"""
-        if crawler_service.is_crawling:
-            return {"success": False, "message": "爬虫正在运行中"}
-        
-        # 在后台线程中执行，避免阻塞API响应
-        def run_task():
-            success = crawler_service.crawl_hot_videos(self.config.max_videos)
-            if success:
-                self.last_hot_videos_run = time.time()
-        
-        threading.Thread(target=run_task, daemon=True).start()
-        return {"success": True, "message": "热门视频爬取任务已启动"}
+        return self._trigger("hot_videos", "热门视频爬取任务已启动")
     
     def trigger_online_count_task(self):
         """手动触发在线人数更新任务"""
-        if crawler_service.is_crawling:
-            return {"success": False, "message": "爬虫正在运行中"}
-        
-        # 在后台线程中执行，避免阻塞API响应
-        def run_task():
-            success = crawler_service.update_online_counts()
-            if success:
-                self.last_online_count_run = time.time()
-        
-        threading.Thread(target=run_task, daemon=True).start()
-        return {"success": True, "message": "在线人数更新任务已启动"}
+        return self._trigger("online_count", "在线人数更新任务已启动")
 
 
 # 创建全局调度器实例
@@ -0,0 +1,183 @@
+import os
+import signal
+import threading
+from typing import Dict, Optional, Tuple
+
+try:
+    from .database import db_manager
+    from .scheduler import task_scheduler
+    from .leader import leader_elector
+    from .metrics import metrics_server
+except ImportError:
+    from database import db_manager
+    from scheduler import task_scheduler
+    from leader import leader_elector
+    from metrics import metrics_server
+
+
+# 爬虫主节点提供 /metrics 的端口：爬虫指标只记录在运行爬虫的进程中，API进程的 /metrics 看不到。
+# 独立工作进程默认使用 9101；在API进程内运行爬虫时需显式设置才会启动，0 表示不启动
+CRAWLER_METRICS_PORT = os.environ.get("CRAWLER_METRICS_PORT")
+
+
+class CrawlerWorker:
+    """
+    爬虫工作进程 - 运行调度器并消费任务队列
+    
+    API进程只负责向 job_queue 表写入任务和读取状态，浏览器爬取只在工作进程中执行，
+    避免长时间运行的Chrome与API请求争抢CPU和内存。多个工作进程通过租约选举，只有主节点消费队列。
+    """
+    
+    # 队列为空时的轮询间隔（秒），同进程内入队会通过 notify() 立即唤醒
+    poll_interval = 1.0
+    
+    # 队列任务名 -> 调度任务名
+    SCHEDULED_TASKS = {
+        "hot_videos": "hot_videos",
+        "online_count": "online_count",
+        "archive": "archive",
+    }
+    
+    def __init__(self, metrics_port: int = 0):
+        self.worker_id = leader_elector.holder_id
+        self.metrics_port = metrics_port
+        # 正在执行的队列任务: 任务ID -> 任务
+        self.active_jobs: Dict[int, Dict] = {}
+        self._active_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        """成为主节点后启动调度器和队列消费线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        
+        task_scheduler.load_config()
+        task_scheduler.start()
+        print(f"调度器已启动，下次热门视频爬取: {task_scheduler.get_status()['next_hot_videos_run']}")
+        
+        try:
+            orphaned = db_manager.fail_orphaned_jobs()
+            if orphaned:
+                print(f"已将 {orphaned} 个中断的队列任务标记为失败")
+        except Exception as e:
+            print(f"清理中断的队列任务失败: {e}")
+        
+        if self.metrics_port:
+            metrics_server.start(self.metrics_port)
+        
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="crawler-worker")
+        self._thread.start()
+        print(f"爬虫工作线程已启动: {self.worker_id}")
+    
+    def stop(self):
+        """失去主节点身份或退出时停止消费和调度"""
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        task_scheduler.stop()
+        # 释放端口，由新的主节点接管
+        metrics_server.stop()
+        print("爬虫工作线程已停止")
+    
+    def notify(self):
+        """有新任务入队时唤醒消费线程"""
+        self._wake_event.set()
+    
+    def _busy_tasks(self) -> Tuple[str, ...]:
+        """正在运行（定时触发或队列触发）的任务，队列中的同名任务需等待其结束"""
+        busy = set(task_scheduler.running_jobs())
+        with self._active_lock:
+            busy.update(job["task"] for job in self.active_jobs.values())
+        return tuple(busy)
+    
+    def _run(self):
+        """消费循环：不同任务各自在线程中并行执行，同名任务排队等待"""
+        while not self._stop_event.is_set():
+            job = None
+            try:
+                job = db_manager.claim_next_job(self.worker_id, exclude_tasks=self._busy_tasks())
+            except Exception as e:
+                print(f"领取队列任务失败: {e}")
+            
+            if job is None:
+                self._wake_event.wait(self.poll_interval)
+                self._wake_event.clear()
+                continue
+            
+            if job["task"] in self.SCHEDULED_TASKS:
+                with self._active_lock:
+                    self.active_jobs[job["id"]] = job
+                threading.Thread(target=self._handle, args=(job,), daemon=True,
+                                 name=f"queue-job-{job['id']}").start()
+            else:
+                self._handle(job)
+    
+    def _handle(self, job: Dict):
+        """执行单个队列任务并记录结果"""
+        print(f"开始执行队列任务 #{job['id']} {job['task']}")
+        status, result = "failed", None
+        try:
+            if job["task"] == "reload_config":
+                task_scheduler.load_config()
+                status = "done"
+            elif job["task"] in self.SCHEDULED_TASKS:
+                outcome = task_scheduler.run_job(self.SCHEDULED_TASKS[job["task"]])
+                if outcome is None:
+                    status, result = "skipped", "同名任务正在运行中"
+                else:
+                    status = "done" if outcome else "failed"
+            else:
+                result = f"未知任务: {job['task']}"
+        except Exception as e:
+            result = str(e)
+            print(f"队列任务 #{job['id']} 异常: {e}")
+        finally:
+            try:
+                db_manager.finish_job(job["id"], status, result)
+            except Exception as e:
+                print(f"记录队列任务 #{job['id']} 结果失败: {e}")
+            with self._active_lock:
+                self.active_jobs.pop(job["id"], None)
+            # 同名任务可能正在队列中等待
+            self._wake_event.set()
+        print(f"队列任务 #{job['id']} 结束: {status}")
+
+
+# 创建全局工作进程实例
+crawler_worker = CrawlerWorker(int(CRAWLER_METRICS_PORT or 0))
+
+
+def main():
+    """独立运行爬虫工作进程: python worker.py"""
+    db_manager.init_database()
+    print("数据库初始化完成")
+    
+    if CRAWLER_METRICS_PORT is None:
+        crawler_worker.metrics_port = 9101
+    
+    stop_event = threading.Event()
+    
+    def handle_signal(signum, frame):
+        print(f"收到信号 {signum}，正在退出...")
+        stop_event.set()
+    
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+    
+    leader_elector.start(on_elected=crawler_worker.start, on_demoted=crawler_worker.stop)
+    if not leader_elector.is_leader:
+        print("当前进程不是主节点，等待接管...")
+    
+    while not stop_event.wait(1):
+        pass
+    
+    leader_elector.stop()
+    print("爬虫工作进程已退出")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 import { useState, useEffect, useCallback } from 'react'
-import { getDates, getVideos, getCrawlStatus, startCrawl, getZoneStats } from '../services/api.js'
+import { getDates, getVideos, getCrawlStatus, openEvents, startCrawl, getZoneStats } from '../services/api.js'
 
 /**
  * 管理可用日期的Hook
@@ -157,9 +157,37 @@ export const useCrawlStatus = () => {
   useEffect(() => {
     fetchCrawlStatus()
     
-    // 定期更新爬虫状态
-    const interval = setInterval(fetchCrawlStatus, 5000)
-    return () => clearInterval(interval)
+    // 优先通过SSE接收服务端推送，不支持或连接关闭时退回定期轮询
+    let interval = null
+    const startPolling = () => {
+      if (!interval) {
+        interval = setInterval(fetchCrawlStatus, 5000)
+      }
+    }
+
+    if (typeof window === 'undefined' || !window.EventSource) {
+      startPolling()
+      return () => clearInterval(interval)
+    }
+
+    const source = openEvents()
+    source.addEventListener('status', (event) => {
+      const status = JSON.parse(event.data)
+      setCrawlStatus(prev => ({ ...prev, ...status }))
+    })
+    source.addEventListener('resync', fetchCrawlStatus)
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED) {
+        startPolling()
+      }
+    }
+
+    return () => {
+      source.close()
+      if (interval) {
+        clearInterval(interval)
+      }
+    }
   }, [])
 
   return {
@@ -2,6 +2,8 @@
  * API服务层 - 封装所有后端API调用
  */
 
+import { API_CONFIG } from '../shared/constants/app.js'
+
 /**
  * 基础请求函数
  */
@@ -88,6 +90,12 @@ export const getCrawlStatus = async () => {
   }
 }
 
+/**
+ * 订阅服务端推送的爬虫事件（SSE）
+ * @returns {EventSource} 调用方负责在不再需要时 close()
+ */
+export const openEvents = () => new EventSource(API_CONFIG.ENDPOINTS.EVENTS)
+
 /**
  * 启动爬取任务
  */
@@ -30,6 +30,7 @@ export const API_CONFIG = {
     DATES: '/api/dates',
     VIDEOS: '/api/videos',
     CRAWL_STATUS: '/api/crawl/status',
+    EVENTS: '/api/events',
     CRAWL_START: '/api/crawl/start',
     VIDEO_DETAIL: '/api/video/detail',
     ZONE_STATS: '/api/zone/stats',